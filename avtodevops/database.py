@@ -0,0 +1,71 @@
+import os
+
+from urllib.parse import parse_qsl, unquote, urlparse
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Прагми, які виконуються на кожному новому з'єднанні SQLite.
+SQLITE_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA busy_timeout=20000;'
+    'PRAGMA cache_size=-20000;'
+    'PRAGMA temp_store=MEMORY;'
+    'PRAGMA foreign_keys=ON;'
+)
+
+
+def _sqlite_path(url):
+    """Шлях до файлу SQLite: sqlite:///app.db - відносний, sqlite:////var/data/app.db - абсолютний."""
+    path = unquote(urlparse(url).path)
+    return path[1:] if path.startswith('/') else path
+
+
+def database_config(url, default_sqlite_path, environ=None):
+    """
+    Перетворити DATABASE_URL на налаштування бази 'default'.
+
+    :param url: postgres://..., postgresql://..., sqlite://... або порожній рядок (SQLite за замовчуванням).
+    :param default_sqlite_path: Файл SQLite, якщо url порожній або без шляху.
+    :param environ: Змінні середовища з параметрами з'єднань (DB_CONN_MAX_AGE, DB_POOL...);
+                    за замовчуванням os.environ.
+    """
+    environ = os.environ if environ is None else environ
+
+    if url.startswith(('postgres://', 'postgresql://')):
+        parsed = urlparse(url)
+        pool = environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes')
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': unquote(parsed.path.lstrip('/')),
+            'USER': unquote(parsed.username or ''),
+            'PASSWORD': unquote(parsed.password or ''),
+            'HOST': parsed.hostname or '',
+            'PORT': str(parsed.port or ''),
+            'CONN_MAX_AGE': 0 if pool else int(environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(environ.get('DB_CONNECT_TIMEOUT', 5)),
+                **dict(parse_qsl(parsed.query)),
+            },
+        }
+        if pool:
+            config['OPTIONS']['pool'] = {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+                'timeout': int(environ.get('DB_POOL_TIMEOUT', 10)),
+            }
+        return config
+
+    if url and not url.startswith('sqlite://'):
+        raise ImproperlyConfigured(f"Непідтримувана DATABASE_URL: {urlparse(url).scheme}")
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _sqlite_path(url) or default_sqlite_path,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': SQLITE_INIT_COMMAND,
+        },
+    }
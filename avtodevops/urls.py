@@ -23,4 +23,5 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
     path('aws/', include('aws.urls')),
     path('cicd/', include('cicd.urls')),
+    path('jobs/', include('common.urls')),
 ]
@@ -1,3 +1,15 @@
 from django.contrib import admin
-
+from .models import (
+    AmiCatalogEntry, InventoryCluster, InventoryInstance, InventorySearchEntry, InventorySecurityGroup,
+    InventorySubnet, InventorySync, InventoryTag, InventoryVpc
+)
 # Register your models here.
+admin.site.register(AmiCatalogEntry)
+admin.site.register(InventoryInstance)
+admin.site.register(InventoryVpc)
+admin.site.register(InventorySubnet)
+admin.site.register(InventorySecurityGroup)
+admin.site.register(InventoryCluster)
+admin.site.register(InventorySearchEntry)
+admin.site.register(InventoryTag)
+admin.site.register(InventorySync)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AwsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'aws'
+
+    def ready(self):
+        # Реєстрація обробників фонових завдань
+        from . import jobs  # noqa: F401
@@ -0,0 +1,187 @@
+from common.jobs import register
+from dashboard.profiles import get_profile
+from .services.vpc import VPCService
+from .services.eks import EKSService
+from .services.ec2_service import EC2Service
+from .services.s3_service import S3Service
+from .services.cache import store_prefix_stats
+from .services.clients import credential_fingerprint
+from .services.inventory import InventorySyncer
+
+
+def get_credentials(job):
+    """Отримати AWS ключі власника завдання."""
+    profile = get_profile(job.user)
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        raise Exception("Будь ласка, додайте ваші AWS ключі в налаштуваннях профілю.")
+    return profile.aws_access_key, profile.aws_secret_key
+
+
+# Зрозумілі повідомлення для ключових кроків створення VPC.
+STEP_MESSAGES = {
+    'vpc': 'VPC створено',
+    'igw': 'Internet Gateway створено',
+    'igw_attach': "Internet Gateway під'єднано до VPC",
+    'public_route': 'Маршрут до Internet Gateway додано',
+    'nat_gateways_available': 'NAT Gateway доступні',
+}
+
+# Кроки, про початок яких варто повідомити (довгі очікування).
+STARTED_MESSAGES = {
+    'nat_gateways_available': 'Очікування доступності NAT Gateway...',
+}
+
+
+# Повідомлення про відкат невдалого створення VPC.
+ROLLBACK_MESSAGES = {
+    ('rollback', 'started'): 'Створення не вдалося, видаляємо створені ресурси...',
+    ('rollback', 'done'): 'Створені ресурси видалено',
+    ('rollback', 'failed'): 'Відкат неповний, частину ресурсів не вдалося видалити',
+    ('nat_gateways_deleted', 'started'): 'Очікування видалення NAT Gateway...',
+}
+
+
+def step_reporter(job):
+    """Callback для ProvisioningEngine, що записує кроки в журнал завдання."""
+    def on_event(event):
+        step = event['step']
+        if step == 'rollback' or event.get('rollback'):
+            # Відкат не змінює прогрес створення, лише записує кроки (разом з ID ресурсів) у журнал.
+            message = ROLLBACK_MESSAGES.get((step, event['status']))
+            if message is None and event['status'] != 'started':
+                message = f"Відкат {step}: {'помилка' if event['status'] == 'failed' else 'готово'}"
+            if message is not None:
+                job.report(message, **event)
+        elif event['status'] == 'exists':
+            progress = min(99, event['completed'] * 100 // event['total'])
+            job.report(f"{step}: вже існує", progress=progress, **event)
+        elif event['status'] == 'started' and step in STARTED_MESSAGES:
+            job.report(STARTED_MESSAGES[step], **event)
+        elif event['status'] == 'done':
+            progress = min(99, event['completed'] * 100 // event['total'])
+            job.report(STEP_MESSAGES.get(step, f"{step}: готово"), progress=progress, **event)
+        elif event['status'] == 'failed':
+            job.report(f"{step}: помилка", **event)
+    return on_event
+
+
+@register('aws.create_vpc')
+def create_vpc(job):
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    vpc_service = VPCService(access_key, secret_key, region=payload.get('region') or 'us-east-1')
+    vpc_id, subnets = vpc_service.create_vpc(
+        payload['cidr_block'], payload['subnet_count'], payload['vpc_name'], on_event=step_reporter(job)
+    )
+    return {
+        'vpc_id': vpc_id,
+        'subnets': subnets,
+        'report': vpc_service.last_report,
+        'existing': sum(1 for step in vpc_service.last_report if step['status'] == 'exists'),
+    }
+
+
+@register('aws.create_eks_cluster')
+def create_eks_cluster(job):
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    eks_service = EKSService(access_key, secret_key, region=payload.get('region') or 'us-east-1')
+
+    subnets = eks_service.get_subnets_by_type(payload['vpc_id'], payload['cluster_type'])
+    if not subnets:
+        raise Exception('Не вдалося знайти сабнети для обраного VPC та типу кластера.')
+    job.report(f"Знайдено сабнетів: {len(subnets)}", progress=5)
+
+    eks_service.create_eks_cluster(
+        payload['cluster_name'], payload['vpc_id'], subnets, payload['cluster_type'],
+        on_event=lambda event: job.report(f"Кластер {payload['cluster_name']}: {event['status']}", **event)
+    )
+    return {'cluster_name': payload['cluster_name'], 'subnets': [subnet['SubnetId'] for subnet in subnets]}
+
+
+@register('aws.s3_prefix_stats')
+def s3_prefix_stats(job):
+    """Порахувати розмір і кількість об'єктів під префіксом бакета та закешувати підсумки."""
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    s3_service = S3Service(access_key, secret_key)
+    prefix = payload.get('prefix', '')
+
+    aggregate = s3_service.aggregate_prefix(
+        payload['bucket_name'], prefix,
+        on_progress=lambda total: job.report(f"Оброблено об'єктів: {total['count']}", **total)
+    )
+    store_prefix_stats(credential_fingerprint(access_key, secret_key), payload['bucket_name'], aggregate)
+    return {'prefix': prefix, 'size': aggregate['size'], 'count': aggregate['count'],
+            'prefixes': len(aggregate['children'])}
+
+
+def bulk_reporter(job, message):
+    """Callback прогресу масових операцій S3, що записує подію кожні 5%."""
+    last_percent = [-1]
+
+    def on_progress(done, total):
+        percent = done * 100 // total if total else 100
+        if percent >= last_percent[0] + 5 or done == total:
+            last_percent[0] = percent
+            job.report(f"{message}: {done} з {total}", progress=min(99, percent), done=done, total=total)
+    return on_progress
+
+
+@register('aws.s3_delete_prefix')
+def s3_delete_prefix(job):
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    s3_service = S3Service(access_key, secret_key)
+    return s3_service.delete_prefix(payload['bucket_name'], payload['prefix'],
+                                    on_progress=bulk_reporter(job, "Видалено об'єктів"))
+
+
+@register('aws.s3_copy_prefix')
+def s3_copy_prefix(job):
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    s3_service = S3Service(access_key, secret_key)
+    return s3_service.copy_prefix(
+        payload['source_bucket'], payload.get('source_prefix', ''),
+        payload['dest_bucket'], payload.get('dest_prefix', ''),
+        on_progress=bulk_reporter(job, "Скопійовано об'єктів")
+    )
+
+
+@register('aws.sync_inventory')
+def sync_inventory(job):
+    """Оновити локальний індекс ресурсів для вказаних регіонів."""
+    access_key, secret_key = get_credentials(job)
+    regions = job.payload.get('regions') or ['us-east-1']
+    stats = {}
+    for index, region in enumerate(regions):
+        stats[region] = InventorySyncer(job.user, access_key, secret_key, region).run()
+        job.report(f"Регіон {region} синхронізовано", progress=min(99, (index + 1) * 100 // len(regions)),
+                   region=region, stats=stats[region])
+    return stats
+
+
+# Повідомлення про етапи запуску флоту інстансів.
+FLEET_MESSAGES = {
+    'launched': 'Сабнет {subnet_id}: запущено інстансів {count}',
+    'failed': 'Сабнет {subnet_id}: помилка {error}',
+    'tagged': 'Імена проставлено ({count})',
+    'running': 'Усі інстанси запущено ({count})',
+}
+
+
+@register('aws.launch_fleet')
+def launch_fleet(job):
+    """Запустити кілька інстансів з розподілом по сабнетах і дочекатися їх запуску."""
+    access_key, secret_key = get_credentials(job)
+    payload = job.payload
+    ec2_service = EC2Service(access_key, secret_key, region=payload.get('region') or 'us-east-1')
+    return ec2_service.launch_fleet(
+        payload['instance_type'], payload['ami_id'], payload['count'], payload['subnet_ids'],
+        payload['sg_id'], payload['ssh_key_name'], payload['name_prefix'],
+        volume_size=payload.get('volume_size', 8),
+        allow_partial=payload.get('allow_partial', False),
+        client_token=payload.get('client_token'),
+        on_event=lambda event: job.report(FLEET_MESSAGES[event['status']].format(**event), **event)
+    )
@@ -0,0 +1,55 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from aws.services.s3_service import S3Service
+from dashboard.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Синхронізувати локальну папку цього сервера з бакетом S3, передаючи лише змінені файли."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help="Користувач, чиї AWS ключі використовуються.")
+        parser.add_argument('--bucket', required=True)
+        parser.add_argument('--dir', required=True, dest='local_dir', help="Локальна папка.")
+        parser.add_argument('--prefix', default='', help="Префікс (папка) у бакеті.")
+        parser.add_argument('--download', action='store_true',
+                            help="Бакет -> папка (за замовчуванням папка -> бакет).")
+        parser.add_argument('--delete', action='store_true',
+                            help="Видалити на стороні призначення файли, яких немає в джерелі.")
+
+    def handle(self, *args, **options):
+        try:
+            profile = UserProfile.objects.get(user=User.objects.get(username=options['username']))
+        except (User.DoesNotExist, UserProfile.DoesNotExist):
+            raise CommandError("Профіль користувача не знайдено.")
+
+        local_dir = options['local_dir']
+        direction = 'download' if options['download'] else 'upload'
+        if direction == 'upload' and not os.path.isdir(local_dir):
+            raise CommandError(f"Папку {local_dir} не знайдено.")
+
+        last_percent = [-1]
+
+        def on_progress(done, total):
+            percent = done * 100 // total if total else 100
+            if percent >= last_percent[0] + 10 or done == total:
+                last_percent[0] = percent
+                self.stdout.write(f"Передано файлів: {done} з {total}")
+
+        s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key)
+        try:
+            result = s3_service.sync_directory(
+                local_dir, options['bucket'], options['prefix'],
+                direction=direction, delete=options['delete'], on_progress=on_progress
+            )
+        except Exception as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(', '.join(f"{name}: {value}" for name, value in result.items() if name != 'errors'))
+        for error in result.get('errors', []):
+            self.stderr.write(f"{error['item']}: {error['error']}")
+        if result.get('errors'):
+            raise CommandError(f"Не вдалося передати файлів: {len(result['errors'])}")
@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from aws.services.s3_service import S3Service
+from aws.services.s3_transfer import MB
+from dashboard.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Порівняти швидкість завантаження файлу в S3: стандартний upload_file, налаштований TransferConfig і ResumableUpload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help="Користувач, чиї AWS ключі використовуються.")
+        parser.add_argument('--bucket', required=True)
+        parser.add_argument('--file', required=True, help="Локальний файл для завантаження.")
+        parser.add_argument('--region', default='us-east-1')
+        parser.add_argument('--part-size', type=int, default=8, help="Розмір частини, МБ.")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--keep', action='store_true', help="Не видаляти завантажені об'єкти.")
+
+    def handle(self, *args, **options):
+        try:
+            profile = UserProfile.objects.get(user=User.objects.get(username=options['username']))
+        except (User.DoesNotExist, UserProfile.DoesNotExist):
+            raise CommandError("Профіль користувача не знайдено.")
+
+        file_path = options['file']
+        size = os.path.getsize(file_path)
+        bucket = options['bucket']
+        part_size = options['part_size'] * MB
+        concurrency = options['concurrency']
+        s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key, region=options['region'])
+        base_name = f"benchmark-{int(time.time())}-{os.path.basename(file_path)}"
+
+        runs = [
+            ('upload_file (за замовчуванням)', f"{base_name}.default",
+             lambda key: s3_service.s3.upload_file(file_path, bucket, key)),
+            ('upload_file (TransferConfig)', f"{base_name}.tuned",
+             lambda key: s3_service.upload_file(bucket, file_path, key, part_size=part_size, concurrency=concurrency)),
+            ('ResumableUpload', f"{base_name}.resumable",
+             lambda key: s3_service.upload_file_resumable(bucket, file_path, key, part_size=part_size, concurrency=concurrency)),
+        ]
+
+        self.stdout.write(f"Файл: {file_path} ({size / MB:.1f} МБ), частина {options['part_size']} МБ, потоків {concurrency}")
+        for label, key, run in runs:
+            started = time.monotonic()
+            result = run(key)
+            duration = time.monotonic() - started
+            if isinstance(result, str) and result.startswith("Помилка"):
+                raise CommandError(result)
+            self.stdout.write(f"{label}: {duration:.2f} с, {size / MB / duration:.1f} МБ/с")
+            if not options['keep']:
+                s3_service.s3.delete_object(Bucket=bucket, Key=key)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from aws.models import InventorySync
+from aws.services.ec2_service import EC2Service
+from aws.services.inventory import InventorySyncer
+from dashboard.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Синхронізувати локальний індекс ресурсів AWS (інстанси, VPC, сабнети, кластери)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Синхронізувати лише цього користувача.")
+        parser.add_argument('--region', action='append', dest='regions',
+                            help="Регіон (можна вказати кілька разів).")
+        parser.add_argument('--all-regions', action='store_true', help="Синхронізувати всі доступні регіони.")
+
+    def get_regions(self, profile, options):
+        if options['all_regions']:
+            ec2_service = EC2Service(profile.aws_access_key, profile.aws_secret_key)
+            return [region for region, _ in ec2_service.get_regions()]
+        if options['regions']:
+            return options['regions']
+        # За замовчуванням - регіони, які вже є в індексі користувача.
+        regions = set(InventorySync.objects.filter(user=profile.user).values_list('region', flat=True))
+        return sorted(regions or {'us-east-1'})
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(aws_access_key__isnull=True).exclude(aws_access_key='') \
+            .exclude(aws_secret_key__isnull=True).exclude(aws_secret_key='').select_related('user')
+        if options['username']:
+            profiles = profiles.filter(user__username=options['username'])
+            if not profiles:
+                raise CommandError("Профіль користувача з AWS ключами не знайдено.")
+
+        failed = 0
+        for profile in profiles:
+            for region in self.get_regions(profile, options):
+                syncer = InventorySyncer(profile.user, profile.aws_access_key, profile.aws_secret_key, region)
+                try:
+                    stats = syncer.run()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{profile.user.username} / {region}: {e}")
+                    continue
+                summary = ', '.join(
+                    f"{name}: +{item['created']} ~{item['updated']} -{item['deleted']}"
+                    for name, item in stats.items()
+                )
+                self.stdout.write(f"{profile.user.username} / {region}: {summary}")
+
+        if failed:
+            raise CommandError(f"Не вдалося синхронізувати регіонів: {failed}")
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmiCatalogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('parameter', models.CharField(max_length=255, verbose_name='SSM параметр')),
+                ('label', models.CharField(max_length=255, verbose_name='Назва')),
+                ('image_id', models.CharField(max_length=64)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('architecture', models.CharField(blank=True, max_length=16)),
+                ('creation_date', models.CharField(blank=True, max_length=32)),
+                ('version', models.IntegerField(default=0, verbose_name='Версія SSM параметра')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('checked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['region', 'label'], name='aws_amicata_region_8cf972_idx')],
+                'unique_together': {('region', 'parameter')},
+            },
+        ),
+    ]
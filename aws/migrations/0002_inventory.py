@@ -0,0 +1,139 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aws', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('changed_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField()),
+                ('version', models.CharField(blank=True, max_length=16)),
+                ('vpc_id', models.CharField(blank=True, max_length=32)),
+                ('endpoint', models.CharField(blank=True, max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['region', 'name', 'resource_id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', 'region'], name='aws_invento_user_id_107e1a_idx')],
+                'unique_together': {('user', 'region', 'resource_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryInstance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('changed_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField()),
+                ('instance_type', models.CharField(blank=True, max_length=32)),
+                ('availability_zone', models.CharField(blank=True, max_length=32)),
+                ('vpc_id', models.CharField(blank=True, max_length=32)),
+                ('subnet_id', models.CharField(blank=True, max_length=32)),
+                ('private_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('public_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('security_groups', models.JSONField(blank=True, default=list)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['region', 'name', 'resource_id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', 'region', 'state'], name='aws_invento_user_id_93cd99_idx'), models.Index(fields=['user', 'vpc_id'], name='aws_invento_user_id_e6d3f0_idx')],
+                'unique_together': {('user', 'region', 'resource_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySubnet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('changed_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField()),
+                ('vpc_id', models.CharField(max_length=32)),
+                ('cidr_block', models.CharField(max_length=43)),
+                ('availability_zone', models.CharField(blank=True, max_length=32)),
+                ('map_public_ip_on_launch', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['region', 'name', 'resource_id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', 'vpc_id'], name='aws_invento_user_id_7c8ba3_idx')],
+                'unique_together': {('user', 'region', 'resource_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'region')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryVpc',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('changed_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField()),
+                ('cidr_block', models.CharField(max_length=43)),
+                ('is_default', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['region', 'name', 'resource_id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', 'region'], name='aws_invento_user_id_64a191_idx')],
+                'unique_together': {('user', 'region', 'resource_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aws', '0002_inventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_type', models.CharField(choices=[('instance', 'EC2 інстанс'), ('vpc', 'VPC'), ('subnet', 'Сабнет'), ('security_group', 'Група безпеки'), ('cluster', 'EKS кластер')], max_length=16)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('vpc_id', models.CharField(blank=True, max_length=32)),
+                ('cidr', models.CharField(blank=True, max_length=43)),
+                ('cidr_start', models.BigIntegerField(blank=True, null=True)),
+                ('cidr_end', models.BigIntegerField(blank=True, null=True)),
+                ('search_text', models.TextField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InventorySecurityGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=32)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, max_length=32)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('changed_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField()),
+                ('group_name', models.CharField(max_length=255)),
+                ('vpc_id', models.CharField(blank=True, max_length=32)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['region', 'name', 'resource_id'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=128)),
+                ('value', models.CharField(blank=True, max_length=255)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_set', to='aws.inventorysearchentry')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorysearchentry',
+            index=models.Index(fields=['user', 'resource_id'], name='aws_invento_user_id_73cc79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysearchentry',
+            index=models.Index(fields=['user', 'resource_type', 'state'], name='aws_invento_user_id_5fcc4b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysearchentry',
+            index=models.Index(fields=['user', 'state'], name='aws_invento_user_id_2b6736_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysearchentry',
+            index=models.Index(fields=['user', 'vpc_id'], name='aws_invento_user_id_c872f7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysearchentry',
+            index=models.Index(fields=['user', 'cidr_start', 'cidr_end'], name='aws_invento_user_id_147cd4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorysearchentry',
+            unique_together={('user', 'region', 'resource_type', 'resource_id')},
+        ),
+        migrations.AddIndex(
+            model_name='inventorysecuritygroup',
+            index=models.Index(fields=['user', 'vpc_id'], name='aws_invento_user_id_3d7cf7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorysecuritygroup',
+            unique_together={('user', 'region', 'resource_id')},
+        ),
+        migrations.AddIndex(
+            model_name='inventorytag',
+            index=models.Index(fields=['key', 'value'], name='aws_invento_key_6e90b4_idx'),
+        ),
+    ]
@@ -1,3 +1,198 @@
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+
+class AmiCatalogEntry(models.Model):
+    """Останній AMI для публічного SSM параметра в регіоні."""
+    region = models.CharField(max_length=32)
+    parameter = models.CharField(max_length=255, verbose_name="SSM параметр")
+    label = models.CharField(max_length=255, verbose_name="Назва")
+    image_id = models.CharField(max_length=64)
+    name = models.CharField(max_length=255, blank=True)
+    architecture = models.CharField(max_length=16, blank=True)
+    creation_date = models.CharField(max_length=32, blank=True)
+    version = models.IntegerField(default=0, verbose_name="Версія SSM параметра")
+    updated_at = models.DateTimeField(auto_now=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('region', 'parameter')
+        indexes = [
+            models.Index(fields=['region', 'label']),
+        ]
+
+    def __str__(self):
+        return f"{self.region} - {self.label} - {self.image_id}"
+
+
+class InventoryItem(models.Model):
+    """
+    Базова модель запису локального індексу ресурсів AWS.
+
+    data містить сирий опис ресурсу, а fingerprint - його хеш: під час
+    синхронізації записуються лише ресурси, чий опис змінився.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    region = models.CharField(max_length=32)
+    resource_id = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, blank=True)
+    state = models.CharField(max_length=32, blank=True)
+    tags = models.JSONField(default=dict, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=40)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    changed_at = models.DateTimeField()
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+        ordering = ['region', 'name', 'resource_id']
+
+    def __str__(self):
+        return f"{self.region} - {self.resource_id} - {self.name}"
+
+
+class InventoryInstance(InventoryItem):
+    resource_type = 'instance'
+
+    instance_type = models.CharField(max_length=32, blank=True)
+    availability_zone = models.CharField(max_length=32, blank=True)
+    vpc_id = models.CharField(max_length=32, blank=True)
+    subnet_id = models.CharField(max_length=32, blank=True)
+    private_ip = models.GenericIPAddressField(null=True, blank=True)
+    public_ip = models.GenericIPAddressField(null=True, blank=True)
+    security_groups = models.JSONField(default=list, blank=True)
+
+    class Meta(InventoryItem.Meta):
+        unique_together = ('user', 'region', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'region', 'state']),
+            models.Index(fields=['user', 'vpc_id']),
+        ]
+
+
+class InventoryVpc(InventoryItem):
+    resource_type = 'vpc'
+
+    cidr_block = models.CharField(max_length=43)
+    is_default = models.BooleanField(default=False)
+
+    class Meta(InventoryItem.Meta):
+        unique_together = ('user', 'region', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'region']),
+        ]
+
+
+class InventorySubnet(InventoryItem):
+    resource_type = 'subnet'
+
+    vpc_id = models.CharField(max_length=32)
+    cidr_block = models.CharField(max_length=43)
+    availability_zone = models.CharField(max_length=32, blank=True)
+    map_public_ip_on_launch = models.BooleanField(default=False)
+
+    class Meta(InventoryItem.Meta):
+        unique_together = ('user', 'region', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'vpc_id']),
+        ]
+
+
+class InventoryCluster(InventoryItem):
+    resource_type = 'cluster'
+
+    version = models.CharField(max_length=16, blank=True)
+    vpc_id = models.CharField(max_length=32, blank=True)
+    endpoint = models.CharField(max_length=255, blank=True)
+
+    class Meta(InventoryItem.Meta):
+        unique_together = ('user', 'region', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'region']),
+        ]
+
+
+class InventorySecurityGroup(InventoryItem):
+    resource_type = 'security_group'
+
+    group_name = models.CharField(max_length=255)
+    vpc_id = models.CharField(max_length=32, blank=True)
+    description = models.CharField(max_length=255, blank=True)
+
+    class Meta(InventoryItem.Meta):
+        unique_together = ('user', 'region', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'vpc_id']),
+        ]
+
+
+class InventorySearchEntry(models.Model):
+    """
+    Пошуковий запис ресурсу з індексу (по одному на ресурс будь-якого типу).
+
+    IPv4 CIDR (або IP інстансу) зберігається як діапазон цілих чисел,
+    тож пошук "який сабнет містить адресу" - це звичайний запит за індексом.
+    """
+    RESOURCE_TYPES = [
+        ('instance', 'EC2 інстанс'),
+        ('vpc', 'VPC'),
+        ('subnet', 'Сабнет'),
+        ('security_group', 'Група безпеки'),
+        ('cluster', 'EKS кластер'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    region = models.CharField(max_length=32)
+    resource_type = models.CharField(max_length=16, choices=RESOURCE_TYPES)
+    resource_id = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, blank=True)
+    state = models.CharField(max_length=32, blank=True)
+    vpc_id = models.CharField(max_length=32, blank=True)
+    cidr = models.CharField(max_length=43, blank=True)
+    cidr_start = models.BigIntegerField(null=True, blank=True)
+    cidr_end = models.BigIntegerField(null=True, blank=True)
+    search_text = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('user', 'region', 'resource_type', 'resource_id')
+        indexes = [
+            models.Index(fields=['user', 'resource_id']),
+            models.Index(fields=['user', 'resource_type', 'state']),
+            models.Index(fields=['user', 'state']),
+            models.Index(fields=['user', 'vpc_id']),
+            models.Index(fields=['user', 'cidr_start', 'cidr_end']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_type} - {self.resource_id}"
+
+
+class InventoryTag(models.Model):
+    entry = models.ForeignKey(InventorySearchEntry, on_delete=models.CASCADE, related_name='tag_set')
+    key = models.CharField(max_length=128)
+    value = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'value']),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
+class InventorySync(models.Model):
+    """Стан останньої синхронізації індексу для користувача і регіону."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    region = models.CharField(max_length=32)
+    synced_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('user', 'region')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.region} - {self.synced_at}"
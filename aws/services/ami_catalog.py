@@ -0,0 +1,179 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import AmiCatalogEntry
+
+# Образи, які пропонуються у формі створення інстансу. Для кожного вказано
+# публічний SSM параметр з ID останнього AMI і шаблон імені для резервного
+# пошуку через describe_images, якщо SSM недоступний.
+DEFAULT_CATALOG = [
+    {
+        'label': 'Amazon Linux 2023',
+        'parameter': '/aws/service/ami-amazon-linux-latest/al2023-ami-kernel-default-x86_64',
+        'owner': 'amazon',
+        'name_pattern': 'al2023-ami-2023.*-kernel-*-x86_64',
+    },
+    {
+        'label': 'Amazon Linux 2',
+        'parameter': '/aws/service/ami-amazon-linux-latest/amzn2-ami-hvm-x86_64-gp2',
+        'owner': 'amazon',
+        'name_pattern': 'amzn2-ami-hvm-*-x86_64-gp2',
+    },
+    {
+        'label': 'Ubuntu 24.04 LTS',
+        'parameter': '/aws/service/canonical/ubuntu/server/24.04/stable/current/amd64/hvm/ebs-gp3/ami-id',
+        'owner': '099720109477',
+        'name_pattern': 'ubuntu/images/hvm-ssd-gp3/ubuntu-noble-24.04-amd64-server-*',
+    },
+    {
+        'label': 'Ubuntu 22.04 LTS',
+        'parameter': '/aws/service/canonical/ubuntu/server/22.04/stable/current/amd64/hvm/ebs-gp2/ami-id',
+        'owner': '099720109477',
+        'name_pattern': 'ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*',
+    },
+    {
+        'label': 'Debian 12',
+        'parameter': '/aws/service/debian/release/12/latest/amd64',
+        'owner': '136693071363',
+        'name_pattern': 'debian-12-amd64-*',
+    },
+    {
+        'label': 'Windows Server 2022',
+        'parameter': '/aws/service/ami-windows-latest/Windows_Server-2022-English-Full-Base',
+        'owner': 'amazon',
+        'name_pattern': 'Windows_Server-2022-English-Full-Base-*',
+    },
+]
+
+# Як часто перевіряти SSM параметри (у секундах).
+DEFAULT_MAX_AGE = 60 * 60
+
+# Ліміт імен в одному виклику ssm.get_parameters.
+SSM_BATCH_SIZE = 10
+
+
+class AMICatalog:
+    """
+    Каталог актуальних AMI для регіону, збережений у базі даних.
+
+    Замість повного describe_images(Owners=['amazon']) каталог читає
+    публічні SSM параметри (один запит на 10 образів) і звертається до
+    describe_images лише для AMI, чий параметр змінив версію.
+    """
+
+    def __init__(self, ec2, ssm, region, architecture='x86_64'):
+        self.ec2 = ec2
+        self.ssm = ssm
+        self.region = region
+        self.architecture = architecture
+        self.catalog = getattr(settings, 'AWS_AMI_CATALOG', DEFAULT_CATALOG)
+        self.max_age = getattr(settings, 'AWS_AMI_CATALOG_MAX_AGE', DEFAULT_MAX_AGE)
+
+    def choices(self):
+        """Отримати список (image_id, назва) для форми, оновивши каталог за потреби."""
+        entries = list(AmiCatalogEntry.objects.filter(region=self.region).order_by('label'))
+        if self._is_stale(entries):
+            self.refresh()
+            entries = list(AmiCatalogEntry.objects.filter(region=self.region).order_by('label'))
+        return [
+            (entry.image_id, f"{entry.label} - {entry.name} ({entry.image_id})")
+            for entry in entries
+        ]
+
+    def _is_stale(self, entries):
+        if not entries:
+            return True
+        oldest = min(entry.checked_at or entry.updated_at for entry in entries)
+        return oldest < timezone.now() - timedelta(seconds=self.max_age)
+
+    def refresh(self):
+        """Інкрементально оновити каталог регіону."""
+        try:
+            latest = self._read_parameters()
+        except Exception:
+            # SSM може бути заборонений політикою IAM - шукаємо образи за фільтрами.
+            latest = {}
+        # Параметра може не бути в цьому регіоні - такі образи теж шукаємо за фільтрами.
+        latest.update(self._search_images([item for item in self.catalog if item['parameter'] not in latest]))
+
+        existing = {
+            entry.parameter: entry
+            for entry in AmiCatalogEntry.objects.filter(region=self.region)
+        }
+        changed = {
+            parameter: value
+            for parameter, value in latest.items()
+            if parameter not in existing
+            or existing[parameter].image_id != value['image_id']
+            or existing[parameter].version != value['version']
+        }
+
+        images = self._describe_images([value['image_id'] for value in changed.values()])
+        labels = {item['parameter']: item['label'] for item in self.catalog}
+        now = timezone.now()
+
+        for parameter, value in changed.items():
+            image = images.get(value['image_id'])
+            if image is None:
+                continue
+            AmiCatalogEntry.objects.update_or_create(
+                region=self.region,
+                parameter=parameter,
+                defaults={
+                    'label': labels.get(parameter, parameter),
+                    'image_id': value['image_id'],
+                    'name': image.get('Name', ''),
+                    'architecture': image.get('Architecture', ''),
+                    'creation_date': image.get('CreationDate', ''),
+                    'version': value['version'],
+                    'checked_at': now,
+                }
+            )
+
+        AmiCatalogEntry.objects.filter(region=self.region).update(checked_at=now)
+        # Видаляємо образи, яких більше немає в каталозі.
+        AmiCatalogEntry.objects.filter(region=self.region).exclude(parameter__in=labels.keys()).delete()
+
+    def _read_parameters(self):
+        """Отримати ID останніх AMI з публічних SSM параметрів."""
+        names = [item['parameter'] for item in self.catalog]
+        latest = {}
+        for start in range(0, len(names), SSM_BATCH_SIZE):
+            response = self.ssm.get_parameters(Names=names[start:start + SSM_BATCH_SIZE])
+            for parameter in response['Parameters']:
+                latest[parameter['Name']] = {
+                    'image_id': parameter['Value'],
+                    'version': parameter.get('Version', 0),
+                }
+        return latest
+
+    def _search_images(self, items):
+        """Знайти останні AMI для елементів каталогу за шаблонами імен із фільтрацією на боці AWS."""
+        latest = {}
+        for item in items:
+            paginator = self.ec2.get_paginator('describe_images')
+            pages = paginator.paginate(
+                Owners=[item['owner']],
+                Filters=[
+                    {'Name': 'name', 'Values': [item['name_pattern']]},
+                    {'Name': 'architecture', 'Values': [self.architecture]},
+                    {'Name': 'state', 'Values': ['available']},
+                ]
+            )
+            images = [image for page in pages for image in page['Images']]
+            if images:
+                newest = max(images, key=lambda x: x['CreationDate'])
+                latest[item['parameter']] = {'image_id': newest['ImageId'], 'version': 0}
+        return latest
+
+    def _describe_images(self, image_ids):
+        """Отримати метадані лише для змінених AMI."""
+        if not image_ids:
+            return {}
+        response = self.ec2.describe_images(
+            ImageIds=list(set(image_ids)),
+            Filters=[{'Name': 'state', 'Values': ['available']}]
+        )
+        return {image['ImageId']: image for image in response['Images']}
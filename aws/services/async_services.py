@@ -0,0 +1,70 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .ec2_service import EC2Service
+from .eks import EKSService
+from .s3_service import S3Service
+from .vpc import VPCService
+
+# Максимальна кількість одночасних викликів AWS з асинхронного коду в одному процесі.
+DEFAULT_MAX_WORKERS = 64
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AWS_ASYNC_MAX_WORKERS', DEFAULT_MAX_WORKERS),
+    thread_name_prefix='aws-async'
+)
+
+
+class AsyncService:
+    """
+    Асинхронна обгортка над синхронним сервісом.
+
+    Кожен виклик методу виконується у спільному пулі потоків, тож
+    корутина не блокує event loop, а розмір пулу обмежує кількість
+    одночасних запитів до AWS. boto3 клієнти потокобезпечні й беруться
+    зі спільного реєстру, тому обгортки дешеві.
+    """
+    sync_class = None
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._service = None
+
+    def _get_service(self):
+        # Сервіс створюється в пулі потоків: перше створення клієнта завантажує моделі boto3.
+        if self._service is None:
+            self._service = self.sync_class(*self._args, **self._kwargs)
+        return self._service
+
+    async def _run(self, func):
+        return await asyncio.get_running_loop().run_in_executor(executor, func)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            return await self._run(lambda: getattr(self._get_service(), name)(*args, **kwargs))
+
+        functools.update_wrapper(method, getattr(self.sync_class, name))
+        return method
+
+
+class AsyncEC2Service(AsyncService):
+    sync_class = EC2Service
+
+
+class AsyncVPCService(AsyncService):
+    sync_class = VPCService
+
+
+class AsyncEKSService(AsyncService):
+    sync_class = EKSService
+
+
+class AsyncS3Service(AsyncService):
+    sync_class = S3Service
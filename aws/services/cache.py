@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .clients import credential_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# TTL (у секундах) для кожного типу запиту; перевизначається через settings.AWS_CACHE_TTLS.
+DEFAULT_TTLS = {
+    'regions': 24 * 60 * 60,
+    'amis': 6 * 60 * 60,
+    'vpcs': 5 * 60,
+    'subnets': 5 * 60,
+    'topology': 5 * 60,
+    's3_prefix_stats': 24 * 60 * 60,
+}
+
+# Скільки секунд після закінчення TTL ще можна віддавати застарілі дані,
+# поки запис оновлюється у фоні.
+DEFAULT_STALE_TTL = 60 * 60
+
+# Максимальна тривалість фонового оновлення одного запису.
+REFRESH_LOCK_TIMEOUT = 60
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(event, name):
+    with _stats_lock:
+        _stats[event] += 1
+        _stats[f"{name}:{event}"] += 1
+
+
+def get_stats():
+    """Отримати лічильники hit/miss/stale/refresh для кешу."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_ttl(name):
+    """Отримати TTL для типу запиту."""
+    return getattr(settings, 'AWS_CACHE_TTLS', {}).get(name, DEFAULT_TTLS.get(name, 5 * 60))
+
+
+def get_stale_ttl():
+    return getattr(settings, 'AWS_CACHE_STALE_TTL', DEFAULT_STALE_TTL)
+
+
+def _generation_key(fingerprint, region, name):
+    return f"aws:gen:{fingerprint}:{region}:{name}"
+
+
+def _make_key(fingerprint, region, name, args):
+    generation = cache.get_or_set(_generation_key(fingerprint, region, name), 1, None)
+    args_digest = hashlib.md5(repr(args).encode('utf-8')).hexdigest()
+    return f"aws:{fingerprint}:{region}:{name}:{generation}:{args_digest}"
+
+
+def _store(key, name, value):
+    ttl = get_ttl(name)
+    cache.set(key, (value, time.time() + ttl), ttl + get_stale_ttl())
+
+
+def _refresh_in_background(key, name, fetch):
+    # cache.add працює як блокування: запис оновлює лише один потік/процес.
+    lock_key = f"{key}:refreshing"
+    if not cache.add(lock_key, True, REFRESH_LOCK_TIMEOUT):
+        return
+
+    def run():
+        try:
+            _store(key, name, fetch())
+            _count('refresh', name)
+        except Exception:
+            _count('refresh_error', name)
+            logger.exception(f"Помилка фонового оновлення кешу {name}")
+        finally:
+            cache.delete(lock_key)
+            # fetch() може звертатися до ORM (наприклад, каталог AMI), а з'єднання
+            # потоку Django сам не закриває.
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def cached_fetch(fingerprint, region, name, fetch, args=()):
+    """
+    Отримати значення з кешу або викликати fetch().
+
+    Свіжі дані повертаються одразу. Застарілі (TTL минув, але не минув
+    stale-період) теж повертаються одразу, а оновлення запускається у фоні.
+    """
+    key = _make_key(fingerprint, region, name, args)
+    entry = cache.get(key)
+
+    if entry is None:
+        _count('miss', name)
+        value = fetch()
+        _store(key, name, value)
+        return value
+
+    value, expires_at = entry
+    if time.time() < expires_at:
+        _count('hit', name)
+    else:
+        _count('stale', name)
+        _refresh_in_background(key, name, fetch)
+    return value
+
+
+def invalidate(fingerprint, region, *names):
+    """Скинути кеш вказаних типів запитів для облікових даних і регіону."""
+    for name in names:
+        key = _generation_key(fingerprint, region, name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def invalidate_service(service, *names):
+    """Скинути кеш для облікових даних і регіону сервісу."""
+    invalidate(credential_fingerprint(service.access_key, service.secret_key), service.region, *names)
+
+
+def cached(name):
+    """Декоратор методу сервісу, що кешує результат за обліковими даними, регіоном і аргументами."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            fingerprint = credential_fingerprint(self.access_key, self.secret_key)
+            return cached_fetch(fingerprint, self.region, name, lambda: method(self, *args, **kwargs),
+                                (args, sorted(kwargs.items())))
+        wrapper.uncached = method
+        return wrapper
+    return decorator
+
+
+def _prefix_stats_key(fingerprint, bucket_name, prefix):
+    digest = hashlib.md5(f"{bucket_name}/{prefix}".encode('utf-8')).hexdigest()
+    return f"aws:s3stats:{fingerprint}:{digest}"
+
+
+def store_prefix_stats(fingerprint, bucket_name, aggregate):
+    """Зберегти підсумки S3Service.aggregate_prefix для префікса і його підпапок."""
+    computed_at = time.time()
+    entries = {
+        _prefix_stats_key(fingerprint, bucket_name, aggregate['prefix']): {
+            'size': aggregate['size'], 'count': aggregate['count'], 'computed_at': computed_at
+        }
+    }
+    for prefix, stats in aggregate['children'].items():
+        entries[_prefix_stats_key(fingerprint, bucket_name, prefix)] = dict(stats, computed_at=computed_at)
+    cache.set_many(entries, get_ttl('s3_prefix_stats'))
+
+
+def get_prefix_stats(fingerprint, bucket_name, prefixes):
+    """Отримати збережені підсумки для списку префіксів одним запитом до кешу."""
+    keys = {_prefix_stats_key(fingerprint, bucket_name, prefix): prefix for prefix in prefixes}
+    return {keys[key]: stats for key, stats in cache.get_many(list(keys)).items()}
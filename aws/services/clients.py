@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import boto3
+from botocore.config import Config
+
+# Максимальна кількість клієнтів, які тримаємо в пам'яті процесу.
+DEFAULT_MAX_CLIENTS = 64
+
+# Розмір пулу з'єднань urllib3 для кожного клієнта.
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+# Глобальні сервіси не залежать від регіону, тому кешуються один раз.
+GLOBAL_SERVICES = {'iam'}
+
+
+def timeout_config(timeout):
+    """
+    Config, що обмежує один виклик API часом timeout (секунди).
+
+    Половина часу відводиться на з'єднання, половина - на очікування
+    відповіді. Повторів немає: повтор однаково не вклався б у той самий
+    дедлайн, а потік пулу звільняється, щойно виклик завершиться помилкою.
+    """
+    return Config(connect_timeout=timeout / 2, read_timeout=timeout / 2,
+                  retries={'mode': 'standard', 'total_max_attempts': 1})
+
+
+def credential_fingerprint(access_key, secret_key):
+    """Отримати відбиток облікових даних (без зберігання секрету в ключі кешу)."""
+    digest = hashlib.sha256(f"{access_key}:{secret_key}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ClientRegistry:
+    """
+    Спільний реєстр boto3 клієнтів на рівні процесу.
+
+    Клієнти кешуються за ключем (відбиток облікових даних, сервіс, регіон)
+    і витісняються за принципом LRU. boto3 клієнти потокобезпечні, тому
+    один клієнт (і його пул з'єднань) використовується всіма запитами.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAX_CLIENTS, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+        self.maxsize = maxsize
+        self.config = Config(max_pool_connections=max_pool_connections)
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        # boto3.Session не потокобезпечна, тому створення клієнтів іде під блокуванням.
+        self._session = boto3.session.Session()
+
+    def get(self, service, access_key, secret_key, region, timeout=None):
+        """Отримати клієнт з реєстру або створити новий (timeout - див. timeout_config)."""
+        if service in GLOBAL_SERVICES:
+            region = None
+        key = (credential_fingerprint(access_key, secret_key), service, region, timeout)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = self._session.client(
+                service,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region or 'us-east-1',
+                config=self.config if timeout is None else self.config.merge(timeout_config(timeout))
+            )
+            self._clients[key] = client
+            # Витіснені клієнти не закриваємо: ними ще можуть користуватися інші потоки.
+            while len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+            return client
+
+    def clear(self):
+        """Очистити реєстр."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+registry = ClientRegistry()
+
+
+def get_client(service, access_key, secret_key, region='us-east-1', timeout=None):
+    """Позичити boto3 клієнт зі спільного реєстру."""
+    return registry.get(service, access_key, secret_key, region, timeout)
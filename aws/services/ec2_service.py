@@ -1,63 +1,139 @@
-import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .ami_catalog import AMICatalog
+from .cache import cached
+from .clients import get_client
+from .network import build_route_table_index, is_public_route_table, iter_route_tables
+from .security_groups import DEFAULT_CIDRS, RuleSet, apply_rule_set
+
+# Кількість регіонів, які опитуються одночасно (на весь процес).
+DEFAULT_REGION_WORKERS = 20
+
+# Кількість одночасних create_tags при запуску флоту.
+FLEET_TAG_WORKERS = 10
+
+# Максимальна кількість InstanceIds в одному запиті waiter'а.
+WAITER_BATCH_SIZE = 200
+
+# Максимальна кількість InstanceIds в одному запиті describe_instance_status.
+STATUS_BATCH_SIZE = 100
+
+# Спільний пул для опитування регіонів. Окремий пул на кожен виклик
+# list_instances_all_regions (зокрема з потоку AsyncService) множив би потоки
+# на кількість одночасних запитів.
+region_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AWS_REGION_WORKERS', DEFAULT_REGION_WORKERS),
+    thread_name_prefix='aws-regions'
+)
 
 class EC2Service:
-    def __init__(self, access_key, secret_key, region='us-east-1'):
+    def __init__(self, access_key, secret_key, region='us-east-1', timeout=None):
         if not access_key or not secret_key:
             raise Exception("Облікові дані AWS відсутні.")
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
-
+        self.timeout = timeout
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
 
     def set_region(self, region):
         """Оновити регіон."""
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
 
+    def iter_vpcs(self):
+        """Ітерувати VPC посторінково."""
+        try:
+            for page in self.ec2.get_paginator('describe_vpcs').paginate():
+                for vpc in page['Vpcs']:
+                    yield {
+                        'VpcId': vpc['VpcId'],
+                        'CidrBlock': vpc['CidrBlock'],
+                        'State': vpc['State']
+                    }
+        except Exception as e:
+            raise Exception(f"Помилка отримання VPC: {str(e)}")
+
+    @cached('vpcs')
     def get_vpcs(self):
         """Отримати список VPC."""
+        return list(self.iter_vpcs())
+
+    def iter_subnets(self, vpc_id):
+        """Ітерувати сабнети VPC посторінково."""
         try:
-            response = self.ec2.describe_vpcs()
-            vpcs = [
-                {
-                    'VpcId': vpc['VpcId'],
-                    'CidrBlock': vpc['CidrBlock'],
-                    'State': vpc['State']
-                }
-                for vpc in response['Vpcs']
-            ]
-            return vpcs
+            paginator = self.ec2.get_paginator('describe_subnets')
+            for page in paginator.paginate(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]):
+                for subnet in page['Subnets']:
+                    yield {
+                        'SubnetId': subnet['SubnetId'],
+                        'CidrBlock': subnet['CidrBlock'],
+                        'AvailabilityZone': subnet['AvailabilityZone']
+                    }
         except Exception as e:
-            raise Exception(f"Помилка отримання VPC: {str(e)}")
+            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
 
+    @cached('subnets')
     def get_subnets(self, vpc_id):
         """Отримати список сабнетів для VPC."""
+        return list(self.iter_subnets(vpc_id))
+
+    @cached('topology')
+    def get_network_topology(self):
+        """
+        Отримати всі VPC регіону разом із сабнетами, зонами доступності й
+        ознакою публічності сабнетів.
+
+        VPC, сабнети й маршрутні таблиці запитуються паралельно (по одному
+        пагінованому запиту на тип), тож результат не залежить від кількості VPC.
+        """
+        def paginate(operation, key, **kwargs):
+            return [item for page in self.ec2.get_paginator(operation).paginate(**kwargs) for item in page[key]]
+
         try:
-            response = self.ec2.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])
-            subnets = [
-                {
-                    'SubnetId': subnet['SubnetId'],
-                    'CidrBlock': subnet['CidrBlock'],
-                    'AvailabilityZone': subnet['AvailabilityZone']
-                }
-                for subnet in response['Subnets']
-            ]
-            return subnets
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                vpcs = executor.submit(paginate, 'describe_vpcs', 'Vpcs')
+                subnets = executor.submit(paginate, 'describe_subnets', 'Subnets')
+                route_tables = executor.submit(lambda: list(iter_route_tables(self.ec2)))
+                vpcs, subnets, route_tables = vpcs.result(), subnets.result(), route_tables.result()
         except Exception as e:
-            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
+            raise Exception(f"Помилка отримання мережевої топології: {str(e)}")
+
+        by_subnet, main_by_vpc = build_route_table_index(route_tables)
+        subnets_by_vpc = {}
+        for subnet in sorted(subnets, key=lambda item: (item['AvailabilityZone'], item['CidrBlock'])):
+            route_table = by_subnet.get(subnet['SubnetId']) or main_by_vpc.get(subnet['VpcId'])
+            subnets_by_vpc.setdefault(subnet['VpcId'], []).append({
+                'SubnetId': subnet['SubnetId'],
+                'CidrBlock': subnet['CidrBlock'],
+                'AvailabilityZone': subnet['AvailabilityZone'],
+                'Name': self._tag(subnet, 'Name'),
+                'Public': route_table is not None and is_public_route_table(route_table),
+                'AvailableIpAddressCount': subnet.get('AvailableIpAddressCount'),
+            })
+
+        topology = []
+        for vpc in vpcs:
+            vpc_subnets = subnets_by_vpc.get(vpc['VpcId'], [])
+            topology.append({
+                'VpcId': vpc['VpcId'],
+                'CidrBlock': vpc['CidrBlock'],
+                'State': vpc['State'],
+                'Name': self._tag(vpc, 'Name'),
+                'IsDefault': vpc.get('IsDefault', False),
+                'AvailabilityZones': sorted({subnet['AvailabilityZone'] for subnet in vpc_subnets}),
+                'Subnets': vpc_subnets,
+            })
+        return topology
+
+    @staticmethod
+    def _tag(resource, key):
+        return next((tag['Value'] for tag in resource.get('Tags', []) if tag['Key'] == key), '')
 
     def create_key_pair(self, key_name):
         """Створити нову пару SSH ключів."""
@@ -70,6 +146,7 @@ class EC2Service:
         except Exception as e:
             raise Exception(f"Помилка створення SSH ключа: {str(e)}")
 
+    @cached('regions')
     def get_regions(self):
         """Отримати список доступних регіонів."""
         response = self.ec2.describe_regions()
@@ -83,32 +160,116 @@ class EC2Service:
             ('t2.medium', 't2.medium (2 vCPU, 4GB RAM)'),
         ]
 
-    def get_amis(self):
-        """Отримати список доступних AMI (образів систем)."""
-        response = self.ec2.describe_images(Owners=['amazon'])
-        amis = [
-            (image['ImageId'], f"{image['Name']} ({image['ImageId']})")
-            for image in sorted(response['Images'], key=lambda x: x['CreationDate'], reverse=True)
-        ]
-        return amis[:10] 
+    def iter_images(self, **kwargs):
+        """Ітерувати образи (AMI) посторінково."""
+        for page in self.ec2.get_paginator('describe_images').paginate(**kwargs):
+            yield from page['Images']
+
+    @cached('amis')
+    def get_amis(self, limit=10):
+        """Отримати список доступних AMI (образів систем) з каталогу регіону."""
+        ssm = get_client('ssm', self.access_key, self.secret_key, self.region, self.timeout)
+        return AMICatalog(self.ec2, ssm, self.region).choices()[:limit]
+
+    def iter_instances(self, **kwargs):
+        """Ітерувати EC2 інстанси посторінково."""
+        try:
+            for page in self.ec2.get_paginator('describe_instances').paginate(**kwargs):
+                for reservation in page['Reservations']:
+                    for instance in reservation['Instances']:
+                        yield self._format_instance(instance)
+        except Exception as e:
+            raise Exception(f"Помилка отримання списку інстансів: {str(e)}")
 
     def list_instances(self):
         """Отримати список EC2 інстансів."""
+        return list(self.iter_instances())
+
+    def list_instances_all_regions(self, regions=None):
+        """
+        Отримати EC2 інстанси з усіх регіонів паралельно (у спільному пулі region_executor).
+
+        :param regions: Список регіонів; за замовчуванням усі регіони з get_regions().
+        :return: Словник з об'єднаним списком інстансів і звітом по кожному регіону
+                 (кількість, тривалість, помилка).
+        """
+        started = time.monotonic()
+        if regions is None:
+            regions = [region for region, _ in self.get_regions()]
+
+        def fetch(region):
+            region_started = time.monotonic()
+            try:
+                service = EC2Service(self.access_key, self.secret_key, region=region, timeout=self.timeout)
+                return region, service.list_instances(), None, time.monotonic() - region_started
+            except Exception as e:
+                return region, [], str(e), time.monotonic() - region_started
+
+        instances = []
+        report = {}
+        for region, region_instances, error, duration in region_executor.map(fetch, regions):
+            instances.extend(region_instances)
+            report[region] = {
+                'count': len(region_instances),
+                'duration': round(duration, 3),
+                'error': error
+            }
+
+        return {
+            'instances': instances,
+            'regions': report,
+            'duration': round(time.monotonic() - started, 3)
+        }
+
+    def _describe_status_batch(self, instance_ids):
+        states = {}
+        paginator = self.ec2.get_paginator('describe_instance_status')
+        try:
+            for page in paginator.paginate(InstanceIds=instance_ids, IncludeAllInstances=True):
+                for status in page['InstanceStatuses']:
+                    states[status['InstanceId']] = {
+                        'State': status['InstanceState']['Name'],
+                        'InstanceStatus': status.get('InstanceStatus', {}).get('Status'),
+                        'SystemStatus': status.get('SystemStatus', {}).get('Status'),
+                    }
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidInstanceID.NotFound':
+                raise
+            if len(instance_ids) == 1:
+                return {}
+            # Один неіснуючий ID ламає весь пакет - ділимо пакет навпіл.
+            middle = len(instance_ids) // 2
+            states.update(self._describe_status_batch(instance_ids[:middle]))
+            states.update(self._describe_status_batch(instance_ids[middle:]))
+        return states
+
+    def describe_instance_states(self, instance_ids):
+        """
+        Отримати стан і перевірки статусу для списку інстансів.
+
+        Запити йдуть пакетами по STATUS_BATCH_SIZE ID (обмеження API).
+        Інстанси, яких AWS уже не повертає, позначаються як 'terminated'.
+        """
+        instance_ids = list(instance_ids)
+        states = {}
         try:
-            response = self.ec2.describe_instances()
-            instances = []
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instances.append({
-                        'InstanceId': instance['InstanceId'],
-                        'State': instance['State']['Name'],
-                        'Type': instance['InstanceType'],
-                        'Region': instance['Placement']['AvailabilityZone']
-                    })
-            return instances
+            for start in range(0, len(instance_ids), STATUS_BATCH_SIZE):
+                states.update(self._describe_status_batch(instance_ids[start:start + STATUS_BATCH_SIZE]))
         except Exception as e:
-            raise Exception(f"Помилка отримання списку інстансів: {str(e)}")
+            raise Exception(f"Помилка отримання стану інстансів: {str(e)}")
+        for instance_id in instance_ids:
+            states.setdefault(instance_id, {'State': 'terminated', 'InstanceStatus': None, 'SystemStatus': None})
+        return states
 
+    def _format_instance(self, instance):
+        """Привести опис інстансу до формату, який використовують шаблони."""
+        return {
+            'InstanceId': instance['InstanceId'],
+            'State': instance['State']['Name'],
+            'Type': instance['InstanceType'],
+            'Region': instance['Placement']['AvailabilityZone'],
+            'RegionName': self.region
+        }
 
     def create_security_group(self, group_name, description, vpc_id):
         """Створити групу безпеки."""
@@ -122,65 +283,179 @@ class EC2Service:
         except Exception as e:
             raise Exception(f"Помилка створення Security Group: {str(e)}")
 
-    def authorize_security_group(self, group_id, ports):
-        """Відкрити порти в групі безпеки."""
+    def authorize_security_group(self, group_id, ports, cidrs=DEFAULT_CIDRS, revoke_extra=False):
+        """
+        Відкрити порти в групі безпеки одним викликом API.
+
+        :param ports: Порти, діапазони ("8000-8100") або "протокол:порт" ("udp:53"),
+                      чи готовий RuleSet.
+        :return: Кількість доданих, відкликаних і незмінених правил.
+        """
+        rule_set = ports if isinstance(ports, RuleSet) else RuleSet().allow(ports, cidrs=cidrs)
         try:
-            for port in ports:
-                self.ec2.authorize_security_group_ingress(
-                    GroupId=group_id,
-                    IpProtocol='tcp',
-                    FromPort=port,
-                    ToPort=port,
-                    CidrIp='0.0.0.0/0'
-                )
+            return apply_rule_set(self.ec2, group_id, rule_set, revoke_extra=revoke_extra)
         except Exception as e:
             raise Exception(f"Помилка авторизації Security Group: {str(e)}")
 
-
     def authorize_security_group_ingress(self, group_id, ports):
-        """Дозволити трафік для певних портів."""
-        try:
-            for port in ports:
-                self.ec2.authorize_security_group_ingress(
-                    GroupId=group_id,
-                    IpProtocol='tcp',
-                    FromPort=port,
-                    ToPort=port,
-                    CidrIp='0.0.0.0/0'
-                )
-        except Exception as e:
-            raise Exception(f"Помилка дозволу портів: {str(e)}")
+        """Дозволити трафік для певних портів (синонім authorize_security_group)."""
+        return self.authorize_security_group(group_id, ports)
 
-    def create_instance(self, instance_type, ami_id, volume_size, instance_name, ssh_key_name, sg_id, subnet_id):
-        """Створити новий EC2 інстанс."""
-        try:
-            response = self.ec2.run_instances(
-                ImageId=ami_id,
-                InstanceType=instance_type,
-                MinCount=1,
-                MaxCount=1,
-                KeyName=ssh_key_name,
-                SubnetId=subnet_id,
-                SecurityGroupIds=[sg_id],
-                BlockDeviceMappings=[
-                    {
-                        'DeviceName': '/dev/xvda',
-                        'Ebs': {
-                            'VolumeSize': volume_size,
-                            'DeleteOnTermination': True,
-                            'VolumeType': 'gp2'
-                        }
-                    }
-                ],
-                TagSpecifications=[
-                    {
-                        'ResourceType': 'instance',
-                        'Tags': [{'Key': 'Name', 'Value': instance_name}]
+    def _launch_params(self, instance_type, ami_id, volume_size, ssh_key_name, sg_id, subnet_id, tags):
+        """Спільні параметри run_instances для одиночного запуску і флоту."""
+        return {
+            'ImageId': ami_id,
+            'InstanceType': instance_type,
+            'KeyName': ssh_key_name,
+            'SubnetId': subnet_id,
+            'SecurityGroupIds': [sg_id],
+            'BlockDeviceMappings': [
+                {
+                    'DeviceName': '/dev/xvda',
+                    'Ebs': {
+                        'VolumeSize': volume_size,
+                        'DeleteOnTermination': True,
+                        'VolumeType': 'gp2'
                     }
-                ]
-            )
+                }
+            ],
+            'TagSpecifications': [
+                {
+                    'ResourceType': 'instance',
+                    'Tags': [{'Key': key, 'Value': value} for key, value in tags.items()]
+                }
+            ]
+        }
+
+    def create_instance(self, instance_type, ami_id, volume_size, instance_name, ssh_key_name, sg_id, subnet_id,
+                        client_token=None):
+        """
+        Створити новий EC2 інстанс.
+
+        :param client_token: Ключ ідемпотентності run_instances: повторний запит з тим самим
+            ключем (наприклад, повторна відправка форми) повертає вже запущений інстанс.
+        """
+        try:
+            params = self._launch_params(instance_type, ami_id, volume_size, ssh_key_name, sg_id, subnet_id,
+                                         {'Name': instance_name})
+            if client_token:
+                params['ClientToken'] = client_token
+            response = self.ec2.run_instances(MinCount=1, MaxCount=1, **params)
             instance_id = response['Instances'][0]['InstanceId']
             return instance_id
         except Exception as e:
             raise Exception(f"Помилка створення інстансу: {str(e)}")
 
+    def ensure_key_pair(self, key_name, public_key_material=None):
+        """
+        Отримати існуючу пару ключів або створити (імпортувати) нову.
+
+        :return: Матеріал приватного ключа, якщо ключ щойно створено, інакше None.
+        """
+        try:
+            self.ec2.describe_key_pairs(KeyNames=[key_name])
+            return None
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidKeyPair.NotFound':
+                raise Exception(f"Помилка перевірки SSH ключа: {str(e)}")
+
+        if public_key_material:
+            self.ec2.import_key_pair(KeyName=key_name, PublicKeyMaterial=public_key_material)
+            return None
+        return self.create_key_pair(key_name)['KeyMaterial']
+
+    def ensure_security_group(self, group_name, vpc_id, ports, description="Security Group"):
+        """Знайти групу безпеки за назвою у VPC (або створити) і застосувати до неї правила."""
+        response = self.ec2.describe_security_groups(Filters=[
+            {'Name': 'group-name', 'Values': [group_name]},
+            {'Name': 'vpc-id', 'Values': [vpc_id]},
+        ])
+        if response['SecurityGroups']:
+            group_id = response['SecurityGroups'][0]['GroupId']
+        else:
+            group_id = self.create_security_group(group_name, description, vpc_id)
+        if ports:
+            self.authorize_security_group(group_id, ports)
+        return group_id
+
+    def launch_fleet(self, instance_type, ami_id, count, subnet_ids, sg_id, ssh_key_name, name_prefix,
+                     volume_size=8, allow_partial=False, wait=True, on_event=None, client_token=None):
+        """
+        Запустити count інстансів, рівномірно розподілених між сабнетами.
+
+        На кожен сабнет виконується один run_instances з MinCount/MaxCount,
+        запити до різних сабнетів (зон доступності) йдуть паралельно. Імена
+        "<name_prefix>-N" проставляються паралельно, а очікування запуску -
+        один waiter instance_running на всі інстанси.
+
+        :param allow_partial: Дозволити запуск меншої кількості інстансів, якщо не вистачає ємності.
+        :param client_token: Ключ ідемпотентності: повторний запуск (наприклад, після перезапуску
+            завдання) з тим самим ключем не створює нових інстансів.
+        :return: Словник з fleet_id, ID інстансів, розподілом по сабнетах і помилками.
+        """
+        if count < 1 or not subnet_ids:
+            raise Exception("Потрібно вказати кількість інстансів і хоча б один сабнет.")
+
+        fleet_id = f"{name_prefix}-{uuid.uuid4().hex[:8]}"
+        per_subnet = {subnet_id: count // len(subnet_ids) for subnet_id in subnet_ids}
+        for subnet_id in subnet_ids[:count % len(subnet_ids)]:
+            per_subnet[subnet_id] += 1
+        per_subnet = {subnet_id: amount for subnet_id, amount in per_subnet.items() if amount}
+
+        def emit(**event):
+            if on_event is not None:
+                on_event(event)
+
+        def launch(subnet_id, amount):
+            params = self._launch_params(instance_type, ami_id, volume_size, ssh_key_name, sg_id, subnet_id,
+                                         {'Name': name_prefix, 'Fleet': fleet_id})
+            if client_token:
+                # Окремий ключ на кожен сабнет: це різні запити run_instances.
+                params['ClientToken'] = f"{client_token}:{subnet_id}"
+            response = self.ec2.run_instances(
+                MinCount=1 if allow_partial else amount,
+                MaxCount=amount,
+                **params
+            )
+            return [instance['InstanceId'] for instance in response['Instances']]
+
+        subnets = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=len(per_subnet)) as executor:
+            futures = {executor.submit(launch, subnet_id, amount): subnet_id for subnet_id, amount in per_subnet.items()}
+            for future in as_completed(futures):
+                subnet_id = futures[future]
+                try:
+                    subnets[subnet_id] = future.result()
+                    emit(status='launched', subnet_id=subnet_id, count=len(subnets[subnet_id]))
+                except Exception as e:
+                    errors[subnet_id] = str(e)
+                    emit(status='failed', subnet_id=subnet_id, error=str(e))
+
+        instance_ids = [instance_id for subnet_id in per_subnet for instance_id in subnets.get(subnet_id, [])]
+        if not instance_ids:
+            raise Exception(f"Помилка запуску інстансів: {'; '.join(errors.values())}")
+
+        # Унікальні імена потребують окремого create_tags на кожен інстанс.
+        with ThreadPoolExecutor(max_workers=min(FLEET_TAG_WORKERS, len(instance_ids))) as executor:
+            list(executor.map(
+                lambda item: self.ec2.create_tags(
+                    Resources=[item[1]], Tags=[{'Key': 'Name', 'Value': f"{name_prefix}-{item[0]}"}]
+                ),
+                enumerate(instance_ids, start=1)
+            ))
+        emit(status='tagged', count=len(instance_ids))
+
+        if wait:
+            waiter = self.ec2.get_waiter('instance_running')
+            for start in range(0, len(instance_ids), WAITER_BATCH_SIZE):
+                waiter.wait(InstanceIds=instance_ids[start:start + WAITER_BATCH_SIZE],
+                            WaiterConfig={'Delay': 10, 'MaxAttempts': 60})
+            emit(status='running', count=len(instance_ids))
+
+        return {
+            'fleet_id': fleet_id,
+            'instances': instance_ids,
+            'subnets': subnets,
+            'errors': errors,
+        }
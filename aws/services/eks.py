@@ -1,97 +1,80 @@
-import boto3
 import json
+import time
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
+from .cache import cached
+from .clients import get_client
+from .network import classify_subnets, iter_route_tables
+
 
 class EKSService:
-    def __init__(self, access_key, secret_key, region='us-east-1'):
+    def __init__(self, access_key, secret_key, region='us-east-1', timeout=None):
         if not access_key or not secret_key:
             raise Exception("Облікові дані AWS відсутні.")
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
-        self.eks = boto3.client(
-            'eks',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
-        self.iam = boto3.client(
-            'iam',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
+        self.timeout = timeout
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
+        self.eks = get_client('eks', self.access_key, self.secret_key, self.region, self.timeout)
+        self.iam = get_client('iam', self.access_key, self.secret_key, self.region, self.timeout)
 
     def set_region(self, region):
         """Оновити регіон."""
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
-        self.eks = boto3.client(
-            'eks',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
-        self.iam = boto3.client(
-            'iam',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
+        self.eks = get_client('eks', self.access_key, self.secret_key, self.region, self.timeout)
+        self.iam = get_client('iam', self.access_key, self.secret_key, self.region, self.timeout)
 
+    @cached('regions')
     def get_regions(self):
         """Отримати список доступних регіонів."""
         response = self.ec2.describe_regions()
         return [(region['RegionName'], region['RegionName']) for region in response['Regions']]
 
+    def iter_vpcs(self):
+        """Ітерувати VPC посторінково."""
+        try:
+            for page in self.ec2.get_paginator('describe_vpcs').paginate():
+                for vpc in page['Vpcs']:
+                    yield {
+                        'VpcId': vpc['VpcId'],
+                        'CidrBlock': vpc['CidrBlock'],
+                        'State': vpc['State']
+                    }
+        except Exception as e:
+            raise Exception(f"Помилка отримання VPC: {str(e)}")
+
+    @cached('vpcs')
     def get_vpcs(self):
         """Отримати список VPC."""
+        return list(self.iter_vpcs())
+
+    def classify_subnets(self, vpc_id):
+        """Розділити сабнети VPC на публічні та приватні одним проходом."""
         try:
-            response = self.ec2.describe_vpcs()
-            return [
-                {
-                    'VpcId': vpc['VpcId'],
-                    'CidrBlock': vpc['CidrBlock']
-                }
-                for vpc in response['Vpcs']
+            paginator = self.ec2.get_paginator('describe_subnets')
+            subnets = [
+                subnet
+                for page in paginator.paginate(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])
+                for subnet in page['Subnets']
             ]
+            return classify_subnets(subnets, iter_route_tables(self.ec2, [vpc_id]))
         except Exception as e:
-            raise Exception(f"Помилка отримання VPC: {str(e)}")
+            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
 
     def get_subnets_by_type(self, vpc_id, subnet_type):
         """Отримати сабнети за типом (публічний/приватний)."""
-        try:
-            subnets = self.ec2.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets']
-            if subnet_type == 'public':
-                return [subnet for subnet in subnets if self.is_public_subnet(subnet['SubnetId'])]
-            elif subnet_type == 'private':
-                return [subnet for subnet in subnets if not self.is_public_subnet(subnet['SubnetId'])]
-            else:
-                raise ValueError("Невідомий тип сабнету")
-        except Exception as e:
-            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
+        if subnet_type not in ('public', 'private'):
+            raise Exception("Помилка отримання сабнетів: Невідомий тип сабнету")
+        return self.classify_subnets(vpc_id)[subnet_type]
 
     def is_public_subnet(self, subnet_id):
         """Перевірити, чи сабнет є публічним."""
         try:
-            route_tables = self.ec2.describe_route_tables(Filters=[{'Name': 'association.subnet-id', 'Values': [subnet_id]}])
-            for route_table in route_tables['RouteTables']:
-                for route in route_table['Routes']:
-                    if 'GatewayId' in route and route['GatewayId'].startswith('igw-'):
-                        return True
-            return False
+            subnets = self.ec2.describe_subnets(SubnetIds=[subnet_id])['Subnets']
+            route_tables = iter_route_tables(self.ec2, [subnet['VpcId'] for subnet in subnets])
+            return bool(classify_subnets(subnets, route_tables)['public'])
         except Exception as e:
             raise Exception(f"Помилка перевірки сабнету: {str(e)}")
 
@@ -119,54 +102,141 @@ class EKSService:
         except self.iam.exceptions.NoSuchEntityException:
             return self.create_eks_node_role()
 
-    def create_eks_cluster(self, cluster_name, vpc_id, subnets, cluster_type):
-        """Створити EKS кластер."""
+    def plan_eks_cluster(self, cluster_name, cluster_type):
+        """
+        Порівняти бажаний кластер з існуючим.
+
+        :return: Словник з дією (create, keep або update), змінами конфігурації і поточним статусом.
+        """
+        desired = {
+            'endpointPublicAccess': cluster_type == 'public',
+            'endpointPrivateAccess': cluster_type == 'private'
+        }
         try:
-            response = self.eks.create_cluster(
-                name=cluster_name,
-                roleArn=self.get_eks_role_arn(),
-                resourcesVpcConfig={
-                    'subnetIds': [subnet['SubnetId'] for subnet in subnets],
-                    'endpointPublicAccess': cluster_type == 'public',
-                    'endpointPrivateAccess': cluster_type == 'private'
-                }
-            )
+            cluster = self.eks.describe_cluster(name=cluster_name)['cluster']
+        except self.eks.exceptions.ResourceNotFoundException:
+            return {'action': 'create', 'changes': desired, 'status': None}
+
+        config = cluster['resourcesVpcConfig']
+        changes = {key: value for key, value in desired.items() if config.get(key) != value}
+        return {'action': 'update' if changes else 'keep', 'changes': changes, 'status': cluster['status']}
+
+    def create_eks_cluster(self, cluster_name, vpc_id, subnets, cluster_type, on_event=None):
+        """
+        Створити EKS кластер.
+
+        Якщо кластер з такою назвою вже існує, він не створюється повторно:
+        змінюється лише доступ до endpoint (за потреби), після чого
+        очікується стан ACTIVE.
+        """
+        try:
+            plan = self.plan_eks_cluster(cluster_name, cluster_type)
+            if plan['status'] in ('FAILED', 'DELETING'):
+                raise Exception(f"Кластер {cluster_name} у стані {plan['status']}")
+
+            if plan['action'] == 'create':
+                try:
+                    response = self.eks.create_cluster(
+                        name=cluster_name,
+                        roleArn=self.get_eks_role_arn(),
+                        resourcesVpcConfig={
+                            'subnetIds': [subnet['SubnetId'] for subnet in subnets],
+                            **plan['changes']
+                        }
+                    )
+                    status = response['cluster']['status']
+                except self.eks.exceptions.ResourceInUseException:
+                    # Кластер створено паралельним запитом - далі лише чекаємо на нього.
+                    status = 'EXISTS'
+                if on_event is not None:
+                    on_event({'step': 'cluster', 'status': status})
+            else:
+                if on_event is not None:
+                    on_event({'step': 'cluster', 'status': plan['status'], 'action': plan['action']})
+                if plan['action'] == 'update':
+                    # Оновлення конфігурації можливе лише для активного кластера.
+                    self.wait_for_cluster(cluster_name, on_event=on_event)
+                    self.eks.update_cluster_config(name=cluster_name, resourcesVpcConfig=plan['changes'])
 
             # Очікування стану кластера ACTIVE
-            waiter = self.eks.get_waiter('cluster_active')
-            waiter.wait(name=cluster_name)
+            self.wait_for_cluster(cluster_name, on_event=on_event)
+            if plan['action'] == 'keep':
+                return f"Кластер {cluster_name} вже існує."
+            if plan['action'] == 'update':
+                return f"Кластер {cluster_name} оновлено!"
             return f"Кластер {cluster_name} успішно створено!"
         except Exception as e:
             raise Exception(f"Помилка створення EKS кластеру: {str(e)}")
 
+    def wait_for_cluster(self, cluster_name, on_event=None, delay=30, max_attempts=40):
+        """
+        Дочекатися стану ACTIVE, повідомляючи про кожну зміну статусу.
+
+        Інтервали такі самі, як у waiter'а cluster_active.
+        """
+        status = None
+        for _ in range(max_attempts):
+            cluster = self.eks.describe_cluster(name=cluster_name)['cluster']
+            if cluster['status'] != status:
+                status = cluster['status']
+                if on_event is not None:
+                    on_event({'step': 'cluster', 'status': status})
+            if status == 'ACTIVE':
+                return cluster
+            if status in ('FAILED', 'DELETING'):
+                raise Exception(f"Кластер {cluster_name} перейшов у стан {status}")
+            time.sleep(delay)
+        raise Exception(f"Кластер {cluster_name} не став активним вчасно")
+
     def create_node_group(self, cluster_name, node_group_name, instance_type, node_count, subnets):
-        """Створити нод-пул."""
+        """Створити нод-пул (існуючий нод-пул лише масштабується до node_count)."""
+        scaling_config = {
+            'minSize': 1,
+            'maxSize': node_count,
+            'desiredSize': node_count
+        }
         try:
-            response = self.eks.create_nodegroup(
-                clusterName=cluster_name,
-                nodegroupName=node_group_name,
-                scalingConfig={
-                    'minSize': 1,
-                    'maxSize': node_count,
-                    'desiredSize': node_count
-                },
-                subnets=[subnet['SubnetId'] for subnet in subnets],
-                instanceTypes=[instance_type],
-                nodeRole=self.get_eks_node_role_arn()
+            try:
+                node_group = self.eks.describe_nodegroup(
+                    clusterName=cluster_name, nodegroupName=node_group_name
+                )['nodegroup']
+            except self.eks.exceptions.ResourceNotFoundException:
+                node_group = None
+
+            if node_group is None:
+                self.eks.create_nodegroup(
+                    clusterName=cluster_name,
+                    nodegroupName=node_group_name,
+                    scalingConfig=scaling_config,
+                    subnets=[subnet['SubnetId'] for subnet in subnets],
+                    instanceTypes=[instance_type],
+                    nodeRole=self.get_eks_node_role_arn()
+                )
+                return f"Нод-пул {node_group_name} успішно створено!"
+
+            if node_group['scalingConfig'] == scaling_config:
+                return f"Нод-пул {node_group_name} вже існує."
+            self.eks.update_nodegroup_config(
+                clusterName=cluster_name, nodegroupName=node_group_name, scalingConfig=scaling_config
             )
-            return f"Нод-пул {node_group_name} успішно створено!"
+            return f"Нод-пул {node_group_name} масштабовано до {node_count} нод."
         except Exception as e:
             raise Exception(f"Помилка створення нод-пулу: {str(e)}")
 
 
-    def get_clusters(self):
-        """Отримати список існуючих кластерів."""
+    def iter_clusters(self):
+        """Ітерувати існуючі кластери посторінково."""
         try:
-            clusters = self.eks.list_clusters()['clusters']
-            return [{'name': cluster} for cluster in clusters]
+            for page in self.eks.get_paginator('list_clusters').paginate():
+                for cluster in page['clusters']:
+                    yield {'name': cluster}
         except Exception as e:
             raise Exception(f"Помилка отримання списку кластерів: {str(e)}")
 
+    def get_clusters(self):
+        """Отримати список існуючих кластерів."""
+        return list(self.iter_clusters())
+
     def get_subnets_from_cluster(self, cluster_name):
         """Отримати сабнети, пов’язані з EKS кластером."""
         try:
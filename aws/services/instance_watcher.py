@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import Counter
+
+from .async_services import AsyncEC2Service
+from .clients import credential_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Інтервал опитування: мінімальний (є зміни або перехідні стани) і максимальний (усе стабільно).
+MIN_POLL_INTERVAL = 2.0
+MAX_POLL_INTERVAL = 60.0
+
+# Стани, під час яких інстанс скоро зміниться, тож опитування не сповільнюється.
+TRANSITIONAL_STATES = {'pending', 'stopping', 'shutting-down'}
+
+# Скільки змін може накопичитися в черзі повільного глядача.
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+_pollers = {}
+
+
+class Subscription:
+    """Підписка глядача на зміни стану набору інстансів."""
+
+    def __init__(self, poller, instance_ids):
+        self.poller = poller
+        self.instance_ids = set(instance_ids)
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, instance_id, state):
+        try:
+            self.queue.put_nowait((instance_id, state))
+        except asyncio.QueueFull:
+            logger.warning(f"Черга змін стану переповнена, подію {instance_id} пропущено")
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.poller.unsubscribe(self)
+
+
+class RegionPoller:
+    """
+    Спільний опитувач стану інстансів для облікових даних і регіону.
+
+    Усі глядачі регіону (вкладки, користувачі з тими самими ключами)
+    отримують зміни від одного циклу опитування: ID усіх підписок
+    об'єднуються й опитуються пакетами describe_instance_status. Інтервал
+    подвоюється, поки нічого не змінюється, і скидається до мінімального
+    при зміні або перехідному стані.
+    """
+
+    def __init__(self, key, access_key, secret_key, region):
+        self.key = key
+        self.region = region
+        self.ec2_service = AsyncEC2Service(access_key, secret_key, region=region)
+        self.subscriptions = set()
+        self.watched = Counter()
+        self.states = {}
+        self.interval = MIN_POLL_INTERVAL
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def subscribe(self, instance_ids):
+        subscription = Subscription(self, instance_ids)
+        self.subscriptions.add(subscription)
+        self.watched.update(subscription.instance_ids)
+        # Уже відомі стани віддаються одразу, нові ID опитуються без очікування.
+        for instance_id in subscription.instance_ids:
+            if instance_id in self.states:
+                subscription.push(instance_id, self.states[instance_id])
+        self.interval = MIN_POLL_INTERVAL
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription not in self.subscriptions:
+            return
+        self.subscriptions.discard(subscription)
+        self.watched.subtract(subscription.instance_ids)
+        for instance_id in subscription.instance_ids:
+            if self.watched[instance_id] <= 0:
+                del self.watched[instance_id]
+                self.states.pop(instance_id, None)
+        if not self.subscriptions:
+            self._wakeup.set()
+
+    async def poll(self):
+        """Одне опитування всіх інстансів, за якими стежать; повертає кількість змін."""
+        states = await self.ec2_service.describe_instance_states(list(self.watched))
+        changes = 0
+        for instance_id, state in states.items():
+            if self.states.get(instance_id) == state or instance_id not in self.watched:
+                continue
+            changes += 1
+            self.states[instance_id] = state
+            for subscription in self.subscriptions:
+                if instance_id in subscription.instance_ids:
+                    subscription.push(instance_id, state)
+        transitional = any(state['State'] in TRANSITIONAL_STATES for state in self.states.values())
+        if changes or transitional:
+            self.interval = MIN_POLL_INTERVAL
+        else:
+            self.interval = min(self.interval * 2, MAX_POLL_INTERVAL)
+        return changes
+
+    async def run(self):
+        try:
+            while self.subscriptions:
+                self._wakeup.clear()
+                try:
+                    await self.poll()
+                except Exception as e:
+                    # Помилки (у т.ч. throttling) лише сповільнюють опитування.
+                    logger.warning(f"Помилка опитування стану інстансів ({self.region}): {e}")
+                    self.interval = min(self.interval * 2, MAX_POLL_INTERVAL)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if _pollers.get(self.key) is self and not self.subscriptions:
+                del _pollers[self.key]
+
+
+def watch_instances(access_key, secret_key, region, instance_ids):
+    """
+    Підписатися на зміни стану інстансів через спільний опитувач регіону.
+
+    Опитувач прив'язаний до поточного event loop (під ASGI він один на процес).
+    """
+    key = (credential_fingerprint(access_key, secret_key), region, id(asyncio.get_running_loop()))
+    poller = _pollers.get(key)
+    if poller is None:
+        poller = _pollers[key] = RegionPoller(key, access_key, secret_key, region)
+    return poller.subscribe(instance_ids)
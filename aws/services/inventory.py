@@ -0,0 +1,249 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    InventoryCluster, InventoryInstance, InventorySearchEntry, InventorySecurityGroup, InventorySubnet,
+    InventorySync, InventoryVpc
+)
+from .clients import get_client
+from .inventory_search import reindex
+
+# Кількість одночасних describe_cluster запитів.
+CLUSTER_DESCRIBE_WORKERS = 8
+
+BATCH_SIZE = 500
+
+
+def _normalize(data):
+    """Привести опис ресурсу до JSON-сумісного вигляду (datetime -> рядок)."""
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def fingerprint(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _tags(resource):
+    return {tag['Key']: tag['Value'] for tag in resource.get('Tags', [])}
+
+
+def _instance_fields(instance):
+    tags = _tags(instance)
+    return {
+        'resource_id': instance['InstanceId'],
+        'name': tags.get('Name', ''),
+        'state': instance['State']['Name'],
+        'tags': tags,
+        'instance_type': instance.get('InstanceType', ''),
+        'availability_zone': instance.get('Placement', {}).get('AvailabilityZone', ''),
+        'vpc_id': instance.get('VpcId', ''),
+        'subnet_id': instance.get('SubnetId', ''),
+        'private_ip': instance.get('PrivateIpAddress'),
+        'public_ip': instance.get('PublicIpAddress'),
+        'security_groups': [group['GroupId'] for group in instance.get('SecurityGroups', [])],
+    }
+
+
+def _vpc_fields(vpc):
+    tags = _tags(vpc)
+    return {
+        'resource_id': vpc['VpcId'],
+        'name': tags.get('Name', ''),
+        'state': vpc.get('State', ''),
+        'tags': tags,
+        'cidr_block': vpc['CidrBlock'],
+        'is_default': vpc.get('IsDefault', False),
+    }
+
+
+def _subnet_fields(subnet):
+    tags = _tags(subnet)
+    return {
+        'resource_id': subnet['SubnetId'],
+        'name': tags.get('Name', ''),
+        'state': subnet.get('State', ''),
+        'tags': tags,
+        'vpc_id': subnet['VpcId'],
+        'cidr_block': subnet['CidrBlock'],
+        'availability_zone': subnet.get('AvailabilityZone', ''),
+        'map_public_ip_on_launch': subnet.get('MapPublicIpOnLaunch', False),
+    }
+
+
+def _security_group_fields(group):
+    tags = _tags(group)
+    return {
+        'resource_id': group['GroupId'],
+        'name': tags.get('Name', group['GroupName']),
+        'state': '',
+        'tags': tags,
+        'group_name': group['GroupName'],
+        'vpc_id': group.get('VpcId', ''),
+        'description': group.get('Description', '')[:255],
+    }
+
+
+def _cluster_fields(cluster):
+    return {
+        'resource_id': cluster['name'],
+        'name': cluster['name'],
+        'state': cluster.get('status', ''),
+        'tags': cluster.get('tags', {}),
+        'version': cluster.get('version', ''),
+        'vpc_id': cluster.get('resourcesVpcConfig', {}).get('vpcId', ''),
+        'endpoint': cluster.get('endpoint', ''),
+    }
+
+
+class InventorySyncer:
+    """
+    Синхронізація локального індексу ресурсів одного регіону.
+
+    Ресурси кожного типу завантажуються з AWS паралельно, а в базу
+    записуються лише зміни: нові ресурси створюються, змінені (за
+    fingerprint) оновлюються, зниклі видаляються.
+    """
+
+    def __init__(self, user, access_key, secret_key, region='us-east-1'):
+        self.user = user
+        self.region = region
+        self.ec2 = get_client('ec2', access_key, secret_key, region)
+        self.eks = get_client('eks', access_key, secret_key, region)
+        self.resources = {
+            'instances': (InventoryInstance, self._fetch_instances, _instance_fields),
+            'vpcs': (InventoryVpc, self._fetch_vpcs, _vpc_fields),
+            'subnets': (InventorySubnet, self._fetch_subnets, _subnet_fields),
+            'security_groups': (InventorySecurityGroup, self._fetch_security_groups, _security_group_fields),
+            'clusters': (InventoryCluster, self._fetch_clusters, _cluster_fields),
+        }
+
+    def _paginate(self, operation, key):
+        for page in self.ec2.get_paginator(operation).paginate():
+            yield from page[key]
+
+    def _fetch_instances(self):
+        instances = []
+        for reservation in self._paginate('describe_instances', 'Reservations'):
+            instances.extend(reservation['Instances'])
+        return instances
+
+    def _fetch_vpcs(self):
+        return list(self._paginate('describe_vpcs', 'Vpcs'))
+
+    def _fetch_subnets(self):
+        return list(self._paginate('describe_subnets', 'Subnets'))
+
+    def _fetch_security_groups(self):
+        return list(self._paginate('describe_security_groups', 'SecurityGroups'))
+
+    def _fetch_clusters(self):
+        names = []
+        for page in self.eks.get_paginator('list_clusters').paginate():
+            names.extend(page['clusters'])
+        if not names:
+            return []
+        with ThreadPoolExecutor(max_workers=min(CLUSTER_DESCRIBE_WORKERS, len(names))) as executor:
+            return list(executor.map(lambda name: self.eks.describe_cluster(name=name)['cluster'], names))
+
+    def _apply(self, model, items, to_fields, now):
+        """Записати зміни одного типу ресурсів і повернути статистику."""
+        existing = {
+            resource_id: (pk, item_fingerprint)
+            for pk, resource_id, item_fingerprint in model.objects.filter(
+                user=self.user, region=self.region
+            ).values_list('pk', 'resource_id', 'fingerprint')
+        }
+
+        to_create = []
+        to_update = []
+        update_fields = None
+        seen = set()
+        for item in items:
+            data = _normalize(item)
+            fields = to_fields(data)
+            item_fingerprint = fingerprint(data)
+            seen.add(fields['resource_id'])
+            if update_fields is None:
+                update_fields = [field for field in fields if field != 'resource_id'] + [
+                    'data', 'fingerprint', 'changed_at', 'synced_at'
+                ]
+
+            current = existing.get(fields['resource_id'])
+            if current is not None and current[1] == item_fingerprint:
+                continue
+            obj = model(user=self.user, region=self.region, data=data, fingerprint=item_fingerprint,
+                        changed_at=now, synced_at=now, **fields)
+            if current is None:
+                to_create.append(obj)
+            else:
+                obj.pk = current[0]
+                to_update.append(obj)
+
+        missing = {resource_id: pk for resource_id, (pk, _) in existing.items() if resource_id not in seen}
+
+        # Незмінені ресурси без пошукового запису (наприклад, створені до появи пошуку) теж індексуються.
+        indexed = set(InventorySearchEntry.objects.filter(
+            user=self.user, region=self.region, resource_type=model.resource_type
+        ).values_list('resource_id', flat=True))
+        changed_ids = {obj.resource_id for obj in to_create + to_update}
+        unindexed = seen - indexed - changed_ids
+
+        with transaction.atomic():
+            model.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            if to_update:
+                model.objects.bulk_update(to_update, update_fields, batch_size=BATCH_SIZE)
+            missing_pks = list(missing.values())
+            for start in range(0, len(missing_pks), BATCH_SIZE):
+                model.objects.filter(pk__in=missing_pks[start:start + BATCH_SIZE]).delete()
+            model.objects.filter(user=self.user, region=self.region, synced_at__lt=now).update(synced_at=now)
+
+            reindexed = to_create + to_update
+            if unindexed:
+                reindexed += [
+                    obj for obj in model.objects.filter(user=self.user, region=self.region)
+                    if obj.resource_id in unindexed
+                ]
+            reindex(self.user, self.region, model.resource_type, reindexed, list(missing))
+
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'deleted': len(missing),
+            'unchanged': len(seen) - len(to_create) - len(to_update),
+        }
+
+    def run(self):
+        """Синхронізувати всі типи ресурсів; повертає статистику по кожному типу."""
+        started = time.monotonic()
+        now = timezone.now()
+        sync, _ = InventorySync.objects.get_or_create(user=self.user, region=self.region)
+        try:
+            # Запити до AWS паралельні, запис у базу - у поточному потоці.
+            with ThreadPoolExecutor(max_workers=len(self.resources)) as executor:
+                fetched = {
+                    name: executor.submit(fetch)
+                    for name, (_, fetch, _) in self.resources.items()
+                }
+                results = {name: future.result() for name, future in fetched.items()}
+
+            stats = {
+                name: self._apply(model, results[name], to_fields, now)
+                for name, (model, _, to_fields) in self.resources.items()
+            }
+        except Exception as e:
+            sync.error = str(e)
+            sync.save(update_fields=['error'])
+            raise Exception(f"Помилка синхронізації інвентаря ({self.region}): {str(e)}")
+
+        sync.synced_at = now
+        sync.duration = round(time.monotonic() - started, 3)
+        sync.stats = stats
+        sync.error = ''
+        sync.save()
+        return stats
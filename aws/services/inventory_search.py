@@ -0,0 +1,142 @@
+import ipaddress
+import shlex
+import time
+
+from django.db.models import Q
+
+from ..models import InventorySearchEntry, InventoryTag
+
+# Максимальна кількість результатів пошуку.
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+BATCH_SIZE = 500
+
+
+def ipv4_range(value):
+    """Перетворити IPv4 адресу або CIDR на діапазон цілих чисел (None для IPv6 і некоректних значень)."""
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        return None
+    if network.version != 4:
+        return None
+    return int(network.network_address), int(network.broadcast_address)
+
+
+def _document(item):
+    """Пошукові поля ресурсу з індексу інвентаря."""
+    cidr = getattr(item, 'cidr_block', '') or getattr(item, 'private_ip', None) or ''
+    terms = [item.resource_id, item.name, item.state, item.region, getattr(item, 'vpc_id', ''), cidr,
+             getattr(item, 'subnet_id', ''), getattr(item, 'public_ip', None) or '',
+             getattr(item, 'instance_type', ''), getattr(item, 'group_name', '')]
+    terms.extend(getattr(item, 'security_groups', []))
+    terms.extend(f"{key}={value}" for key, value in item.tags.items())
+    return {
+        'name': item.name,
+        'state': item.state,
+        'vpc_id': getattr(item, 'vpc_id', ''),
+        'cidr': cidr,
+        'range': ipv4_range(cidr) if cidr else None,
+        'search_text': ' '.join(term for term in terms if term).lower(),
+    }
+
+
+def reindex(user, region, resource_type, items, removed_ids=()):
+    """Оновити пошукові записи для змінених ресурсів і видалити записи зниклих."""
+    items = list(items)
+    stale_ids = list(removed_ids) + [item.resource_id for item in items]
+    entries = InventorySearchEntry.objects.filter(user=user, region=region, resource_type=resource_type)
+    for start in range(0, len(stale_ids), BATCH_SIZE):
+        entries.filter(resource_id__in=stale_ids[start:start + BATCH_SIZE]).delete()
+
+    new_entries = []
+    tags = []
+    for item in items:
+        document = _document(item)
+        entry = InventorySearchEntry(
+            user=user, region=region, resource_type=resource_type, resource_id=item.resource_id,
+            name=document['name'], state=document['state'], vpc_id=document['vpc_id'], cidr=document['cidr'],
+            cidr_start=document['range'][0] if document['range'] else None,
+            cidr_end=document['range'][1] if document['range'] else None,
+            search_text=document['search_text']
+        )
+        new_entries.append(entry)
+        tags.append([InventoryTag(key=key[:128], value=str(value)[:255]) for key, value in item.tags.items()])
+
+    InventorySearchEntry.objects.bulk_create(new_entries, batch_size=BATCH_SIZE)
+    for entry, entry_tags in zip(new_entries, tags):
+        for tag in entry_tags:
+            tag.entry = entry
+    InventoryTag.objects.bulk_create([tag for entry_tags in tags for tag in entry_tags], batch_size=BATCH_SIZE)
+
+
+def parse_query(query):
+    """
+    Розібрати пошуковий запит на фільтри.
+
+    Підтримуються токени tag:Ключ=Значення (або tag:Ключ), type:, state:,
+    region:, vpc:, cidr: (ресурси, чий CIDR містить адресу чи мережу),
+    within: (ресурси всередині мережі) і довільний текст.
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:
+        tokens = query.split()
+
+    filters = []
+    for token in tokens:
+        field, _, value = token.partition(':')
+        if not value or field not in ('tag', 'type', 'state', 'region', 'vpc', 'cidr', 'within'):
+            filters.append(('text', token.lower()))
+        else:
+            filters.append((field, value))
+    return filters
+
+
+def _filter(entries, field, value):
+    if field == 'tag':
+        key, has_value, tag_value = value.partition('=')
+        tags = InventoryTag.objects.filter(key=key)
+        if has_value:
+            tags = tags.filter(value=tag_value)
+        return entries.filter(id__in=tags.values('entry_id'))
+    if field == 'type':
+        return entries.filter(resource_type=value)
+    if field == 'state':
+        return entries.filter(state=value)
+    if field == 'region':
+        return entries.filter(region=value)
+    if field == 'vpc':
+        return entries.filter(vpc_id=value)
+    if field in ('cidr', 'within'):
+        network = ipv4_range(value)
+        if network is None:
+            raise ValueError(f"Некоректна IPv4 адреса або CIDR: {value}")
+        if field == 'cidr':
+            return entries.filter(cidr_start__lte=network[0], cidr_end__gte=network[1])
+        return entries.filter(cidr_start__gte=network[0], cidr_end__lte=network[1])
+    # Довільний текст: точний або префіксний збіг ID, інакше підрядок у пошуковому тексті.
+    return entries.filter(Q(resource_id__startswith=value) | Q(search_text__contains=value))
+
+
+def search(user, query, limit=DEFAULT_LIMIT):
+    """
+    Знайти ресурси в індексі користувача.
+
+    :return: Словник з результатами, їх кількістю і тривалістю запиту (мс).
+    """
+    started = time.monotonic()
+    entries = InventorySearchEntry.objects.filter(user=user)
+    for field, value in parse_query(query):
+        entries = _filter(entries, field, value)
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    results = list(entries.order_by('resource_type', 'name', 'resource_id').values(
+        'resource_type', 'resource_id', 'name', 'state', 'region', 'vpc_id', 'cidr'
+    )[:limit + 1])
+    return {
+        'results': results[:limit],
+        'truncated': len(results) > limit,
+        'duration_ms': round((time.monotonic() - started) * 1000, 2),
+    }
@@ -0,0 +1,48 @@
+def iter_route_tables(ec2, vpc_ids=None):
+    """Ітерувати маршрутні таблиці вказаних VPC (або всіх VPC регіону) посторінково."""
+    paginator = ec2.get_paginator('describe_route_tables')
+    filters = [] if vpc_ids is None else [{'Name': 'vpc-id', 'Values': list(vpc_ids)}]
+    for page in paginator.paginate(Filters=filters):
+        yield from page['RouteTables']
+
+
+def is_public_route_table(route_table):
+    """Перевірити, чи маршрутна таблиця веде трафік в Internet Gateway."""
+    return any(
+        route.get('GatewayId', '').startswith('igw-')
+        for route in route_table['Routes']
+    )
+
+
+def build_route_table_index(route_tables):
+    """
+    Побудувати індекси маршрутних таблиць.
+
+    :return: (сабнет -> таблиця з явною асоціацією, VPC -> головна таблиця).
+    """
+    by_subnet = {}
+    main_by_vpc = {}
+    for route_table in route_tables:
+        for association in route_table.get('Associations', []):
+            if association.get('Main'):
+                main_by_vpc[route_table['VpcId']] = route_table
+            elif association.get('SubnetId'):
+                by_subnet[association['SubnetId']] = route_table
+    return by_subnet, main_by_vpc
+
+
+def classify_subnets(subnets, route_tables):
+    """
+    Розділити сабнети на публічні та приватні без додаткових запитів до AWS.
+
+    Сабнет без явної асоціації використовує головну таблицю свого VPC.
+    """
+    by_subnet, main_by_vpc = build_route_table_index(route_tables)
+    result = {'public': [], 'private': []}
+    for subnet in subnets:
+        route_table = by_subnet.get(subnet['SubnetId']) or main_by_vpc.get(subnet['VpcId'])
+        if route_table is not None and is_public_route_table(route_table):
+            result['public'].append(subnet)
+        else:
+            result['private'].append(subnet)
+    return result
@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Кількість кроків, які виконуються одночасно.
+DEFAULT_MAX_WORKERS = 8
+
+# Теги, за якими ресурси плану знаходяться при повторному запуску.
+PLAN_TAG = 'avtodevops:plan'
+STEP_TAG = 'avtodevops:step'
+
+
+def plan_tags(resource_type, plan_id, step, name=None):
+    """TagSpecifications для ресурсу, створеного кроком плану."""
+    tags = [{'Key': PLAN_TAG, 'Value': plan_id}, {'Key': STEP_TAG, 'Value': step}]
+    if name is not None:
+        tags.append({'Key': 'Name', 'Value': name})
+    return [{'ResourceType': resource_type, 'Tags': tags}]
+
+
+def index_by_step(resources, tags_key='Tags'):
+    """Згрупувати ресурси з describe_* за тегом кроку плану."""
+    index = {}
+    for resource in resources:
+        for tag in resource.get(tags_key, []):
+            if tag['Key'] == STEP_TAG:
+                index.setdefault(tag['Value'], resource)
+    return index
+
+
+class ProvisioningError(Exception):
+    """Помилка одного з кроків; містить назву кроку та звіт про виконані кроки."""
+
+    def __init__(self, step, error, report):
+        super().__init__(f"Крок '{step}': {error}")
+        self.step = step
+        self.error = error
+        self.report = report
+
+
+class ProvisioningEngine:
+    """
+    Виконавець кроків створення ресурсів, описаних як граф залежностей (DAG).
+
+    Кожен крок - функція, що отримує словник результатів уже виконаних
+    кроків і повертає власний результат. Незалежні кроки запускаються
+    паралельно, залежні - щойно завершаться всі їхні залежності.
+
+    Крок з existing (результат, прочитаний з поточного стану AWS) вважається
+    виконаним і не запускається, тож повторний run() після часткової
+    помилки створює лише відсутні ресурси.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, on_event=None):
+        self.max_workers = max_workers
+        self.on_event = on_event
+        self.steps = {}
+        self.existing = {}
+        self.results = {}
+        self.report = []
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add(self, name, action, requires=(), existing=None):
+        """Додати крок; existing - результат кроку, якщо ресурс уже існує."""
+        if name in self.steps:
+            raise ValueError(f"Крок '{name}' вже існує")
+        self.steps[name] = (action, tuple(requires))
+        if existing is not None:
+            self.existing[name] = existing
+        return name
+
+    def plan(self):
+        """Різниця між бажаним і поточним станом: які кроки буде виконано, а які вже виконані."""
+        return [
+            {'step': name, 'action': 'keep' if name in self.existing else 'create',
+             'result': self.existing.get(name)}
+            for name in self.steps
+        ]
+
+    def _validate(self):
+        for name, (_, requires) in self.steps.items():
+            for dependency in requires:
+                if dependency not in self.steps:
+                    raise ValueError(f"Крок '{name}' залежить від невідомого кроку '{dependency}'")
+
+        # Перевірка на цикли (алгоритм Кана).
+        pending = {name: set(requires) for name, (_, requires) in self.steps.items()}
+        while pending:
+            ready = [name for name, requires in pending.items() if not requires]
+            if not ready:
+                raise ValueError(f"Циклічні залежності між кроками: {', '.join(sorted(pending))}")
+            for name in ready:
+                del pending[name]
+            for requires in pending.values():
+                requires.difference_update(ready)
+
+    def _emit(self, **event):
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _run_step(self, name):
+        action, _ = self.steps[name]
+        started = time.monotonic()
+        with self._lock:
+            results = dict(self.results)
+        result = action(results)
+        return result, round(time.monotonic() - started, 3)
+
+    def run(self):
+        """
+        Виконати всі кроки і повернути словник результатів.
+
+        Події on_event викликаються з потоку, що викликав run(), тому
+        callback може безпечно працювати з базою даних.
+        """
+        self._validate()
+        started = time.monotonic()
+        remaining = {name: set(requires) for name, (_, requires) in self.steps.items()}
+        running = {}
+        failure = None
+
+        for name, result in self.existing.items():
+            del remaining[name]
+            self.results[name] = result
+            self.report.append({'step': name, 'status': 'exists'})
+            self._emit(step=name, status='exists', completed=len(self.results), total=len(self.steps))
+        for requires in remaining.values():
+            requires.difference_update(self.existing)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                if failure is None:
+                    ready = [name for name, requires in remaining.items() if not requires]
+                    for name in ready:
+                        del remaining[name]
+                        self._emit(step=name, status='started')
+                        running[executor.submit(self._run_step, name)] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result, duration = future.result()
+                    except Exception as e:
+                        self._emit(step=name, status='failed', error=str(e))
+                        self.report.append({'step': name, 'status': 'failed', 'error': str(e)})
+                        if failure is None:
+                            failure = (name, e)
+                        continue
+
+                    with self._lock:
+                        self.results[name] = result
+                    self.report.append({'step': name, 'status': 'done', 'duration': duration})
+                    self._emit(step=name, status='done', duration=duration,
+                               completed=len(self.results), total=len(self.steps))
+                    for requires in remaining.values():
+                        requires.discard(name)
+
+        self.duration = round(time.monotonic() - started, 3)
+        if failure is not None:
+            raise ProvisioningError(failure[0], failure[1], self.report) from failure[1]
+        return self.results
@@ -0,0 +1,168 @@
+import time
+
+from botocore.exceptions import ClientError
+
+from .provisioning import ProvisioningEngine
+
+# Помилки, які означають, що ресурс уже видалено.
+NOT_FOUND_CODES = (
+    'InvalidVpcID.NotFound', 'InvalidSubnetID.NotFound', 'InvalidRouteTableID.NotFound',
+    'InvalidAssociationID.NotFound', 'InvalidInternetGatewayID.NotFound', 'Gateway.NotAttached',
+    'InvalidAllocationID.NotFound', 'NatGatewayNotFound', 'InvalidNatGatewayID.NotFound',
+)
+
+# Залежності ще звільняються (ENI NAT Gateway, публічні адреси) - видалення варто повторити.
+RETRY_CODES = ('DependencyViolation', 'InvalidIPAddress.InUse')
+RETRY_ATTEMPTS = 6
+RETRY_DELAY = 5
+
+
+class ResourceJournal:
+    """
+    Журнал ресурсів, створених під час одного запуску.
+
+    Кожен запис - крок, тип ресурсу, його ID і додаткові дані (наприклад,
+    VPC для під'єднання Internet Gateway). on_record(entry) викликається
+    одразу після запису, тож журнал можна зберігати поступово.
+    """
+
+    def __init__(self, on_record=None):
+        self.entries = []
+        self.on_record = on_record
+
+    def record(self, step, resource_type, resource_id, **extra):
+        entry = {'step': step, 'type': resource_type, 'id': resource_id, **extra}
+        self.entries.append(entry)
+        if self.on_record is not None:
+            self.on_record(entry)
+        return entry
+
+    def of_type(self, resource_type):
+        return [entry for entry in self.entries if entry['type'] == resource_type]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+
+def _ignore_missing(func, *args, **kwargs):
+    """Виконати видалення; повторити при DependencyViolation, вважати видаленим при NotFound."""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in NOT_FOUND_CODES:
+                return None
+            if code not in RETRY_CODES or attempt == RETRY_ATTEMPTS - 1:
+                raise
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+
+class RollbackExecutor:
+    """
+    Видалення ресурсів з журналу у зворотному до залежностей порядку.
+
+    Видалення описуються як граф для ProvisioningEngine: незалежні ресурси
+    видаляються паралельно, всі NAT Gateway очікуються одним waiter'ом
+    перед звільненням Elastic IP, сабнетів і Internet Gateway, а VPC
+    видаляється останнім. Помилка одного кроку не зупиняє інші: кроки,
+    що залежать від невдалого, пропускаються.
+    """
+
+    def __init__(self, ec2, on_event=None):
+        self.ec2 = ec2
+        self.on_event = on_event
+        self.errors = {}
+
+    def _add(self, engine, name, action, requires=()):
+        requires = tuple(requires)
+
+        def safe_action(r):
+            if any(dependency in self.errors for dependency in requires):
+                self.errors[name] = 'пропущено через помилку залежного кроку'
+                return None
+            try:
+                return action(r)
+            except Exception as e:
+                self.errors[name] = str(e)
+                return None
+
+        return engine.add(name, safe_action, requires=requires)
+
+    def _plan(self, engine, journal):
+        ec2 = self.ec2
+
+        def add(name, action, requires=()):
+            return self._add(engine, name, action, requires)
+
+        associations = [
+            add(f"disassociate:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.disassociate_route_table, AssociationId=entry['id']
+            ))
+            for entry in journal.of_type('route_table_association')
+        ]
+
+        nat_gateways = [entry['id'] for entry in journal.of_type('nat_gateway')]
+        nat_deletes = [
+            add(f"delete:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.delete_nat_gateway, NatGatewayId=entry['id']
+            ))
+            for entry in journal.of_type('nat_gateway')
+        ]
+        nats_deleted = add('nat_gateways_deleted', lambda r: ec2.get_waiter('nat_gateway_deleted').wait(
+            NatGatewayIds=nat_gateways
+        ) if nat_gateways else None, requires=nat_deletes)
+
+        for entry in journal.of_type('elastic_ip'):
+            add(f"release:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.release_address, AllocationId=entry['id']
+            ), requires=[nats_deleted])
+
+        # Internet Gateway не від'єднується, поки у VPC є публічні адреси NAT Gateway.
+        detaches = {}
+        for entry in journal.of_type('internet_gateway_attachment'):
+            detaches[entry['id']] = add(f"detach:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.detach_internet_gateway, InternetGatewayId=entry['id'], VpcId=entry['vpc_id']
+            ), requires=[nats_deleted])
+        vpc_dependencies = list(detaches.values())
+
+        for entry in journal.of_type('internet_gateway'):
+            detach = [detaches[entry['id']]] if entry['id'] in detaches else []
+            vpc_dependencies.append(add(f"delete:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.delete_internet_gateway, InternetGatewayId=entry['id']
+            ), requires=detach))
+
+        for entry in journal.of_type('route_table'):
+            vpc_dependencies.append(add(f"delete:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.delete_route_table, RouteTableId=entry['id']
+            ), requires=associations))
+
+        for entry in journal.of_type('subnet'):
+            vpc_dependencies.append(add(f"delete:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.delete_subnet, SubnetId=entry['id']
+            ), requires=associations + [nats_deleted]))
+
+        for entry in journal.of_type('vpc'):
+            add(f"delete:{entry['step']}", lambda r, entry=entry: _ignore_missing(
+                ec2.delete_vpc, VpcId=entry['id']
+            ), requires=vpc_dependencies + [nats_deleted])
+
+    def run(self, journal):
+        """
+        Видалити всі ресурси з журналу.
+
+        :return: Словник з кількістю кроків відкату і помилками по кроках.
+        """
+        self.errors = {}
+        engine = ProvisioningEngine(on_event=self.on_event)
+        self._plan(engine, journal)
+        engine.run()
+        return {
+            'steps': len(engine.steps),
+            'errors': dict(self.errors),
+            'report': engine.report,
+            'duration': engine.duration,
+        }
@@ -0,0 +1,253 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .s3_transfer import DEFAULT_PART_SIZE, MB, transfer_config
+
+# delete_objects приймає не більше 1000 ключів за один запит.
+DELETE_BATCH_SIZE = 1000
+
+# Кількість одночасних запитів copy_object / upload / download.
+DEFAULT_BULK_WORKERS = 16
+
+# copy_object копіює об'єкти лише до 5 ГБ; більші копіюються через multipart copy.
+COPY_OBJECT_MAX_SIZE = 5 * 1024 * MB
+
+READ_CHUNK_SIZE = 1 * MB
+
+
+def _md5_digest(path, offset=0, length=None):
+    digest = hashlib.md5()
+    with open(path, 'rb') as source:
+        source.seek(offset)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = source.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest
+
+
+def local_etag(path, part_count=1, part_size=None):
+    """
+    Порахувати ETag локального файлу так, як його рахує S3.
+
+    Для звичайного завантаження ETag - це MD5 файлу, для multipart -
+    MD5 від конкатенації MD5 частин з суфіксом "-<кількість частин>".
+    """
+    if part_count <= 1:
+        return _md5_digest(path).hexdigest()
+
+    size = os.path.getsize(path)
+    digests = b''.join(
+        _md5_digest(path, offset, part_size).digest()
+        for offset in range(0, size, part_size)
+    )
+    return f"{hashlib.md5(digests).hexdigest()}-{part_count}"
+
+
+def _multipart_part_sizes(size, part_count):
+    """Можливі розміри частин для multipart ETag: типовий і виведений з кількості частин."""
+    candidates = [DEFAULT_PART_SIZE]
+    derived = -(-size // part_count)
+    candidates.append(-(-derived // MB) * MB)
+    return [part_size for part_size in dict.fromkeys(candidates) if -(-size // part_size) == part_count]
+
+
+def is_same_file(path, size, etag):
+    """Чи збігається локальний файл з об'єктом S3 за розміром і ETag."""
+    if os.path.getsize(path) != size:
+        return False
+    etag = etag.strip('"')
+    if '-' not in etag:
+        return local_etag(path) == etag
+    part_count = int(etag.rsplit('-', 1)[1])
+    return any(local_etag(path, part_count, part_size) == etag
+               for part_size in _multipart_part_sizes(size, part_count))
+
+
+def normalize_prefix(prefix):
+    """Привести префікс до вигляду "a/b/" (порожній префікс - корінь бакета)."""
+    prefix = prefix.strip('/')
+    return f"{prefix}/" if prefix else ''
+
+
+def local_path(local_dir, relative):
+    """
+    Шлях до файлу всередині local_dir для відносного ключа.
+
+    Ключі з "../" або абсолютними шляхами, що ведуть за межі local_dir, відхиляються.
+    """
+    if relative.startswith('/') or '\\' in relative:
+        raise ValueError(f"Ключ '{relative}' веде за межі папки {local_dir}")
+    root = os.path.realpath(local_dir)
+    path = os.path.realpath(os.path.join(root, *relative.split('/')))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"Ключ '{relative}' веде за межі папки {local_dir}")
+    return path
+
+
+class BulkOperations:
+    """
+    Масові операції з об'єктами S3: видалення, копіювання і синхронізація.
+
+    Видалення йде пакетами по 1000 ключів, копіювання і передача файлів -
+    паралельно в пулі з max_workers потоків. on_progress(done, total)
+    викликається з потоку, що запустив операцію.
+    """
+
+    def __init__(self, s3, max_workers=DEFAULT_BULK_WORKERS, on_progress=None):
+        self.s3 = s3
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+
+    def _report(self, done, total):
+        if self.on_progress is not None:
+            self.on_progress(done, total)
+
+    def iter_objects(self, bucket_name, prefix=''):
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            yield from page.get('Contents', [])
+
+    def _run_parallel(self, func, items):
+        """Виконати func для кожного елемента; повертає (результати успішних викликів, помилки)."""
+        results = []
+        errors = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append({'item': futures[future], 'error': str(e)})
+                done += 1
+                self._report(done, len(futures))
+        return results, errors
+
+    def delete_keys(self, bucket_name, keys):
+        """Видалити об'єкти за списком ключів."""
+        keys = list(keys)
+        deleted = 0
+        errors = []
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            response = self.s3.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            # У режимі Quiet S3 повертає лише ключі, які не вдалося видалити.
+            batch_errors = response.get('Errors', [])
+            errors.extend({'item': error['Key'], 'error': error.get('Message', error.get('Code'))}
+                          for error in batch_errors)
+            deleted += len(batch) - len(batch_errors)
+            self._report(start + len(batch), len(keys))
+        return {'deleted': deleted, 'errors': errors}
+
+    def delete_prefix(self, bucket_name, prefix):
+        """Видалити всі об'єкти під префіксом (префікс трактується як папка)."""
+        prefix = normalize_prefix(prefix)
+        return self.delete_keys(bucket_name, (item['Key'] for item in self.iter_objects(bucket_name, prefix)))
+
+    def _copy(self, source_bucket, item, dest_bucket, dest_key):
+        copy_source = {'Bucket': source_bucket, 'Key': item['Key']}
+        if item['Size'] > COPY_OBJECT_MAX_SIZE:
+            self.s3.copy(copy_source, dest_bucket, dest_key, Config=transfer_config())
+        else:
+            self.s3.copy_object(CopySource=copy_source, Bucket=dest_bucket, Key=dest_key)
+
+    def copy_prefix(self, source_bucket, source_prefix, dest_bucket, dest_prefix=''):
+        """Скопіювати всі об'єкти під префіксом на стороні S3 (без завантаження на сервер)."""
+        source_prefix = normalize_prefix(source_prefix)
+        dest_prefix = normalize_prefix(dest_prefix)
+        items = list(self.iter_objects(source_bucket, source_prefix))
+        _, errors = self._run_parallel(
+            lambda item: self._copy(source_bucket, item, dest_bucket,
+                                    dest_prefix + item['Key'][len(source_prefix):]),
+            items
+        )
+        for error in errors:
+            error['item'] = error['item']['Key']
+        return {'copied': len(items) - len(errors), 'errors': errors}
+
+    def _local_files(self, local_dir):
+        for root, _, files in os.walk(local_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, local_dir).replace(os.sep, '/'), path
+
+    def sync_to_bucket(self, local_dir, bucket_name, prefix='', delete=False):
+        """
+        Синхронізувати локальну папку з бакетом.
+
+        Завантажуються лише нові файли та файли, що відрізняються розміром
+        або ETag. З delete=True об'єкти, яких немає локально, видаляються.
+        """
+        prefix = normalize_prefix(prefix)
+        remote = {item['Key']: item for item in self.iter_objects(bucket_name, prefix)}
+        local = {prefix + relative: path for relative, path in self._local_files(local_dir)}
+
+        def upload(item):
+            key, path = item
+            if key in remote and is_same_file(path, remote[key]['Size'], remote[key]['ETag']):
+                return False
+            self.s3.upload_file(path, bucket_name, key, Config=transfer_config())
+            return True
+
+        # ETag (MD5 усього файлу) рахується в пулі разом із передачею, а не послідовно перед нею.
+        uploaded, errors = self._run_parallel(upload, local.items())
+        for error in errors:
+            error['item'] = error['item'][0]
+
+        result = {'uploaded': sum(uploaded), 'unchanged': len(uploaded) - sum(uploaded), 'errors': errors}
+        if delete:
+            deleted = self.delete_keys(bucket_name, [
+                key for key in remote if key not in local and not key.endswith('/')
+            ])
+            result['deleted'] = deleted['deleted']
+            result['errors'].extend(deleted['errors'])
+        return result
+
+    def _download(self, bucket_name, key, path, item):
+        """Завантажити об'єкт, якщо локального файлу немає або він відрізняється (повертає True/False)."""
+        if os.path.exists(path) and is_same_file(path, item['Size'], item['ETag']):
+            return False
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.s3.download_file(bucket_name, key, path, Config=transfer_config())
+        return True
+
+    def sync_from_bucket(self, bucket_name, prefix, local_dir, delete=False):
+        """Синхронізувати бакет у локальну папку (лише змінені об'єкти)."""
+        prefix = normalize_prefix(prefix)
+        remote = {}
+        errors = []
+        for item in self.iter_objects(bucket_name, prefix):
+            relative = item['Key'][len(prefix):]
+            if not relative or relative.endswith('/'):
+                continue
+            try:
+                local_path(local_dir, relative)
+            except ValueError as e:
+                errors.append({'item': item['Key'], 'error': str(e)})
+                continue
+            remote[relative] = item
+        local = dict(self._local_files(local_dir)) if os.path.isdir(local_dir) else {}
+
+        downloaded, download_errors = self._run_parallel(
+            lambda relative: self._download(bucket_name, prefix + relative, local_path(local_dir, relative),
+                                            remote[relative]),
+            remote
+        )
+
+        result = {'downloaded': sum(downloaded), 'unchanged': len(downloaded) - sum(downloaded),
+                  'errors': errors + download_errors}
+        if delete:
+            removed = [relative for relative in local if relative not in remote]
+            for relative in removed:
+                os.remove(local[relative])
+            result['deleted'] = len(removed)
+        return result
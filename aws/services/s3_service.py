@@ -1,14 +1,21 @@
-import boto3
+import os
+
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
+from .clients import get_client
+from .s3_bulk import BulkOperations
+from .s3_transfer import MultipartStreamUpload, ProgressTracker, ResumableUpload, transfer_config
+
+# Кількість ключів на одній сторінці браузера об'єктів.
+DEFAULT_PAGE_SIZE = 200
+
 class S3Service:
-    def __init__(self, access_key, secret_key, region='us-east-1'):
-        self.s3 = boto3.client(
-            's3',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
+    def __init__(self, access_key, secret_key, region='us-east-1', timeout=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+        self.s3 = get_client('s3', self.access_key, self.secret_key, self.region, self.timeout)
 
     def list_buckets(self):
         """Отримати список бакетів."""
@@ -18,6 +25,63 @@ class S3Service:
         except (NoCredentialsError, PartialCredentialsError) as e:
             return f"Помилка автентифікації: {str(e)}"
 
+    def list_objects_page(self, bucket_name, prefix='', continuation_token=None, max_keys=DEFAULT_PAGE_SIZE):
+        """
+        Отримати одну сторінку вмісту "папки" бакета.
+
+        :return: Словник з підпапками (prefixes), об'єктами та токеном наступної сторінки.
+        """
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix, 'Delimiter': '/', 'MaxKeys': max_keys}
+        if continuation_token:
+            kwargs['ContinuationToken'] = continuation_token
+        try:
+            response = self.s3.list_objects_v2(**kwargs)
+            return {
+                'prefixes': [item['Prefix'] for item in response.get('CommonPrefixes', [])],
+                'objects': [
+                    {
+                        'Key': item['Key'],
+                        'Size': item['Size'],
+                        'LastModified': item['LastModified'],
+                    }
+                    for item in response.get('Contents', [])
+                ],
+                'next_token': response.get('NextContinuationToken'),
+            }
+        except Exception as e:
+            raise Exception(f"Помилка отримання об'єктів: {str(e)}")
+
+    def iter_objects(self, bucket_name, prefix=''):
+        """Ітерувати всі об'єкти під префіксом посторінково (без розділювача)."""
+        try:
+            paginator = self.s3.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+                yield from page.get('Contents', [])
+        except Exception as e:
+            raise Exception(f"Помилка отримання об'єктів: {str(e)}")
+
+    def aggregate_prefix(self, bucket_name, prefix='', on_progress=None):
+        """
+        Порахувати розмір і кількість об'єктів під префіксом.
+
+        Один прохід дає точні підсумки і для самого префікса, і для кожної
+        його безпосередньої підпапки.
+        """
+        total = {'size': 0, 'count': 0}
+        children = {}
+        for item in self.iter_objects(bucket_name, prefix):
+            total['size'] += item['Size']
+            total['count'] += 1
+            rest = item['Key'][len(prefix):]
+            if '/' in rest:
+                child = prefix + rest.split('/', 1)[0] + '/'
+                stats = children.setdefault(child, {'size': 0, 'count': 0})
+                stats['size'] += item['Size']
+                stats['count'] += 1
+            if on_progress is not None and total['count'] % 10000 == 0:
+                on_progress(total)
+        return {'prefix': prefix, 'size': total['size'], 'count': total['count'], 'children': children}
+
     def create_bucket(self, bucket_name):
         """Створити бакет."""
         try:
@@ -26,13 +90,86 @@ class S3Service:
         except Exception as e:
             return f"Помилка створення бакета: {str(e)}"
 
-    def upload_file(self, bucket_name, file_path, object_name=None):
-        """Завантажити файл у S3."""
+    def upload_file(self, bucket_name, file_path, object_name=None, part_size=None, concurrency=None, on_progress=None):
+        """Завантажити файл у S3 (multipart з паралельними частинами для великих файлів)."""
         if object_name is None:
-            object_name = file_path.split('/')[-1]
+            object_name = os.path.basename(file_path)
 
         try:
-            self.s3.upload_file(file_path, bucket_name, object_name)
+            self.s3.upload_file(
+                file_path, bucket_name, object_name,
+                Config=transfer_config(part_size, concurrency),
+                Callback=ProgressTracker(os.path.getsize(file_path), on_progress)
+            )
             return f"Файл {file_path} завантажено як {object_name} у бакет {bucket_name}."
         except Exception as e:
             return f"Помилка завантаження файлу: {str(e)}"
+
+    def upload_file_resumable(self, bucket_name, file_path, object_name=None, part_size=None,
+                              concurrency=None, on_progress=None):
+        """
+        Завантажити файл у S3 з можливістю продовження після збою.
+
+        :return: Словник з ключем об'єкта, розміром і кількістю частин.
+        """
+        try:
+            upload = ResumableUpload(
+                self.s3, bucket_name, file_path, object_name,
+                part_size=part_size, concurrency=concurrency, on_progress=on_progress
+            )
+            return upload.upload()
+        except Exception as e:
+            raise Exception(f"Помилка завантаження файлу: {str(e)}")
+
+    def upload_stream(self, bucket_name, object_name, chunks, part_size=None, total=None, on_progress=None):
+        """
+        Завантажити в S3 потік байтів (наприклад, тіло HTTP запиту) без буферизації всього файлу.
+
+        :param on_progress: Callback (записано в S3, очікуваний розмір), необов'язковий.
+        :return: Словник з ключем об'єкта, розміром і кількістю частин.
+        """
+        try:
+            return MultipartStreamUpload(
+                self.s3, bucket_name, object_name, part_size=part_size, total=total, on_progress=on_progress
+            ).upload(chunks)
+        except Exception as e:
+            raise Exception(f"Помилка завантаження файлу: {str(e)}")
+
+    def delete_prefix(self, bucket_name, prefix, on_progress=None):
+        """
+        Видалити всі об'єкти під префіксом пакетами по 1000 ключів.
+
+        :return: Словник з кількістю видалених об'єктів і помилками.
+        """
+        try:
+            return BulkOperations(self.s3, on_progress=on_progress).delete_prefix(bucket_name, prefix)
+        except Exception as e:
+            raise Exception(f"Помилка видалення об'єктів: {str(e)}")
+
+    def copy_prefix(self, source_bucket, source_prefix, dest_bucket, dest_prefix='', on_progress=None):
+        """
+        Паралельно скопіювати об'єкти під префіксом в інший бакет або префікс.
+
+        :return: Словник з кількістю скопійованих об'єктів і помилками.
+        """
+        try:
+            return BulkOperations(self.s3, on_progress=on_progress).copy_prefix(
+                source_bucket, source_prefix, dest_bucket, dest_prefix
+            )
+        except Exception as e:
+            raise Exception(f"Помилка копіювання об'єктів: {str(e)}")
+
+    def sync_directory(self, local_dir, bucket_name, prefix='', direction='upload', delete=False, on_progress=None):
+        """
+        Синхронізувати локальну папку з бакетом, передаючи лише змінені файли.
+
+        :param direction: 'upload' (папка -> бакет) або 'download' (бакет -> папка).
+        :return: Словник з кількістю переданих і незмінених файлів та помилками.
+        """
+        try:
+            bulk = BulkOperations(self.s3, on_progress=on_progress)
+            if direction == 'download':
+                return bulk.sync_from_bucket(bucket_name, prefix, local_dir, delete=delete)
+            return bulk.sync_to_bucket(local_dir, bucket_name, prefix, delete=delete)
+        except Exception as e:
+            raise Exception(f"Помилка синхронізації: {str(e)}")
@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from boto3.s3.transfer import TransferConfig
+
+MB = 1024 * 1024
+
+# Розмір частини multipart завантаження і кількість паралельних частин.
+DEFAULT_PART_SIZE = 8 * MB
+DEFAULT_CONCURRENCY = 10
+
+# Обмеження S3: мінімальний розмір частини (крім останньої) і максимум частин.
+MIN_PART_SIZE = 5 * MB
+MAX_PARTS = 10000
+
+
+def transfer_config(part_size=None, concurrency=None):
+    """Налаштування s3transfer для multipart завантажень."""
+    part_size = max(part_size or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+    return TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=concurrency or DEFAULT_CONCURRENCY,
+        use_threads=True
+    )
+
+
+def fit_part_size(size, part_size=None):
+    """Збільшити розмір частини, якщо файл не вміщується в MAX_PARTS частин."""
+    part_size = max(part_size or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+    while size > part_size * MAX_PARTS:
+        part_size *= 2
+    return part_size
+
+
+class ProgressTracker:
+    """
+    Потокобезпечний лічильник переданих байтів.
+
+    Екземпляр можна передати як Callback у s3transfer. on_progress
+    викликається не частіше, ніж раз на interval секунд (і в кінці).
+    """
+
+    def __init__(self, total, on_progress=None, interval=0.5, transferred=0):
+        self.total = total
+        self.transferred = transferred
+        self.on_progress = on_progress
+        self.interval = interval
+        self._last_report = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.transferred += bytes_amount
+            now = time.monotonic()
+            if self.on_progress is None:
+                return
+            if now - self._last_report < self.interval and self.transferred < self.total:
+                return
+            self._last_report = now
+            transferred = self.transferred
+        self.on_progress(transferred, self.total)
+
+
+class ResumableUpload:
+    """
+    Multipart завантаження файлу в S3 з можливістю продовження.
+
+    Стан (UploadId і ETag завершених частин) зберігається в маніфесті
+    поруч із файлом. Після збою повторний запуск перевіряє частини через
+    list_parts і довантажує лише відсутні.
+    """
+
+    def __init__(self, s3, bucket_name, file_path, object_name=None, part_size=None,
+                 concurrency=None, manifest_path=None, on_progress=None):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.file_path = file_path
+        self.object_name = object_name or os.path.basename(file_path)
+        self.size = os.path.getsize(file_path)
+        self.part_size = fit_part_size(self.size, part_size)
+        self.concurrency = concurrency or DEFAULT_CONCURRENCY
+        self.manifest_path = manifest_path or f"{file_path}.s3upload.json"
+        self.on_progress = on_progress
+        self.manifest = None
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        return {
+            'bucket': self.bucket_name,
+            'key': self.object_name,
+            'size': self.size,
+            'mtime': os.path.getmtime(self.file_path),
+            'part_size': self.part_size,
+        }
+
+    def _save_manifest(self):
+        # Атомарний запис, щоб перерваний процес не залишив пошкоджений маніфест.
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load_manifest(self):
+        """Завантажити маніфест, якщо він належить цьому ж файлу й об'єкту."""
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if {key: manifest.get(key) for key in self._signature()} != self._signature():
+            return None
+        return manifest
+
+    def _uploaded_parts(self, upload_id):
+        """Отримати частини, які S3 вже прийняв (джерело істини - сервер, а не маніфест)."""
+        parts = {}
+        paginator = self.s3.get_paginator('list_parts')
+        try:
+            for page in paginator.paginate(Bucket=self.bucket_name, Key=self.object_name, UploadId=upload_id):
+                for part in page.get('Parts', []):
+                    parts[str(part['PartNumber'])] = {'ETag': part['ETag'], 'Size': part['Size']}
+        except self.s3.exceptions.NoSuchUpload:
+            return None
+        return parts
+
+    def _start(self):
+        manifest = self._load_manifest()
+        if manifest is not None:
+            parts = self._uploaded_parts(manifest['upload_id'])
+            if parts is not None:
+                manifest['parts'] = {
+                    number: part['ETag']
+                    for number, part in parts.items()
+                    if part['Size'] == self._expected_size(int(number))
+                }
+                self.manifest = manifest
+                self._save_manifest()
+                return
+
+        response = self.s3.create_multipart_upload(Bucket=self.bucket_name, Key=self.object_name)
+        self.manifest = dict(self._signature(), upload_id=response['UploadId'], parts={})
+        self._save_manifest()
+
+    def _expected_size(self, part_number):
+        offset = (part_number - 1) * self.part_size
+        return min(self.part_size, self.size - offset)
+
+    def _upload_part(self, part_number):
+        with open(self.file_path, 'rb') as source:
+            source.seek((part_number - 1) * self.part_size)
+            data = source.read(self.part_size)
+        response = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.manifest['upload_id'],
+            PartNumber=part_number,
+            Body=data
+        )
+        with self._lock:
+            self.manifest['parts'][str(part_number)] = response['ETag']
+            self._save_manifest()
+        return len(data)
+
+    def upload(self):
+        """Завантажити файл (або продовжити перерване завантаження)."""
+        self._start()
+        part_count = max(1, -(-self.size // self.part_size))
+        done = {int(number) for number in self.manifest['parts']}
+        missing = [number for number in range(1, part_count + 1) if number not in done]
+
+        tracker = ProgressTracker(
+            self.size, self.on_progress,
+            transferred=sum(self._expected_size(number) for number in done)
+        )
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._upload_part, number) for number in missing]
+            try:
+                # Прогрес повідомляється з поточного потоку, тож callback може писати в БД.
+                for future in as_completed(futures):
+                    tracker(future.result())
+            except Exception:
+                # Маніфест залишається на диску для продовження завантаження.
+                for future in futures:
+                    future.cancel()
+                raise
+
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.manifest['upload_id'],
+            MultipartUpload={'Parts': [
+                {'PartNumber': int(number), 'ETag': etag}
+                for number, etag in sorted(self.manifest['parts'].items(), key=lambda item: int(item[0]))
+            ]}
+        )
+        os.remove(self.manifest_path)
+        return {
+            'bucket': self.bucket_name,
+            'key': self.object_name,
+            'size': self.size,
+            'parts': part_count,
+            'resumed_parts': len(done),
+        }
+
+    def abort(self):
+        """Скасувати завантаження і видалити маніфест."""
+        manifest = self.manifest or self._load_manifest()
+        if manifest is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.object_name, UploadId=manifest['upload_id']
+            )
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+
+class MultipartStreamUpload:
+    """
+    Multipart завантаження в S3 з потоку байтів невідомої довжини.
+
+    Дані накопичуються лише до розміру однієї частини, тож пам'ять
+    обмежена part_size * (concurrency + 1) незалежно від розміру файлу.
+    on_progress(uploaded, total) отримує кількість байтів, уже записаних
+    у S3 (total - очікуваний розмір, якщо відомий).
+    """
+
+    def __init__(self, s3, bucket_name, object_name, part_size=None, concurrency=2, total=None, on_progress=None):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.part_size = max(part_size or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+        self.concurrency = concurrency
+        self.upload_id = None
+        self.on_progress = on_progress
+        self.progress = ProgressTracker(total or 0, on_progress)
+
+    def _upload_part(self, part_number, data):
+        response = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=bytes(data)
+        )
+        self.progress(len(data))
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def upload(self, chunks):
+        """Завантажити дані з ітератора chunks (байтові шматки довільного розміру)."""
+        response = self.s3.create_multipart_upload(Bucket=self.bucket_name, Key=self.object_name)
+        self.upload_id = response['UploadId']
+        size = 0
+        pending = []
+        parts = []
+        buffer = bytearray()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                def submit(data):
+                    # Якщо всі потоки зайняті - чекаємо найстарішу частину, щоб не накопичувати буфери.
+                    if len(pending) >= self.concurrency:
+                        parts.append(pending.pop(0).result())
+                    if len(parts) + len(pending) >= MAX_PARTS:
+                        raise Exception("Перевищено максимальну кількість частин.")
+                    pending.append(executor.submit(self._upload_part, len(parts) + len(pending) + 1, data))
+
+                for chunk in chunks:
+                    size += len(chunk)
+                    buffer.extend(chunk)
+                    while len(buffer) >= self.part_size:
+                        submit(buffer[:self.part_size])
+                        del buffer[:self.part_size]
+
+                # Остання (або єдина) частина може бути меншою за мінімальний розмір.
+                if buffer or not (parts or pending):
+                    submit(buffer)
+                parts.extend(future.result() for future in pending)
+
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_name,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            # Незавершені частини тарифікуються, тому завантаження скасовуємо.
+            self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=self.object_name, UploadId=self.upload_id)
+            raise
+
+        if self.on_progress is not None:
+            self.on_progress(size, size)
+        return {'bucket': self.bucket_name, 'key': self.object_name, 'size': size, 'parts': len(parts)}
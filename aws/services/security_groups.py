@@ -0,0 +1,144 @@
+import ipaddress
+
+from botocore.exceptions import ClientError
+
+DEFAULT_CIDRS = ('0.0.0.0/0',)
+
+PROTOCOLS = ('tcp', 'udp', 'icmp', '-1')
+
+
+def _parse_port_spec(spec, protocol):
+    """
+    Розібрати опис порту: 22, "22", "8000-8100", (8000, 8100), "udp:53", "icmp:" або "all".
+
+    :return: (протокол, перший порт, останній порт).
+    """
+    if isinstance(spec, (tuple, list)):
+        from_port, to_port = spec
+        return protocol, int(from_port), int(to_port)
+    if isinstance(spec, int):
+        return protocol, spec, spec
+
+    spec = str(spec).strip().lower()
+    if ':' in spec:
+        protocol, spec = spec.split(':', 1)
+    if protocol == '-1' or spec in ('all', '*'):
+        return '-1', None, None
+    if protocol == 'icmp':
+        # Для ICMP FromPort - тип повідомлення, ToPort - код; -1 означає "будь-який".
+        return 'icmp', int(spec) if spec else -1, -1
+    from_port, _, to_port = spec.partition('-')
+    return protocol, int(from_port), int(to_port or from_port)
+
+
+class RuleSet:
+    """
+    Набір вхідних правил групи безпеки.
+
+    Правило - це кортеж (протокол, перший порт, останній порт, CIDR).
+    Правила з однаковими протоколом і портами об'єднуються в один
+    елемент IpPermissions, тож увесь набір відкривається одним викликом API.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = set(rules)
+
+    def allow(self, ports, protocol='tcp', cidrs=DEFAULT_CIDRS):
+        """Дозволити порти (числа, діапазони "a-b" або "протокол:порт") з вказаних CIDR."""
+        if isinstance(ports, (int, str)):
+            ports = [ports]
+        if isinstance(cidrs, str):
+            cidrs = [cidrs]
+        for spec in ports:
+            rule_protocol, from_port, to_port = _parse_port_spec(spec, protocol)
+            if rule_protocol not in PROTOCOLS:
+                raise ValueError(f"Непідтримуваний протокол: {rule_protocol}")
+            if rule_protocol in ('tcp', 'udp') and not 0 <= from_port <= to_port <= 65535:
+                raise ValueError(f"Некоректний діапазон портів: {spec}")
+            for cidr in cidrs:
+                self.rules.add((rule_protocol, from_port, to_port, str(ipaddress.ip_network(cidr, strict=False))))
+        return self
+
+    @classmethod
+    def from_ip_permissions(cls, ip_permissions):
+        """Побудувати набір з IpPermissions, які повертає describe_security_groups."""
+        rules = set()
+        for permission in ip_permissions:
+            protocol = permission['IpProtocol']
+            from_port = permission.get('FromPort') if protocol != '-1' else None
+            to_port = permission.get('ToPort') if protocol != '-1' else None
+            for ip_range in permission.get('IpRanges', []):
+                rules.add((protocol, from_port, to_port, ip_range['CidrIp']))
+            for ip_range in permission.get('Ipv6Ranges', []):
+                rules.add((protocol, from_port, to_port, ip_range['CidrIpv6']))
+        return cls(rules)
+
+    def to_ip_permissions(self):
+        """Скомпілювати правила в IpPermissions (по одному елементу на протокол і діапазон портів)."""
+        grouped = {}
+        for protocol, from_port, to_port, cidr in sorted(self.rules, key=lambda rule: (rule[0], rule[1] or 0, rule[3])):
+            permission = grouped.get((protocol, from_port, to_port))
+            if permission is None:
+                permission = {'IpProtocol': protocol, 'IpRanges': [], 'Ipv6Ranges': []}
+                if protocol != '-1':
+                    permission['FromPort'] = from_port
+                    permission['ToPort'] = to_port
+                grouped[(protocol, from_port, to_port)] = permission
+            if ipaddress.ip_network(cidr).version == 6:
+                permission['Ipv6Ranges'].append({'CidrIpv6': cidr})
+            else:
+                permission['IpRanges'].append({'CidrIp': cidr})
+        return [
+            {key: value for key, value in permission.items() if value != []}
+            for permission in grouped.values()
+        ]
+
+    def __sub__(self, other):
+        return RuleSet(self.rules - other.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+
+def describe_ingress(ec2, group_id):
+    """Отримати поточні вхідні правила групи безпеки."""
+    group = ec2.describe_security_groups(GroupIds=[group_id])['SecurityGroups'][0]
+    return RuleSet.from_ip_permissions(group.get('IpPermissions', []))
+
+
+def apply_rule_set(ec2, group_id, rule_set, revoke_extra=False):
+    """
+    Привести вхідні правила групи безпеки до набору rule_set.
+
+    Додаються лише відсутні правила (одним викликом API); повторне
+    застосування того самого набору не робить жодних змін. З
+    revoke_extra=True правила, яких немає в наборі, відкликаються.
+
+    :return: Кількість доданих, відкликаних і незмінених правил.
+    """
+    existing = describe_ingress(ec2, group_id)
+    missing = rule_set - existing
+    if missing:
+        try:
+            ec2.authorize_security_group_ingress(GroupId=group_id, IpPermissions=missing.to_ip_permissions())
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidPermission.Duplicate':
+                raise
+            # Хтось додав частину правил паралельно: перечитуємо стан і додаємо решту.
+            existing = describe_ingress(ec2, group_id)
+            missing = rule_set - existing
+            if missing:
+                ec2.authorize_security_group_ingress(GroupId=group_id, IpPermissions=missing.to_ip_permissions())
+
+    extra = existing - rule_set if revoke_extra else RuleSet()
+    if extra:
+        ec2.revoke_security_group_ingress(GroupId=group_id, IpPermissions=extra.to_ip_permissions())
+
+    return {
+        'added': len(missing),
+        'revoked': len(extra),
+        'unchanged': len(rule_set) - len(missing),
+    }
@@ -1,32 +1,50 @@
-import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 import time
 import ipaddress
+import itertools
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import cached, invalidate_service
+from .clients import get_client
+from .network import iter_route_tables
+from .provisioning import PLAN_TAG, ProvisioningEngine, index_by_step, plan_tags
+from .rollback import ResourceJournal, RollbackExecutor
+
+# Стани NAT Gateway, у яких його можна використати повторно.
+LIVE_NAT_STATES = ['pending', 'available']
+
+# Кроки плану VPC, що створюють ресурси, і типи цих ресурсів у журналі.
+RESOURCE_STEPS = (
+    (re.compile(r'vpc'), 'vpc'),
+    (re.compile(r'igw'), 'internet_gateway'),
+    (re.compile(r'igw_attach'), 'internet_gateway_attachment'),
+    (re.compile(r'(public|private)_route_table(_\d+)?'), 'route_table'),
+    (re.compile(r'(public|private)_subnet_\d+_association'), 'route_table_association'),
+    (re.compile(r'(public|private)_subnet_\d+'), 'subnet'),
+    (re.compile(r'nat_eip_\d+'), 'elastic_ip'),
+    (re.compile(r'nat_gateway_\d+'), 'nat_gateway'),
+)
 
 class VPCService:
-    def __init__(self, access_key, secret_key, region='us-east-1'):
+    def __init__(self, access_key, secret_key, region='us-east-1', timeout=None):
         if not access_key or not secret_key:
             raise Exception("Облікові дані AWS відсутні.")
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
+        self.timeout = timeout
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
+        self.last_report = []
+        self.last_journal = None
+        self.last_rollback = None
 
     def set_region(self, region):
         """Оновити регіон."""
         self.region = region
-        self.ec2 = boto3.client(
-            'ec2',
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region
-        )
+        self.ec2 = get_client('ec2', self.access_key, self.secret_key, self.region, self.timeout)
 
+    @cached('regions')
     def get_regions(self):
         """Отримати список доступних регіонів."""
         try:
@@ -35,122 +53,351 @@ class VPCService:
         except Exception as e:
             raise Exception(f"Помилка отримання регіонів: {str(e)}")
 
+    def iter_vpcs(self):
+        """Ітерувати VPC посторінково."""
+        try:
+            for page in self.ec2.get_paginator('describe_vpcs').paginate():
+                for vpc in page['Vpcs']:
+                    yield {
+                        'VpcId': vpc['VpcId'],
+                        'CidrBlock': vpc['CidrBlock'],
+                        'State': vpc['State']
+                    }
+        except Exception as e:
+            raise Exception(f"Помилка отримання VPC: {str(e)}")
+
+    @cached('vpcs')
     def get_vpcs(self):
         """Отримати список VPC."""
+        return list(self.iter_vpcs())
+
+    def iter_subnets(self, vpc_id):
+        """Ітерувати сабнети VPC посторінково."""
         try:
-            response = self.ec2.describe_vpcs()
-            vpcs = [
-                {
-                    'VpcId': vpc['VpcId'],
-                    'CidrBlock': vpc['CidrBlock'],
-                    'State': vpc['State']
-                }
-                for vpc in response['Vpcs']
-            ]
-            return vpcs
+            paginator = self.ec2.get_paginator('describe_subnets')
+            for page in paginator.paginate(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]):
+                for subnet in page['Subnets']:
+                    yield {
+                        'SubnetId': subnet['SubnetId'],
+                        'CidrBlock': subnet['CidrBlock'],
+                        'AvailabilityZone': subnet['AvailabilityZone']
+                    }
         except Exception as e:
-            raise Exception(f"Помилка отримання VPC: {str(e)}")
+            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
 
+    @cached('subnets')
     def get_subnets(self, vpc_id):
         """Отримати список сабнетів для VPC."""
+        return list(self.iter_subnets(vpc_id))
+
+    def _split_cidrs(self, cidr_block, subnet_count):
+        """Розрахувати CIDR-блоки публічних і приватних сабнетів до створення будь-яких ресурсів."""
+        public_subnets_count = subnet_count // 2
+        network = ipaddress.ip_network(cidr_block, strict=False)
+        subnets = [str(subnet) for subnet in itertools.islice(network.subnets(new_prefix=24), subnet_count)]  # Ділимо на /24
+        if len(subnets) < subnet_count:
+            raise Exception("Недостатньо CIDR-блоків для заданої кількості сабнетів.")
+        return str(network), subnets[:public_subnets_count], subnets[public_subnets_count:]
+
+    def _build_plan(self, cidr_block, subnet_count, vpc_name, on_event=None):
+        """Прочитати поточний стан і описати кроки, яких бракує до бажаного."""
+        cidr_block, public_cidrs, private_cidrs = self._split_cidrs(cidr_block, subnet_count)
+        plan_id = f"{vpc_name}:{cidr_block}"
+        current = self._read_vpc_state(plan_id, cidr_block, public_cidrs, private_cidrs)
+        engine = ProvisioningEngine(on_event=on_event)
+        self._plan_vpc(engine, plan_id, cidr_block, vpc_name, public_cidrs, private_cidrs, current)
+        return engine, len(public_cidrs), len(private_cidrs)
+
+    def plan_vpc(self, cidr_block, subnet_count, vpc_name='MyVPC'):
+        """
+        Порівняти бажаний VPC з поточним станом без жодних змін.
+
+        :return: Список кроків з дією keep (ресурс уже існує) або create.
+        """
         try:
-            response = self.ec2.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])
-            subnets = [
-                {
-                    'SubnetId': subnet['SubnetId'],
-                    'CidrBlock': subnet['CidrBlock'],
-                    'AvailabilityZone': subnet['AvailabilityZone']
-                }
-                for subnet in response['Subnets']
-            ]
-            return subnets
+            engine, _, _ = self._build_plan(cidr_block, subnet_count, vpc_name)
+            return engine.plan()
         except Exception as e:
-            raise Exception(f"Помилка отримання сабнетів: {str(e)}")
+            raise Exception(f"Помилка планування VPC: {str(e)}")
 
-    def create_vpc(self, cidr_block, subnet_count, vpc_name='MyVPC'):
+    def create_vpc(self, cidr_block, subnet_count, vpc_name='MyVPC', on_event=None, rollback=True):
         """
         Створити новий VPC з сабнетами, NAT Gateway, Internet Gateway і маршрутними таблицями.
 
+        Ресурси створюються як граф залежностей: незалежні кроки виконуються
+        паралельно, а всі NAT Gateway очікуються одним waiter'ом. Створення
+        ідемпотентне: ресурси позначаються тегами плану, тож повторний виклик
+        з тими самими параметрами створює лише відсутні ресурси. Тривалість
+        кожного кроку доступна в self.last_report.
+
+        Кожен створений ресурс записується в журнал (self.last_journal); якщо
+        якийсь крок завершився помилкою, ресурси цього запуску видаляються
+        у зворотному порядку (звіт - у self.last_rollback).
+
         :param cidr_block: CIDR-блок для VPC, наприклад, "10.0.0.0/16".
         :param subnet_count: Кількість сабнетів (половина буде приватними, половина - публічними).
         :param vpc_name: Назва VPC.
+        :param on_event: Callback для подій кроків (exists/started/done/failed), необов'язковий.
+        :param rollback: Видалити створені ресурси, якщо створення не вдалося.
         :return: Ідентифікатор VPC і список сабнетів.
         """
+        self.last_rollback = None
         try:
-            # Створення VPC
-            vpc_response = self.ec2.create_vpc(CidrBlock=cidr_block)
-            vpc_id = vpc_response['Vpc']['VpcId']
-            self.ec2.create_tags(Resources=[vpc_id], Tags=[{'Key': 'Name', 'Value': vpc_name}])
-
-            # Створення Internet Gateway
-            igw_response = self.ec2.create_internet_gateway()
-            igw_id = igw_response['InternetGateway']['InternetGatewayId']
-            self.ec2.attach_internet_gateway(VpcId=vpc_id, InternetGatewayId=igw_id)
-
-            # Створення маршрутної таблиці для публічних сабнетів
-            public_route_table_response = self.ec2.create_route_table(VpcId=vpc_id)
-            public_route_table_id = public_route_table_response['RouteTable']['RouteTableId']
-            self.ec2.create_route(
-                RouteTableId=public_route_table_id,
-                DestinationCidrBlock='0.0.0.0/0',
-                GatewayId=igw_id
+            engine, public_subnets_count, private_subnets_count = self._build_plan(
+                cidr_block, subnet_count, vpc_name
             )
+            self.last_report = engine.report
+            journal = self.last_journal = ResourceJournal()
+            engine.on_event = self._journaling(engine, journal, on_event)
+            try:
+                results = engine.run()
+            except Exception as e:
+                if not rollback or not journal:
+                    raise
+                raise Exception(f"{str(e)}. {self._rollback(journal, on_event)}")
 
-            # Розрахунок кількості приватних і публічних сабнетів
-            public_subnets_count = subnet_count // 2
-            private_subnets_count = subnet_count - public_subnets_count
-
-            # Розрахунок CIDR-блоків
-            network = ipaddress.ip_network(cidr_block, strict=False)
-            subnets = list(network.subnets(new_prefix=24))  # Ділимо на /24
-            if len(subnets) < subnet_count:
-                raise Exception("Недостатньо CIDR-блоків для заданої кількості сабнетів.")
-
-            all_subnets = []
-            azs = self.ec2.describe_availability_zones()['AvailabilityZones']
-            azs_cycle = (az['ZoneName'] for az in azs)
-
-            # Створення публічних сабнетів
-            for i in range(public_subnets_count):
-                az = next(azs_cycle)
-                subnet_cidr = str(subnets.pop(0))
-                subnet_response = self.ec2.create_subnet(VpcId=vpc_id, CidrBlock=subnet_cidr, AvailabilityZone=az)
-                subnet_id = subnet_response['Subnet']['SubnetId']
-                all_subnets.append({'SubnetId': subnet_id, 'Type': 'Public', 'CidrBlock': subnet_cidr})
-                self.ec2.create_tags(Resources=[subnet_id], Tags=[{'Key': 'Name', 'Value': f'PublicSubnet-{i+1}'}])
-                self.ec2.associate_route_table(RouteTableId=public_route_table_id, SubnetId=subnet_id)
-                self.ec2.modify_subnet_attribute(SubnetId=subnet_id, MapPublicIpOnLaunch={"Value": True})
-
-
-            # Створення приватних сабнетів
-            for i in range(private_subnets_count):
-                az = next(azs_cycle)
-                subnet_cidr = str(subnets.pop(0))
-                subnet_response = self.ec2.create_subnet(VpcId=vpc_id, CidrBlock=subnet_cidr, AvailabilityZone=az)
-                subnet_id = subnet_response['Subnet']['SubnetId']
-                all_subnets.append({'SubnetId': subnet_id, 'Type': 'Private', 'CidrBlock': subnet_cidr})
-                self.ec2.create_tags(Resources=[subnet_id], Tags=[{'Key': 'Name', 'Value': f'PrivateSubnet-{i+1}'}])
-
-                # Прив'язка NAT Gateway до приватних сабнетів
-                nat_eip_response = self.ec2.allocate_address(Domain='vpc')
-                nat_eip_id = nat_eip_response['AllocationId']
-                nat_gw_response = self.ec2.create_nat_gateway(SubnetId=subnet_id, AllocationId=nat_eip_id)
-                nat_gw_id = nat_gw_response['NatGateway']['NatGatewayId']
-
-                # Чекаємо, поки NAT Gateway стане доступним
-                waiter = self.ec2.get_waiter('nat_gateway_available')
-                waiter.wait(NatGatewayIds=[nat_gw_id])
-
-                private_route_table_response = self.ec2.create_route_table(VpcId=vpc_id)
-                private_route_table_id = private_route_table_response['RouteTable']['RouteTableId']
-                self.ec2.create_route(
-                    RouteTableId=private_route_table_id,
-                    DestinationCidrBlock='0.0.0.0/0',
-                    NatGatewayId=nat_gw_id
-                )
-                self.ec2.associate_route_table(RouteTableId=private_route_table_id, SubnetId=subnet_id)
+            all_subnets = [results[f'public_subnet_{i}'] for i in range(public_subnets_count)]
+            all_subnets += [results[f'private_subnet_{i}'] for i in range(private_subnets_count)]
 
-            return vpc_id, all_subnets
+            invalidate_service(self, 'vpcs', 'subnets', 'topology')
+            return results['vpc'], all_subnets
         except Exception as e:
             raise Exception(f"Помилка створення VPC: {str(e)}")
 
+    def _journaling(self, engine, journal, on_event):
+        """Callback, що записує ресурси виконаних кроків у журнал і передає подію далі."""
+        def handle(event):
+            if event['status'] == 'done':
+                entry = self._journal_step(journal, event['step'], engine.results)
+                if entry is not None:
+                    event = dict(event, resource=entry)
+            if on_event is not None:
+                on_event(event)
+        return handle
+
+    def _journal_step(self, journal, step, results):
+        for pattern, resource_type in RESOURCE_STEPS:
+            if not pattern.fullmatch(step):
+                continue
+            result = results[step]
+            if resource_type == 'internet_gateway_attachment':
+                return journal.record(step, resource_type, results['igw'], vpc_id=results['vpc'])
+            if resource_type == 'route_table_association':
+                return journal.record(step, resource_type, result['AssociationId'])
+            if resource_type == 'subnet':
+                return journal.record(step, resource_type, result['SubnetId'])
+            return journal.record(step, resource_type, result)
+        return None
+
+    def _rollback(self, journal, on_event):
+        """Видалити ресурси з журналу і повернути підсумок для повідомлення про помилку."""
+        if on_event is not None:
+            on_event({'step': 'rollback', 'status': 'started', 'resources': len(journal)})
+        executor = RollbackExecutor(
+            self.ec2,
+            on_event=None if on_event is None else lambda event: on_event(dict(event, rollback=True))
+        )
+        self.last_rollback = executor.run(journal)
+        invalidate_service(self, 'vpcs', 'subnets', 'topology')
+
+        errors = self.last_rollback['errors']
+        if on_event is not None:
+            on_event({'step': 'rollback', 'status': 'failed' if errors else 'done', 'errors': errors})
+        if errors:
+            failed = ', '.join(f"{step} ({error})" for step, error in errors.items())
+            return f"Відкат неповний, не вдалося: {failed}. Повторний запуск використає залишені ресурси"
+        return f"Створені ресурси ({len(journal)}) видалено"
+
+    def _read_vpc_state(self, plan_id, cidr_block, public_cidrs, private_cidrs):
+        """
+        Прочитати вже створені ресурси плану кількома пакетними запитами.
+
+        :return: Словник крок -> результат для кроків, які не потрібно виконувати.
+        """
+        ec2 = self.ec2
+        plan_filter = {'Name': f'tag:{PLAN_TAG}', 'Values': [plan_id]}
+        current = {}
+
+        # Elastic IP виділяються паралельно з VPC, тож шукаються незалежно від нього.
+        addresses = index_by_step(ec2.describe_addresses(Filters=[plan_filter])['Addresses'])
+        vpcs = ec2.describe_vpcs(Filters=[
+            plan_filter,
+            {'Name': 'cidr', 'Values': [cidr_block]},
+            {'Name': 'state', 'Values': ['pending', 'available']},
+        ])['Vpcs']
+        internet_gateways = ec2.describe_internet_gateways(Filters=[plan_filter])['InternetGateways']
+        for i in range(len(private_cidrs)):
+            address = addresses.get(f'nat_eip_{i}')
+            if address is not None:
+                current[f'nat_eip_{i}'] = address['AllocationId']
+        vpc_id = vpcs[0]['VpcId'] if vpcs else None
+
+        # Internet Gateway повторно використовується, якщо він вільний або вже під'єднаний до цього VPC.
+        for igw in internet_gateways:
+            attached = [attachment['VpcId'] for attachment in igw.get('Attachments', [])
+                        if attachment['State'] in ('attaching', 'attached', 'available')]
+            if vpc_id is not None and vpc_id in attached:
+                current['igw'] = igw['InternetGatewayId']
+                current['igw_attach'] = True
+                break
+            if not attached:
+                current.setdefault('igw', igw['InternetGatewayId'])
+        if vpc_id is None:
+            return current
+
+        current['vpc'] = vpc_id
+        vpc_filter = {'Name': 'vpc-id', 'Values': [vpc_id]}
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            subnets = executor.submit(lambda: [
+                subnet for page in ec2.get_paginator('describe_subnets').paginate(Filters=[vpc_filter])
+                for subnet in page['Subnets']
+            ])
+            route_tables = executor.submit(lambda: list(iter_route_tables(ec2, [vpc_id])))
+            nat_gateways = executor.submit(lambda: [
+                nat for page in ec2.get_paginator('describe_nat_gateways').paginate(Filters=[
+                    vpc_filter, {'Name': 'state', 'Values': LIVE_NAT_STATES}
+                ])
+                for nat in page['NatGateways']
+            ])
+            subnets_by_cidr = {subnet['CidrBlock']: subnet for subnet in subnets.result()}
+            route_tables = index_by_step(route_tables.result())
+            nat_gateways = index_by_step(nat_gateways.result())
+
+        def default_route(route_table):
+            return next((route for route in route_table['Routes']
+                         if route.get('DestinationCidrBlock') == '0.0.0.0/0'), None)
+
+        def associated(route_table, subnet_id):
+            return any(association.get('SubnetId') == subnet_id
+                       for association in route_table.get('Associations', []))
+
+        public_route_table = route_tables.get('public_route_table')
+        if public_route_table is not None:
+            current['public_route_table'] = public_route_table['RouteTableId']
+            route = default_route(public_route_table)
+            if route is not None and route.get('GatewayId') == current.get('igw'):
+                current['public_route'] = True
+
+        for i, cidr in enumerate(public_cidrs):
+            subnet = subnets_by_cidr.get(cidr)
+            if subnet is None:
+                continue
+            current[f'public_subnet_{i}'] = {'SubnetId': subnet['SubnetId'], 'Type': 'Public', 'CidrBlock': cidr}
+            if public_route_table is not None and associated(public_route_table, subnet['SubnetId']):
+                current[f'public_subnet_{i}_association'] = True
+            if subnet.get('MapPublicIpOnLaunch'):
+                current[f'public_subnet_{i}_public_ip'] = True
+
+        for i, cidr in enumerate(private_cidrs):
+            subnet = subnets_by_cidr.get(cidr)
+            if subnet is not None:
+                current[f'private_subnet_{i}'] = {'SubnetId': subnet['SubnetId'], 'Type': 'Private', 'CidrBlock': cidr}
+            nat = nat_gateways.get(f'nat_gateway_{i}')
+            if nat is not None:
+                current[f'nat_gateway_{i}'] = nat['NatGatewayId']
+                # EIP, вже прив'язаний до NAT Gateway, повторно не виділяється.
+                allocation_ids = [address['AllocationId'] for address in nat.get('NatGatewayAddresses', [])
+                                  if address.get('AllocationId')]
+                if allocation_ids:
+                    current[f'nat_eip_{i}'] = allocation_ids[0]
+            route_table = route_tables.get(f'private_route_table_{i}')
+            if route_table is None:
+                continue
+            current[f'private_route_table_{i}'] = route_table['RouteTableId']
+            if subnet is not None and associated(route_table, subnet['SubnetId']):
+                current[f'private_subnet_{i}_association'] = True
+            route = default_route(route_table)
+            if route is not None and nat is not None and route.get('NatGatewayId') == nat['NatGatewayId']:
+                current[f'private_route_{i}'] = True
+        return current
+
+    def _plan_vpc(self, engine, plan_id, cidr_block, vpc_name, public_cidrs, private_cidrs, current):
+        """Описати кроки створення VPC як граф залежностей; кроки з current вже виконані."""
+        ec2 = self.ec2
+
+        def add(name, action, requires=()):
+            return engine.add(name, action, requires=requires, existing=current.get(name))
+
+        def set_default_route(route_table_id, **target):
+            # Маршрут міг лишитися від видаленого NAT Gateway - тоді його замінюємо.
+            try:
+                return ec2.create_route(RouteTableId=route_table_id, DestinationCidrBlock='0.0.0.0/0', **target)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'RouteAlreadyExists':
+                    raise
+                return ec2.replace_route(RouteTableId=route_table_id, DestinationCidrBlock='0.0.0.0/0', **target)
+
+        # Створення VPC
+        add('vpc', lambda r: ec2.create_vpc(
+            CidrBlock=cidr_block, TagSpecifications=plan_tags('vpc', plan_id, 'vpc', vpc_name)
+        )['Vpc']['VpcId'])
+        add('azs', lambda r: [
+            az['ZoneName'] for az in ec2.describe_availability_zones()['AvailabilityZones']
+        ])
+
+        # Створення Internet Gateway
+        add('igw', lambda r: ec2.create_internet_gateway(
+            TagSpecifications=plan_tags('internet-gateway', plan_id, 'igw', vpc_name)
+        )['InternetGateway']['InternetGatewayId'])
+        add('igw_attach', lambda r: ec2.attach_internet_gateway(
+            VpcId=r['vpc'], InternetGatewayId=r['igw']
+        ), requires=['vpc', 'igw'])
+
+        # Створення маршрутної таблиці для публічних сабнетів
+        add('public_route_table', lambda r: ec2.create_route_table(
+            VpcId=r['vpc'], TagSpecifications=plan_tags('route-table', plan_id, 'public_route_table')
+        )['RouteTable']['RouteTableId'], requires=['vpc'])
+        add('public_route', lambda r: set_default_route(
+            r['public_route_table'], GatewayId=r['igw']
+        ), requires=['public_route_table', 'igw_attach'])
+
+        def create_subnet(step, index, az_index, subnet_type, cidr):
+            def action(r):
+                azs = r['azs']
+                az = azs[az_index % len(azs)]
+                response = ec2.create_subnet(
+                    VpcId=r['vpc'], CidrBlock=cidr, AvailabilityZone=az,
+                    TagSpecifications=plan_tags('subnet', plan_id, step, f'{subnet_type}Subnet-{index + 1}')
+                )
+                return {'SubnetId': response['Subnet']['SubnetId'], 'Type': subnet_type, 'CidrBlock': cidr}
+            return action
+
+        # Створення публічних сабнетів
+        for i, cidr in enumerate(public_cidrs):
+            subnet = f'public_subnet_{i}'
+            add(subnet, create_subnet(subnet, i, i, 'Public', cidr), requires=['vpc', 'azs'])
+            add(f'public_subnet_{i}_association', lambda r, subnet=subnet: ec2.associate_route_table(
+                RouteTableId=r['public_route_table'], SubnetId=r[subnet]['SubnetId']
+            ), requires=[subnet, 'public_route_table'])
+            add(f'public_subnet_{i}_public_ip', lambda r, subnet=subnet: ec2.modify_subnet_attribute(
+                SubnetId=r[subnet]['SubnetId'], MapPublicIpOnLaunch={"Value": True}
+            ), requires=[subnet])
+
+        # Створення приватних сабнетів з NAT Gateway
+        nat_steps = []
+        for i, cidr in enumerate(private_cidrs):
+            subnet = f'private_subnet_{i}'
+            add(subnet, create_subnet(subnet, i, len(public_cidrs) + i, 'Private', cidr), requires=['vpc', 'azs'])
+            eip = add(f'nat_eip_{i}', lambda r, step=f'nat_eip_{i}': ec2.allocate_address(
+                Domain='vpc', TagSpecifications=plan_tags('elastic-ip', plan_id, step)
+            )['AllocationId'])
+            nat = add(f'nat_gateway_{i}', lambda r, subnet=subnet, eip=eip, step=f'nat_gateway_{i}': ec2.create_nat_gateway(
+                SubnetId=r[subnet]['SubnetId'], AllocationId=r[eip],
+                TagSpecifications=plan_tags('natgateway', plan_id, step)
+            )['NatGateway']['NatGatewayId'], requires=[subnet, eip])
+            nat_steps.append(nat)
+
+            route_table = add(f'private_route_table_{i}', lambda r, step=f'private_route_table_{i}': ec2.create_route_table(
+                VpcId=r['vpc'], TagSpecifications=plan_tags('route-table', plan_id, step)
+            )['RouteTable']['RouteTableId'], requires=['vpc'])
+            add(f'private_subnet_{i}_association', lambda r, subnet=subnet, route_table=route_table: ec2.associate_route_table(
+                RouteTableId=r[route_table], SubnetId=r[subnet]['SubnetId']
+            ), requires=[subnet, route_table])
+            add(f'private_route_{i}', lambda r, route_table=route_table, nat=nat: set_default_route(
+                r[route_table], NatGatewayId=r[nat]
+            ), requires=[route_table, 'nat_gateways_available'])
+
+        # Чекаємо, поки всі NAT Gateway стануть доступними (один waiter на всі)
+        engine.add('nat_gateways_available', lambda r: ec2.get_waiter('nat_gateway_available').wait(
+            NatGatewayIds=[r[nat] for nat in nat_steps]
+        ) if nat_steps else None, requires=nat_steps)
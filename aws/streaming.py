@@ -0,0 +1,34 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+def stream_json(sections):
+    """
+    Серіалізувати словник ітераторів у JSON по одному елементу.
+
+    Кожен ключ стає масивом у відповіді, тож у пам'яті тримається лише
+    поточна сторінка даних. Якщо ітератор падає посеред потоку, масив
+    закривається, а текст помилки додається ключем "error", щоб відповідь
+    залишалась валідним JSON.
+    """
+    yield '{'
+    in_list = False
+    try:
+        for index, (key, items) in enumerate(sections.items()):
+            yield f'{", " if index else ""}{json.dumps(key)}: ['
+            in_list = True
+            for position, item in enumerate(items):
+                yield f'{", " if position else ""}{json.dumps(item, cls=DjangoJSONEncoder)}'
+            yield ']'
+            in_list = False
+    except Exception as e:
+        yield f'{"]" if in_list else ""}, "error": {json.dumps(str(e))}'
+    yield '}'
+
+
+def stream_json_response(sections, **kwargs):
+    """Повернути StreamingHttpResponse, що віддає JSON поступово."""
+    return StreamingHttpResponse(stream_json(sections), content_type='application/json', **kwargs)
+
@@ -1,3 +1,1588 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import os
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-# Create your tests here.
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from common.jobs import run_pending
+from common.models import Job
+from dashboard.models import UserProfile
+
+from .models import AmiCatalogEntry, InventorySearchEntry, InventoryVpc
+
+from .services import cache as aws_cache
+from .services.ami_catalog import SSM_BATCH_SIZE, AMICatalog
+from .services.async_services import AsyncService
+from .services.clients import ClientRegistry, timeout_config
+from .views import load_widget
+from .services.ec2_service import EC2Service
+from .services.instance_watcher import (
+    MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, RegionPoller, _pollers, watch_instances
+)
+from .services.inventory import InventorySyncer
+from .services.inventory_search import parse_query, search as search_inventory
+from .services.network import build_route_table_index, classify_subnets
+from .services.provisioning import ProvisioningEngine, ProvisioningError
+from .services.rollback import ResourceJournal, RollbackExecutor
+from .services.s3_bulk import BulkOperations, is_same_file, local_etag, local_path, normalize_prefix
+from .services.s3_transfer import MIN_PART_SIZE, MultipartStreamUpload, ResumableUpload
+from .services.security_groups import RuleSet, apply_rule_set
+from .services.vpc import VPCService
+from .streaming import stream_json
+
+
+class FakePaginator:
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **kwargs):
+        yield self.method(**kwargs)
+
+
+class FakeS3:
+    """Мінімальний S3 у пам'яті: об'єкти зберігаються як bucket -> key -> bytes."""
+
+    def __init__(self, objects=None):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        for bucket, items in (objects or {}).items():
+            self.buckets[bucket] = dict(items)
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return FakePaginator(self._list)
+
+    def _list(self, Bucket, Prefix=''):
+        return {'Contents': [
+            {'Key': key, 'Size': len(body), 'ETag': f'"{hashlib.md5(body).hexdigest()}"'}
+            for key, body in sorted(self.buckets.get(Bucket, {}).items()) if key.startswith(Prefix)
+        ]}
+
+    def upload_file(self, path, bucket, key, Config=None):
+        with open(path, 'rb') as source, self.lock:
+            self.buckets.setdefault(bucket, {})[key] = source.read()
+
+    def download_file(self, bucket, key, path, Config=None):
+        with open(path, 'wb') as target:
+            target.write(self.buckets[bucket][key])
+
+    def copy_object(self, CopySource, Bucket, Key):
+        with self.lock:
+            body = self.buckets[CopySource['Bucket']][CopySource['Key']]
+            self.buckets.setdefault(Bucket, {})[Key] = body
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self.buckets[Bucket].pop(item['Key'], None)
+        return {}
+
+
+def write_files(root, files):
+    for relative, body in files.items():
+        path = os.path.join(root, *relative.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as target:
+            target.write(body)
+
+
+def read_files(root):
+    result = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as source:
+                result[os.path.relpath(path, root).replace(os.sep, '/')] = source.read()
+    return result
+
+
+class ClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(maxsize=2)
+
+    def test_client_is_reused_for_same_credentials_service_and_region(self):
+        client = self.registry.get('ec2', 'key', 'secret', 'eu-west-1')
+        self.assertIs(self.registry.get('ec2', 'key', 'secret', 'eu-west-1'), client)
+        self.assertIsNot(self.registry.get('ec2', 'key', 'secret', 'us-east-1'), client)
+        self.assertEqual(client.meta.region_name, 'eu-west-1')
+
+    def test_different_credentials_get_separate_clients(self):
+        client = self.registry.get('s3', 'key', 'secret', 'eu-west-1')
+        self.assertIsNot(self.registry.get('s3', 'key', 'rotated', 'eu-west-1'), client)
+        self.assertIsNot(self.registry.get('s3', 'other', 'secret', 'eu-west-1'), client)
+
+    def test_least_recently_used_client_is_evicted(self):
+        first = self.registry.get('ec2', 'key', 'secret', 'eu-west-1')
+        second = self.registry.get('ec2', 'key', 'secret', 'eu-central-1')
+        self.registry.get('ec2', 'key', 'secret', 'eu-west-1')
+        self.registry.get('ec2', 'key', 'secret', 'us-east-1')
+
+        self.assertEqual(len(self.registry), 2)
+        self.assertIs(self.registry.get('ec2', 'key', 'secret', 'eu-west-1'), first)
+        self.assertIsNot(self.registry.get('ec2', 'key', 'secret', 'eu-central-1'), second)
+
+    def test_global_service_ignores_region(self):
+        client = self.registry.get('iam', 'key', 'secret', 'eu-west-1')
+        self.assertIs(self.registry.get('iam', 'key', 'secret', 'ap-south-1'), client)
+        self.assertEqual(len(self.registry), 1)
+
+    def test_timeout_configures_client(self):
+        client = self.registry.get('ec2', 'key', 'secret', 'eu-west-1', timeout=4)
+        self.assertIsNot(self.registry.get('ec2', 'key', 'secret', 'eu-west-1'), client)
+        self.assertEqual((client.meta.config.connect_timeout, client.meta.config.read_timeout), (2, 2))
+        self.assertEqual(client.meta.config.max_pool_connections, self.registry.config.max_pool_connections)
+
+
+AMI_CATALOG = [
+    {'label': f'Image {number:02d}', 'parameter': f'/images/{number}', 'owner': 'amazon',
+     'name_pattern': f'image-{number}-*'}
+    for number in range(SSM_BATCH_SIZE + 1)
+]
+
+
+class FakeAmiAWS:
+    """
+    SSM і EC2 для каталогу AMI.
+
+    parameters - SSM параметр -> (image_id, version); images - шаблон імені -> образи для describe_images.
+    """
+
+    def __init__(self, parameters, images=None, ssm_error=None):
+        self.parameters = parameters
+        self.images = images or {}
+        self.ssm_error = ssm_error
+        self.calls = []
+
+    def called(self, name):
+        return [args for call, args in self.calls if call == name]
+
+    def get_parameters(self, Names):
+        self.calls.append(('get_parameters', list(Names)))
+        if self.ssm_error:
+            raise self.ssm_error
+        return {
+            'Parameters': [
+                {'Name': name, 'Value': self.parameters[name][0], 'Version': self.parameters[name][1]}
+                for name in Names if name in self.parameters
+            ],
+            'InvalidParameters': [name for name in Names if name not in self.parameters],
+        }
+
+    def get_paginator(self, name):
+        return FakePaginator(self.search_images)
+
+    def search_images(self, Owners, Filters):
+        pattern = Filters[0]['Values'][0]
+        self.calls.append(('search_images', pattern))
+        return {'Images': self.images.get(pattern, [])}
+
+    def describe_images(self, ImageIds, Filters):
+        self.calls.append(('describe_images', sorted(ImageIds)))
+        return {'Images': [
+            {'ImageId': image_id, 'Name': f'name-{image_id}', 'Architecture': 'x86_64', 'CreationDate': '2024-01-01'}
+            for image_id in ImageIds
+        ]}
+
+
+@override_settings(AWS_AMI_CATALOG=AMI_CATALOG, AWS_AMI_CATALOG_MAX_AGE=60)
+class AMICatalogTests(TestCase):
+    def setUp(self):
+        self.aws = FakeAmiAWS({item['parameter']: (f'ami-{index}', 1) for index, item in enumerate(AMI_CATALOG)})
+
+    def catalog(self, region='eu-west-1'):
+        return AMICatalog(self.aws, self.aws, region)
+
+    def test_parameters_are_read_in_batches(self):
+        choices = self.catalog().choices()
+
+        self.assertEqual([len(names) for names in self.aws.called('get_parameters')], [SSM_BATCH_SIZE, 1])
+        self.assertEqual(len(choices), len(AMI_CATALOG))
+        self.assertEqual(choices[0], ('ami-0', 'Image 00 - name-ami-0 (ami-0)'))
+        self.assertEqual(len(self.aws.called('describe_images')), 1)
+        self.assertEqual(self.aws.called('search_images'), [])
+
+    def test_parameter_missing_in_region_falls_back_to_image_search(self):
+        del self.aws.parameters['/images/10']
+        self.aws.images['image-10-*'] = [
+            {'ImageId': 'ami-old', 'CreationDate': '2023-01-01'},
+            {'ImageId': 'ami-new', 'CreationDate': '2024-06-01'},
+        ]
+
+        self.catalog().choices()
+
+        self.assertEqual(self.aws.called('search_images'), ['image-10-*'])
+        self.assertEqual(AmiCatalogEntry.objects.get(parameter='/images/10').image_id, 'ami-new')
+
+    def test_ssm_failure_searches_every_image(self):
+        self.aws.ssm_error = ClientError({'Error': {'Code': 'AccessDeniedException'}}, 'GetParameters')
+        self.aws.images = {item['name_pattern']: [{'ImageId': f'ami-{index}', 'CreationDate': '2024-01-01'}]
+                           for index, item in enumerate(AMI_CATALOG)}
+
+        self.assertEqual(len(self.catalog().choices()), len(AMI_CATALOG))
+        self.assertEqual(len(self.aws.called('search_images')), len(AMI_CATALOG))
+
+    def test_fresh_catalog_is_read_from_database(self):
+        self.catalog().choices()
+        self.aws.calls.clear()
+
+        self.assertEqual(len(self.catalog().choices()), len(AMI_CATALOG))
+        self.assertEqual(self.aws.calls, [])
+
+    def test_stale_catalog_describes_only_changed_images(self):
+        self.catalog().choices()
+        self.catalog('us-east-1').choices()
+        stale = timezone.now() - timedelta(seconds=61)
+        AmiCatalogEntry.objects.filter(region='eu-west-1').update(checked_at=stale)
+        self.aws.parameters['/images/3'] = ('ami-3-new', 2)
+        self.aws.calls.clear()
+
+        self.catalog().choices()
+
+        self.assertEqual(self.aws.called('describe_images'), [['ami-3-new']])
+        entries = AmiCatalogEntry.objects.filter(region='eu-west-1')
+        self.assertEqual(entries.get(parameter='/images/3').image_id, 'ami-3-new')
+        self.assertFalse(entries.filter(checked_at__lte=stale).exists())
+        self.assertEqual(AmiCatalogEntry.objects.get(region='us-east-1', parameter='/images/3').image_id, 'ami-3')
+
+
+def route_table(route_table_id, vpc_id, routes, subnets=(), main=False):
+    associations = [{'SubnetId': subnet_id} for subnet_id in subnets]
+    if main:
+        associations.append({'Main': True})
+    routes = [{'DestinationCidrBlock': '10.0.0.0/16', 'GatewayId': 'local'}] + routes
+    return {'RouteTableId': route_table_id, 'VpcId': vpc_id, 'Routes': routes, 'Associations': associations}
+
+
+class SubnetClassificationTests(SimpleTestCase):
+    def setUp(self):
+        self.route_tables = [
+            route_table('rtb-main', 'vpc-1', [{'DestinationCidrBlock': '0.0.0.0/0', 'GatewayId': 'igw-1'}], main=True),
+            route_table('rtb-public', 'vpc-1', [{'DestinationCidrBlock': '0.0.0.0/0', 'GatewayId': 'igw-1'}],
+                        subnets=['subnet-public']),
+            route_table('rtb-nat', 'vpc-1', [{'DestinationCidrBlock': '0.0.0.0/0', 'NatGatewayId': 'nat-1'}],
+                        subnets=['subnet-nat']),
+            route_table('rtb-main-2', 'vpc-2', [], main=True),
+        ]
+
+    def test_route_table_index(self):
+        by_subnet, main_by_vpc = build_route_table_index(self.route_tables)
+        self.assertEqual({subnet: table['RouteTableId'] for subnet, table in by_subnet.items()},
+                         {'subnet-public': 'rtb-public', 'subnet-nat': 'rtb-nat'})
+        self.assertEqual({vpc: table['RouteTableId'] for vpc, table in main_by_vpc.items()},
+                         {'vpc-1': 'rtb-main', 'vpc-2': 'rtb-main-2'})
+
+    def test_subnets_are_classified_by_their_route_table(self):
+        subnets = [
+            {'SubnetId': 'subnet-public', 'VpcId': 'vpc-1'},
+            {'SubnetId': 'subnet-nat', 'VpcId': 'vpc-1'},
+            {'SubnetId': 'subnet-implicit', 'VpcId': 'vpc-1'},
+            {'SubnetId': 'subnet-isolated', 'VpcId': 'vpc-2'},
+            {'SubnetId': 'subnet-unknown', 'VpcId': 'vpc-3'},
+        ]
+        result = classify_subnets(subnets, iter(self.route_tables))
+        self.assertEqual([subnet['SubnetId'] for subnet in result['public']], ['subnet-public', 'subnet-implicit'])
+        self.assertEqual([subnet['SubnetId'] for subnet in result['private']],
+                         ['subnet-nat', 'subnet-isolated', 'subnet-unknown'])
+
+
+class S3SyncTests(SimpleTestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp.cleanup)
+        self.local_dir = os.path.join(self.temp.name, 'local')
+        os.makedirs(self.local_dir)
+
+    def test_normalize_prefix(self):
+        self.assertEqual(normalize_prefix('backup'), 'backup/')
+        self.assertEqual(normalize_prefix('/backup/'), 'backup/')
+        self.assertEqual(normalize_prefix(''), '')
+
+    def test_local_path_rejects_escaping_keys(self):
+        self.assertEqual(local_path(self.local_dir, 'a/b.txt'),
+                         os.path.join(os.path.realpath(self.local_dir), 'a', 'b.txt'))
+        for key in ('../evil.txt', 'a/../../evil.txt', '/etc/passwd', '..'):
+            with self.assertRaises(ValueError):
+                local_path(self.local_dir, key)
+
+    def test_sync_to_bucket_without_trailing_slash(self):
+        write_files(self.local_dir, {'a.txt': b'new', 'sub/b.txt': b'b'})
+        s3 = FakeS3({'bucket': {'backup/a.txt': b'old', 'backup/stale.txt': b's', 'backup2/keep.txt': b'k'}})
+
+        result = BulkOperations(s3).sync_to_bucket(self.local_dir, 'bucket', 'backup', delete=True)
+
+        self.assertEqual(s3.buckets['bucket'], {
+            'backup/a.txt': b'new', 'backup/sub/b.txt': b'b', 'backup2/keep.txt': b'k'
+        })
+        self.assertEqual((result['uploaded'], result['deleted'], result['errors']), (2, 1, []))
+
+    def test_sync_to_bucket_skips_unchanged(self):
+        write_files(self.local_dir, {'a.txt': b'same'})
+        s3 = FakeS3({'bucket': {'backup/a.txt': b'same'}})
+
+        result = BulkOperations(s3).sync_to_bucket(self.local_dir, 'bucket', 'backup/')
+
+        self.assertEqual((result['uploaded'], result['unchanged']), (0, 1))
+
+    def test_sync_from_bucket_without_trailing_slash(self):
+        write_files(self.local_dir, {'a.txt': b'old', 'local-only.txt': b'x'})
+        s3 = FakeS3({'bucket': {'backup/a.txt': b'new', 'backup/sub/b.txt': b'b', 'backup2/other.txt': b'o'}})
+
+        result = BulkOperations(s3).sync_from_bucket('bucket', 'backup', self.local_dir, delete=True)
+
+        self.assertEqual(read_files(self.local_dir), {'a.txt': b'new', 'sub/b.txt': b'b'})
+        self.assertEqual((result['downloaded'], result['deleted'], result['errors']), (2, 1, []))
+        self.assertEqual(read_files(self.temp.name).keys(), {'local/a.txt', 'local/sub/b.txt'})
+
+    def test_sync_from_bucket_rejects_path_traversal(self):
+        s3 = FakeS3({'bucket': {'backup/../escape.txt': b'x', 'backup/ok.txt': b'ok'}})
+
+        result = BulkOperations(s3).sync_from_bucket('bucket', 'backup', self.local_dir, delete=True)
+
+        self.assertEqual(read_files(self.temp.name), {'local/ok.txt': b'ok'})
+        self.assertEqual(result['downloaded'], 1)
+        self.assertEqual([error['item'] for error in result['errors']], ['backup/../escape.txt'])
+
+    def test_etags_are_compared_in_the_worker_pool(self):
+        write_files(self.local_dir, {'a.txt': b'same', 'b.txt': b'same', 'c.txt': b'changed'})
+        s3 = FakeS3({'bucket': {'a.txt': b'same', 'b.txt': b'same', 'c.txt': b'other!!'}})
+        threads = []
+
+        def compare(*args):
+            threads.append(threading.current_thread())
+            return is_same_file(*args)
+
+        with mock.patch('aws.services.s3_bulk.is_same_file', side_effect=compare):
+            uploaded = BulkOperations(s3).sync_to_bucket(self.local_dir, 'bucket')
+            downloaded = BulkOperations(s3).sync_from_bucket('bucket', '', self.local_dir)
+
+        self.assertEqual((uploaded['uploaded'], uploaded['unchanged']), (1, 2))
+        self.assertEqual((downloaded['downloaded'], downloaded['unchanged']), (0, 3))
+        self.assertEqual(len(threads), 6)
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+class InstanceEventsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+        self.url = reverse('aws:instance_events') + '?region=eu-west-1&ids=i-1'
+
+    def test_wsgi_request_gets_no_content(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    def test_ec2_list_includes_watcher_only_under_asgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('aws:ec2_list'))
+        self.assertFalse(response.context['live_updates'])
+        self.assertNotContains(response, 'EventSource')
+
+
+class FakeStatusService:
+    """Асинхронний EC2 сервіс, що віддає стани зі словника states і запам'ятовує опитані ID."""
+
+    states = {}
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def describe_instance_states(self, instance_ids):
+        self.calls.append(sorted(instance_ids))
+        return {instance_id: self.states[instance_id] for instance_id in instance_ids if instance_id in self.states}
+
+
+def status(state):
+    return {'State': state, 'InstanceStatus': 'ok', 'SystemStatus': 'ok'}
+
+
+class RegionPollerTests(SimpleTestCase):
+    def setUp(self):
+        FakeStatusService.states = {'i-1': status('running'), 'i-2': status('stopped')}
+        FakeStatusService.calls = []
+        patcher = mock.patch('aws.services.instance_watcher.AsyncEC2Service', FakeStatusService)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_subscribers_share_one_poll(self):
+        first = watch_instances('key', 'secret', 'eu-west-1', ['i-1'])
+        second = watch_instances('key', 'secret', 'eu-west-1', ['i-1', 'i-2'])
+        self.assertIs(first.poller, second.poller)
+
+        self.assertEqual(await asyncio.wait_for(first.get(), 1), ('i-1', status('running')))
+        received = dict([await asyncio.wait_for(second.get(), 1), await asyncio.wait_for(second.get(), 1)])
+        self.assertEqual(received, {'i-1': status('running'), 'i-2': status('stopped')})
+        self.assertEqual(FakeStatusService.calls, [['i-1', 'i-2']])
+
+        first.close()
+        second.close()
+        await asyncio.wait_for(first.poller._task, 1)
+
+    async def test_last_unsubscribe_stops_poller(self):
+        subscription = watch_instances('key', 'secret', 'eu-west-1', ['i-1'])
+        poller = subscription.poller
+        self.assertIn(poller.key, _pollers)
+        await asyncio.wait_for(subscription.get(), 1)
+
+        subscription.close()
+        await asyncio.wait_for(poller._task, 1)
+
+        self.assertNotIn(poller.key, _pollers)
+        self.assertFalse(poller.watched)
+        self.assertFalse(poller.states)
+
+    async def test_interval_backs_off_while_nothing_changes(self):
+        poller = RegionPoller('key', 'key', 'secret', 'eu-west-1')
+        poller.watched.update(['i-1'])
+        intervals = []
+        for _ in range(7):
+            await poller.poll()
+            intervals.append(poller.interval)
+        self.assertEqual(intervals, [MIN_POLL_INTERVAL, 4.0, 8.0, 16.0, 32.0, MAX_POLL_INTERVAL, MAX_POLL_INTERVAL])
+
+        FakeStatusService.states['i-1'] = status('stopping')
+        self.assertEqual(await poller.poll(), 1)
+        self.assertEqual(poller.interval, MIN_POLL_INTERVAL)
+        # Перехідний стан тримає мінімальний інтервал, навіть якщо змін немає.
+        self.assertEqual(await poller.poll(), 0)
+        self.assertEqual(poller.interval, MIN_POLL_INTERVAL)
+
+
+def instance_page(*instance_ids, next_token=None):
+    page = {'Reservations': [{'Instances': [
+        {'InstanceId': instance_id, 'State': {'Name': 'running'}, 'InstanceType': 't3.micro',
+         'Placement': {'AvailabilityZone': 'eu-west-1a'}}
+        for instance_id in instance_ids
+    ]}]}
+    if next_token:
+        page['NextToken'] = next_token
+    return page
+
+
+class EC2PaginationTests(SimpleTestCase):
+    def setUp(self):
+        self.ec2 = boto3.client('ec2', region_name='eu-west-1', aws_access_key_id='key', aws_secret_access_key='secret')
+        self.stubber = Stubber(self.ec2)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        patcher = mock.patch('aws.services.ec2_service.get_client', return_value=self.ec2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = EC2Service('key', 'secret', region='eu-west-1')
+
+    def test_iter_instances_follows_next_token(self):
+        self.stubber.add_response('describe_instances', instance_page('i-1', 'i-2', next_token='page-2'), {})
+        self.stubber.add_response('describe_instances', instance_page('i-3', next_token='page-3'),
+                                  {'NextToken': 'page-2'})
+        self.stubber.add_response('describe_instances', instance_page('i-4'), {'NextToken': 'page-3'})
+
+        instances = list(self.service.iter_instances())
+
+        self.assertEqual([instance['InstanceId'] for instance in instances], ['i-1', 'i-2', 'i-3', 'i-4'])
+        self.assertEqual(instances[0]['RegionName'], 'eu-west-1')
+        self.stubber.assert_no_pending_responses()
+
+    def test_iter_subnets_follows_next_token(self):
+        filters = [{'Name': 'vpc-id', 'Values': ['vpc-1']}]
+        subnet = {'CidrBlock': '10.0.0.0/24', 'AvailabilityZone': 'eu-west-1a'}
+        self.stubber.add_response('describe_subnets', {'Subnets': [{'SubnetId': 'subnet-1', **subnet}],
+                                                       'NextToken': 'page-2'}, {'Filters': filters})
+        self.stubber.add_response('describe_subnets', {'Subnets': [{'SubnetId': 'subnet-2', **subnet}]},
+                                  {'Filters': filters, 'NextToken': 'page-2'})
+
+        subnets = list(self.service.iter_subnets('vpc-1'))
+
+        self.assertEqual([item['SubnetId'] for item in subnets], ['subnet-1', 'subnet-2'])
+        self.stubber.assert_no_pending_responses()
+
+    def test_stream_json_stays_valid_when_a_page_fails(self):
+        self.stubber.add_response('describe_instances', instance_page('i-1', 'i-2', next_token='page-2'), {})
+        self.stubber.add_client_error('describe_instances', 'RequestLimitExceeded',
+                                      expected_params={'NextToken': 'page-2'})
+
+        payload = json.loads(''.join(stream_json({'instances': self.service.iter_instances(), 'vpcs': iter([])})))
+
+        self.assertEqual([instance['InstanceId'] for instance in payload['instances']], ['i-1', 'i-2'])
+        self.assertNotIn('vpcs', payload)
+        self.assertIn('RequestLimitExceeded', payload['error'])
+
+    def test_stream_json_reports_error_between_sections(self):
+        def failing():
+            raise Exception('boom')
+            yield
+
+        payload = json.loads(''.join(stream_json({'vpcs': iter([{'VpcId': 'vpc-1'}]), 'subnets': failing()})))
+
+        self.assertEqual(payload, {'vpcs': [{'VpcId': 'vpc-1'}], 'subnets': [], 'error': 'boom'})
+
+
+class EC2LaunchTests(SimpleTestCase):
+    def setUp(self):
+        self.ec2 = mock.MagicMock()
+        self.ec2.run_instances.side_effect = lambda **params: {
+            'Instances': [{'InstanceId': f"i-{params['SubnetId']}-{n}"} for n in range(params['MaxCount'])]
+        }
+        patcher = mock.patch('aws.services.ec2_service.get_client', return_value=self.ec2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = EC2Service('key', 'secret')
+
+    def test_create_instance_passes_client_token(self):
+        instance_id = self.service.create_instance('t3.micro', 'ami-1', 8, 'web', 'key', 'sg-1', 'subnet-1',
+                                                   client_token='token')
+
+        self.assertEqual(instance_id, 'i-subnet-1-0')
+        params = self.ec2.run_instances.call_args.kwargs
+        self.assertEqual(params['ClientToken'], 'token')
+        self.assertEqual(params['TagSpecifications'][0]['Tags'], [{'Key': 'Name', 'Value': 'web'}])
+        # Дедуплікації за тегом Name більше немає: describe_instances не викликається.
+        self.ec2.describe_instances.assert_not_called()
+
+    def test_fleet_spreads_instances_with_per_subnet_tokens(self):
+        result = self.service.launch_fleet('t3.micro', 'ami-1', 5, ['subnet-a', 'subnet-b'], 'sg-1', 'key', 'web',
+                                           wait=False, client_token='token')
+
+        calls = {call.kwargs['SubnetId']: call.kwargs for call in self.ec2.run_instances.call_args_list}
+        self.assertEqual({subnet: params['MaxCount'] for subnet, params in calls.items()},
+                         {'subnet-a': 3, 'subnet-b': 2})
+        self.assertEqual(calls['subnet-a']['ClientToken'], 'token:subnet-a')
+        self.assertEqual(calls['subnet-a']['MinCount'], 3)
+        self.assertEqual(len(result['instances']), 5)
+        self.assertEqual(self.ec2.create_tags.call_count, 5)
+
+    def test_fleet_allow_partial_accepts_fewer_instances(self):
+        self.ec2.run_instances.side_effect = lambda **params: {
+            'Instances': [{'InstanceId': f"i-{params['SubnetId']}-0"}]
+        }
+        result = self.service.launch_fleet('t3.micro', 'ami-1', 4, ['subnet-a'], 'sg-1', 'key', 'web',
+                                           wait=False, allow_partial=True)
+
+        params = self.ec2.run_instances.call_args.kwargs
+        self.assertEqual((params['MinCount'], params['MaxCount']), (1, 4))
+        self.assertEqual(result['instances'], ['i-subnet-a-0'])
+
+
+class LaunchFleetJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+
+    def test_job_passes_allow_partial(self):
+        job = Job.objects.create(kind='aws.launch_fleet', user=self.user, payload={
+            'instance_type': 't3.micro', 'ami_id': 'ami-1', 'count': 2, 'subnet_ids': ['subnet-a'],
+            'sg_id': 'sg-1', 'ssh_key_name': 'key', 'name_prefix': 'web', 'allow_partial': True,
+        })
+        with mock.patch('aws.jobs.EC2Service') as service:
+            service.return_value.launch_fleet.return_value = {'instances': []}
+            run_pending()
+
+        self.assertTrue(service.return_value.launch_fleet.call_args.kwargs['allow_partial'])
+
+
+class S3UploadProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+        self.client.force_login(self.user)
+        self.s3 = mock.MagicMock()
+        self.s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        self.s3.upload_part.side_effect = lambda **params: {'ETag': f"etag-{params['PartNumber']}"}
+        patcher = mock.patch('aws.services.s3_service.get_client', return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_streaming_put_publishes_progress(self):
+        body = b'x' * (10 * 1024 * 1024)
+        response = self.client.generic(
+            'PUT', reverse('aws:s3_upload') + '?bucket=bucket&key=file.bin&upload=abc-123', body,
+            content_type='application/octet-stream'
+        )
+
+        self.assertEqual(response.json(), {'bucket': 'bucket', 'key': 'file.bin', 'size': len(body), 'parts': 2})
+        progress = self.client.get(reverse('aws:s3_upload_progress') + '?upload=abc-123')
+        self.assertEqual(progress.json(), {'uploaded': len(body), 'total': len(body)})
+
+    def test_progress_is_private_and_validated(self):
+        self.assertEqual(self.client.get(reverse('aws:s3_upload_progress') + '?upload=missing').status_code, 404)
+        self.assertEqual(self.client.get(reverse('aws:s3_upload_progress') + '?upload=../x').status_code, 400)
+
+
+class S3UrlTests(SimpleTestCase):
+    def test_bucket_routes_do_not_shadow_fixed_pages(self):
+        for name in ('create', 'upload'):
+            self.assertEqual(resolve(reverse('aws:s3_browse', args=[name])).url_name, 's3_browse')
+            self.assertEqual(resolve(reverse(f'aws:s3_{name}')).url_name, f's3_{name}')
+
+
+class S3BulkEntryPointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+        self.client.force_login(self.user)
+        self.s3 = FakeS3({'bucket': {'logs/a.txt': b'a', 'logs/b/c.txt': b'c', 'other.txt': b'o'}})
+        patcher = mock.patch('aws.services.s3_service.get_client', return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_browse_page_polls_routed_job_url(self):
+        response = self.client.get(reverse('aws:s3_browse', args=['bucket']))
+        self.assertContains(response, f"const jobStatusUrl = '{reverse('common:job_status', args=[0])}';")
+        self.assertNotContains(response, '`/jobs/')
+
+    def test_delete_prefix_enqueues_job(self):
+        response = self.client.post(reverse('aws:s3_delete_prefix', args=['bucket']), {'prefix': 'logs/'})
+        job = Job.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.kind, 'aws.s3_delete_prefix')
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(set(self.s3.buckets['bucket']), {'other.txt'})
+
+    def test_delete_prefix_refuses_whole_bucket(self):
+        response = self.client.post(reverse('aws:s3_delete_prefix', args=['bucket']), {'prefix': '/'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_copy_prefix_enqueues_job(self):
+        response = self.client.post(reverse('aws:s3_copy_prefix', args=['bucket']),
+                                    {'prefix': 'logs', 'dest_bucket': 'backup', 'dest_prefix': '2024'})
+        job = Job.objects.get(id=response.json()['job_id'])
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(set(self.s3.buckets['backup']), {'2024/a.txt', '2024/b/c.txt'})
+
+    def test_copy_prefix_onto_itself_is_rejected(self):
+        response = self.client.post(reverse('aws:s3_copy_prefix', args=['bucket']),
+                                    {'prefix': 'logs/', 'dest_prefix': 'logs'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sync_command_uploads_directory(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_files(root, {'x.txt': b'x', 'nested/y.txt': b'y'})
+            call_command('s3_sync', username='owner', bucket='bucket', local_dir=root, prefix='backup',
+                         stdout=io.StringIO())
+        self.assertEqual(self.s3.buckets['bucket']['backup/nested/y.txt'], b'y')
+
+    def test_sync_command_requires_profile(self):
+        with self.assertRaises(CommandError):
+            call_command('s3_sync', username='missing', bucket='bucket', local_dir='.')
+
+
+class InlineThread:
+    """Замінник threading.Thread, що виконує ціль одразу в start()."""
+
+    def __init__(self, target, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.addCleanup(mock.patch.stopall)
+        mock.patch('aws.services.cache.time.time', side_effect=lambda: self.now).start()
+        mock.patch('aws.services.cache.threading.Thread', InlineThread).start()
+        self.connection = mock.patch('aws.services.cache.connection').start()
+        self.fetch = mock.Mock(side_effect=['old', 'new'])
+
+    def fetch_vpcs(self):
+        return aws_cache.cached_fetch('fingerprint', 'us-east-1', 'vpcs', self.fetch)
+
+    def test_fresh_entry_is_served_from_cache(self):
+        self.assertEqual(self.fetch_vpcs(), 'old')
+        self.assertEqual(self.fetch_vpcs(), 'old')
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_stale_entry_is_returned_and_refreshed_in_background(self):
+        self.fetch_vpcs()
+        self.now += aws_cache.get_ttl('vpcs') + 1
+
+        self.assertEqual(self.fetch_vpcs(), 'old')
+        self.assertEqual(self.fetch.call_count, 2)
+        self.connection.close.assert_called_once_with()
+        self.assertEqual(self.fetch_vpcs(), 'new')
+
+    def test_refresh_runs_once_while_locked(self):
+        self.fetch_vpcs()
+        self.now += aws_cache.get_ttl('vpcs') + 1
+        key = aws_cache._make_key('fingerprint', 'us-east-1', 'vpcs', ())
+        cache.add(f"{key}:refreshing", True)
+
+        self.assertEqual(self.fetch_vpcs(), 'old')
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_failed_refresh_releases_lock_and_connection(self):
+        self.fetch.side_effect = ['old', Exception('boom')]
+        self.fetch_vpcs()
+        self.now += aws_cache.get_ttl('vpcs') + 1
+
+        with self.assertLogs('aws.services.cache', 'ERROR'):
+            self.assertEqual(self.fetch_vpcs(), 'old')
+        key = aws_cache._make_key('fingerprint', 'us-east-1', 'vpcs', ())
+        self.assertIsNone(cache.get(f"{key}:refreshing"))
+        self.connection.close.assert_called_once_with()
+
+    def test_invalidate_skips_cached_entry(self):
+        self.fetch_vpcs()
+        aws_cache.invalidate('fingerprint', 'us-east-1', 'vpcs')
+        self.assertEqual(self.fetch_vpcs(), 'new')
+
+
+class FakeSecurityGroupEC2:
+    """EC2 з однією групою безпеки, що зберігає вхідні правила як IpPermissions."""
+
+    def __init__(self, ip_permissions=()):
+        self.rules = RuleSet.from_ip_permissions(ip_permissions)
+        self.authorize_calls = []
+        self.revoke_calls = []
+
+    def describe_security_groups(self, GroupIds):
+        return {'SecurityGroups': [{'GroupId': GroupIds[0], 'IpPermissions': self.rules.to_ip_permissions()}]}
+
+    def authorize_security_group_ingress(self, GroupId, IpPermissions):
+        self.authorize_calls.append(IpPermissions)
+        self.rules = RuleSet(self.rules.rules | RuleSet.from_ip_permissions(IpPermissions).rules)
+
+    def revoke_security_group_ingress(self, GroupId, IpPermissions):
+        self.revoke_calls.append(IpPermissions)
+        self.rules = self.rules - RuleSet.from_ip_permissions(IpPermissions)
+
+
+class RuleSetTests(SimpleTestCase):
+    def test_port_specs_are_parsed(self):
+        rules = RuleSet().allow([22, '8000-8100', 'udp:53', 'icmp:', (443, 443)]).rules
+        self.assertEqual(rules, {
+            ('tcp', 22, 22, '0.0.0.0/0'), ('tcp', 8000, 8100, '0.0.0.0/0'), ('udp', 53, 53, '0.0.0.0/0'),
+            ('icmp', -1, -1, '0.0.0.0/0'), ('tcp', 443, 443, '0.0.0.0/0'),
+        })
+
+    def test_invalid_ports_are_rejected(self):
+        with self.assertRaises(ValueError):
+            RuleSet().allow('70000')
+        with self.assertRaises(ValueError):
+            RuleSet().allow('gre:1')
+
+    def test_same_ports_are_grouped_into_one_permission(self):
+        permissions = RuleSet().allow(22, cidrs=['10.0.0.0/8', '2001:db8::/32']).allow('all').to_ip_permissions()
+        self.assertEqual(permissions, [
+            {'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
+            {'IpProtocol': 'tcp', 'FromPort': 22, 'ToPort': 22,
+             'IpRanges': [{'CidrIp': '10.0.0.0/8'}], 'Ipv6Ranges': [{'CidrIpv6': '2001:db8::/32'}]},
+        ])
+
+    def test_round_trip_through_ip_permissions(self):
+        rule_set = RuleSet().allow([22, '80-81'], cidrs=['10.0.0.1/24']).allow('all')
+        self.assertEqual(RuleSet.from_ip_permissions(rule_set.to_ip_permissions()).rules, rule_set.rules)
+
+    def test_difference_contains_only_missing_rules(self):
+        wanted = RuleSet().allow([22, 80, 443])
+        existing = RuleSet().allow([22, 8080])
+        self.assertEqual((wanted - existing).rules, {('tcp', 80, 80, '0.0.0.0/0'), ('tcp', 443, 443, '0.0.0.0/0')})
+        self.assertFalse(wanted - wanted)
+
+    def test_apply_adds_only_missing_rules_in_one_call(self):
+        ec2 = FakeSecurityGroupEC2(RuleSet().allow(22).to_ip_permissions())
+        result = apply_rule_set(ec2, 'sg-1', RuleSet().allow([22, 80, 443]))
+
+        self.assertEqual(result, {'added': 2, 'revoked': 0, 'unchanged': 1})
+        self.assertEqual(len(ec2.authorize_calls), 1)
+        self.assertEqual(apply_rule_set(ec2, 'sg-1', RuleSet().allow([22, 80, 443]))['added'], 0)
+        self.assertEqual(len(ec2.authorize_calls), 1)
+
+    def test_apply_revokes_extra_rules_on_request(self):
+        ec2 = FakeSecurityGroupEC2(RuleSet().allow([22, 3389]).to_ip_permissions())
+        result = apply_rule_set(ec2, 'sg-1', RuleSet().allow(22), revoke_extra=True)
+
+        self.assertEqual(result, {'added': 0, 'revoked': 1, 'unchanged': 1})
+        self.assertEqual(ec2.rules.rules, {('tcp', 22, 22, '0.0.0.0/0')})
+
+
+class ProvisioningEngineTests(SimpleTestCase):
+    def test_steps_run_after_their_dependencies(self):
+        engine = ProvisioningEngine()
+        engine.add('vpc', lambda r: 'vpc-1')
+        engine.add('subnet', lambda r: f"{r['vpc']}/subnet", requires=['vpc'])
+        engine.add('route', lambda r: f"{r['subnet']}/route", requires=['subnet'])
+
+        self.assertEqual(engine.run()['route'], 'vpc-1/subnet/route')
+        self.assertEqual([item['step'] for item in engine.report], ['vpc', 'subnet', 'route'])
+
+    def test_existing_steps_are_kept_and_not_run(self):
+        engine = ProvisioningEngine()
+        engine.add('vpc', mock.Mock(), existing='vpc-1')
+        engine.add('subnet', lambda r: f"{r['vpc']}/subnet", requires=['vpc'])
+
+        self.assertEqual([(item['step'], item['action']) for item in engine.plan()],
+                         [('vpc', 'keep'), ('subnet', 'create')])
+        self.assertEqual(engine.run(), {'vpc': 'vpc-1', 'subnet': 'vpc-1/subnet'})
+        engine.steps['vpc'][0].assert_not_called()
+        self.assertEqual(engine.report[0], {'step': 'vpc', 'status': 'exists'})
+
+    def test_invalid_graphs_are_rejected(self):
+        engine = ProvisioningEngine()
+        engine.add('a', lambda r: None, requires=['b'])
+        engine.add('b', lambda r: None, requires=['a'])
+        with self.assertRaisesRegex(ValueError, 'Циклічні'):
+            engine.run()
+
+        engine = ProvisioningEngine()
+        engine.add('a', lambda r: None, requires=['missing'])
+        with self.assertRaisesRegex(ValueError, 'невідомого'):
+            engine.run()
+
+    def test_failure_stops_dependent_steps(self):
+        engine = ProvisioningEngine()
+        dependent = mock.Mock()
+        engine.add('vpc', mock.Mock(side_effect=Exception('boom')))
+        engine.add('subnet', dependent, requires=['vpc'])
+
+        with self.assertRaises(ProvisioningError) as context:
+            engine.run()
+        self.assertEqual(context.exception.step, 'vpc')
+        dependent.assert_not_called()
+
+
+class FakeWaiter:
+    def wait(self, **params):
+        pass
+
+
+class FakeVpcEC2:
+    """Стан VPC-ресурсів у пам'яті з фільтрами за тегами, vpc-id, cidr і state."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.fail = set()
+        self.vpcs, self.subnets, self.route_tables = {}, {}, {}
+        self.internet_gateways, self.nat_gateways, self.addresses = {}, {}, {}
+
+    def _call(self, name, **params):
+        with self.lock:
+            self.calls.append((name, params))
+        if name in self.fail:
+            raise ClientError({'Error': {'Code': 'InternalError', 'Message': name}}, name)
+
+    def _new_id(self, prefix):
+        with self.lock:
+            return f"{prefix}-{next(self.ids)}"
+
+    @staticmethod
+    def _tags(tag_specifications):
+        return [tag for spec in tag_specifications or [] for tag in spec['Tags']]
+
+    @staticmethod
+    def _matches(resource, filters):
+        fields = {'vpc-id': 'VpcId', 'cidr': 'CidrBlock', 'state': 'State'}
+        for item in filters or []:
+            name, values = item['Name'], item['Values']
+            if name.startswith('tag:'):
+                if not any(tag['Key'] == name[4:] and tag['Value'] in values for tag in resource.get('Tags', [])):
+                    return False
+            elif resource.get(fields[name]) not in values:
+                return False
+        return True
+
+    def _describe(self, resources, Filters=None):
+        return [resource for resource in resources.values() if self._matches(resource, Filters)]
+
+    def called(self, name):
+        return [params for call, params in self.calls if call == name]
+
+    def get_paginator(self, operation):
+        resources = {
+            'describe_subnets': ('Subnets', self.subnets),
+            'describe_route_tables': ('RouteTables', self.route_tables),
+            'describe_nat_gateways': ('NatGateways', self.nat_gateways),
+        }
+        key, items = resources[operation]
+        return FakePaginator(lambda Filters=None: {key: self._describe(items, Filters)})
+
+    def get_waiter(self, name):
+        self._call(f'wait:{name}')
+        return FakeWaiter()
+
+    def describe_vpcs(self, Filters=None):
+        return {'Vpcs': self._describe(self.vpcs, Filters)}
+
+    def describe_internet_gateways(self, Filters=None):
+        return {'InternetGateways': self._describe(self.internet_gateways, Filters)}
+
+    def describe_addresses(self, Filters=None):
+        return {'Addresses': self._describe(self.addresses, Filters)}
+
+    def describe_availability_zones(self):
+        return {'AvailabilityZones': [{'ZoneName': 'us-east-1a'}, {'ZoneName': 'us-east-1b'}]}
+
+    def create_vpc(self, CidrBlock, TagSpecifications=None):
+        self._call('create_vpc')
+        vpc_id = self._new_id('vpc')
+        self.vpcs[vpc_id] = {'VpcId': vpc_id, 'CidrBlock': CidrBlock, 'State': 'available',
+                             'Tags': self._tags(TagSpecifications)}
+        return {'Vpc': self.vpcs[vpc_id]}
+
+    def delete_vpc(self, VpcId):
+        self._call('delete_vpc', VpcId=VpcId)
+        del self.vpcs[VpcId]
+
+    def create_internet_gateway(self, TagSpecifications=None):
+        self._call('create_internet_gateway')
+        igw_id = self._new_id('igw')
+        self.internet_gateways[igw_id] = {'InternetGatewayId': igw_id, 'Attachments': [],
+                                          'Tags': self._tags(TagSpecifications)}
+        return {'InternetGateway': self.internet_gateways[igw_id]}
+
+    def attach_internet_gateway(self, VpcId, InternetGatewayId):
+        self._call('attach_internet_gateway')
+        self.internet_gateways[InternetGatewayId]['Attachments'] = [{'VpcId': VpcId, 'State': 'available'}]
+
+    def detach_internet_gateway(self, VpcId, InternetGatewayId):
+        self._call('detach_internet_gateway', InternetGatewayId=InternetGatewayId)
+        self.internet_gateways[InternetGatewayId]['Attachments'] = []
+
+    def delete_internet_gateway(self, InternetGatewayId):
+        self._call('delete_internet_gateway', InternetGatewayId=InternetGatewayId)
+        del self.internet_gateways[InternetGatewayId]
+
+    def create_route_table(self, VpcId, TagSpecifications=None):
+        self._call('create_route_table')
+        route_table_id = self._new_id('rtb')
+        self.route_tables[route_table_id] = {'RouteTableId': route_table_id, 'VpcId': VpcId, 'Routes': [],
+                                             'Associations': [], 'Tags': self._tags(TagSpecifications)}
+        return {'RouteTable': self.route_tables[route_table_id]}
+
+    def create_route(self, RouteTableId, DestinationCidrBlock, **target):
+        self._call('create_route')
+        self.route_tables[RouteTableId]['Routes'].append(dict(target, DestinationCidrBlock=DestinationCidrBlock))
+
+    def associate_route_table(self, RouteTableId, SubnetId):
+        self._call('associate_route_table')
+        association_id = self._new_id('rtbassoc')
+        self.route_tables[RouteTableId]['Associations'].append(
+            {'SubnetId': SubnetId, 'RouteTableAssociationId': association_id}
+        )
+        return {'AssociationId': association_id}
+
+    def disassociate_route_table(self, AssociationId):
+        self._call('disassociate_route_table', AssociationId=AssociationId)
+        for route_table in self.route_tables.values():
+            route_table['Associations'] = [association for association in route_table['Associations']
+                                           if association['RouteTableAssociationId'] != AssociationId]
+
+    def delete_route_table(self, RouteTableId):
+        self._call('delete_route_table', RouteTableId=RouteTableId)
+        del self.route_tables[RouteTableId]
+
+    def create_subnet(self, VpcId, CidrBlock, AvailabilityZone, TagSpecifications=None):
+        self._call('create_subnet')
+        subnet_id = self._new_id('subnet')
+        self.subnets[subnet_id] = {'SubnetId': subnet_id, 'VpcId': VpcId, 'CidrBlock': CidrBlock,
+                                   'AvailabilityZone': AvailabilityZone, 'MapPublicIpOnLaunch': False,
+                                   'Tags': self._tags(TagSpecifications)}
+        return {'Subnet': self.subnets[subnet_id]}
+
+    def modify_subnet_attribute(self, SubnetId, MapPublicIpOnLaunch):
+        self._call('modify_subnet_attribute')
+        self.subnets[SubnetId]['MapPublicIpOnLaunch'] = MapPublicIpOnLaunch['Value']
+
+    def delete_subnet(self, SubnetId):
+        self._call('delete_subnet', SubnetId=SubnetId)
+        del self.subnets[SubnetId]
+
+    def allocate_address(self, Domain, TagSpecifications=None):
+        self._call('allocate_address')
+        allocation_id = self._new_id('eipalloc')
+        self.addresses[allocation_id] = {'AllocationId': allocation_id, 'Tags': self._tags(TagSpecifications)}
+        return self.addresses[allocation_id]
+
+    def release_address(self, AllocationId):
+        self._call('release_address', AllocationId=AllocationId)
+        del self.addresses[AllocationId]
+
+    def create_nat_gateway(self, SubnetId, AllocationId, TagSpecifications=None):
+        self._call('create_nat_gateway')
+        nat_id = self._new_id('nat')
+        self.nat_gateways[nat_id] = {'NatGatewayId': nat_id, 'VpcId': self.subnets[SubnetId]['VpcId'],
+                                     'SubnetId': SubnetId, 'State': 'pending',
+                                     'NatGatewayAddresses': [{'AllocationId': AllocationId}],
+                                     'Tags': self._tags(TagSpecifications)}
+        return {'NatGateway': self.nat_gateways[nat_id]}
+
+    def delete_nat_gateway(self, NatGatewayId):
+        self._call('delete_nat_gateway', NatGatewayId=NatGatewayId)
+        self.nat_gateways[NatGatewayId]['State'] = 'deleted'
+
+
+class VpcPlanTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.ec2 = FakeVpcEC2()
+        patcher = mock.patch('aws.services.vpc.get_client', return_value=self.ec2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = VPCService('key', 'secret')
+
+    def plan_actions(self):
+        return {item['step']: item['action'] for item in self.service.plan_vpc('10.0.0.0/16', 4, 'app')}
+
+    def test_empty_account_plans_every_step(self):
+        actions = self.plan_actions()
+        self.assertEqual(set(actions.values()), {'create'})
+        self.assertIn('nat_gateway_1', actions)
+        self.assertEqual(self.ec2.calls, [])
+
+    def test_created_vpc_is_kept_on_next_plan(self):
+        vpc_id, subnets = self.service.create_vpc('10.0.0.0/16', 4, 'app')
+        self.assertEqual(len(subnets), 4)
+
+        actions = self.plan_actions()
+        resource_steps = {step for step in actions if step not in ('azs', 'nat_gateways_available')}
+        self.assertEqual({actions[step] for step in resource_steps}, {'keep'})
+        self.assertEqual(self.service.create_vpc('10.0.0.0/16', 4, 'app')[0], vpc_id)
+        self.assertEqual(len(self.ec2.called('create_vpc')), 1)
+
+    def test_retry_creates_only_missing_resources(self):
+        self.ec2.fail.add('create_nat_gateway')
+        with self.assertRaises(Exception):
+            self.service.create_vpc('10.0.0.0/16', 4, 'app', rollback=False)
+        self.assertEqual(len(self.ec2.vpcs), 1)
+
+        self.ec2.fail.clear()
+        self.ec2.calls.clear()
+        self.service.create_vpc('10.0.0.0/16', 4, 'app')
+
+        created = {name for name, _ in self.ec2.calls if name.startswith(('create', 'allocate', 'associate'))}
+        self.assertEqual(created, {'create_nat_gateway', 'create_route'})
+        self.assertEqual(len(self.ec2.called('create_nat_gateway')), 2)
+
+
+class RollbackTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.ec2 = FakeVpcEC2()
+        patcher = mock.patch('aws.services.vpc.get_client', return_value=self.ec2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = VPCService('key', 'secret')
+
+    def order(self, name, **params):
+        calls = [(call, call_params) for call, call_params in self.ec2.calls if not call.startswith('create')]
+        return next(index for index, (call, call_params) in enumerate(calls)
+                    if call == name and all(call_params.get(key) == value for key, value in params.items()))
+
+    def test_failed_create_removes_everything_in_dependency_order(self):
+        self.ec2.fail.add('create_route')
+        with self.assertRaisesRegex(Exception, 'видалено'):
+            self.service.create_vpc('10.0.0.0/16', 4, 'app')
+
+        self.assertEqual((self.ec2.vpcs, self.ec2.subnets, self.ec2.route_tables,
+                          self.ec2.internet_gateways, self.ec2.addresses), ({}, {}, {}, {}, {}))
+        self.assertEqual(self.service.last_rollback['errors'], {})
+
+        nats_deleted = self.order('wait:nat_gateway_deleted')
+        self.assertTrue(all(self.order('delete_nat_gateway', NatGatewayId=nat) < nats_deleted
+                            for nat in self.ec2.nat_gateways))
+        self.assertLess(nats_deleted, self.order('release_address'))
+        self.assertLess(nats_deleted, self.order('detach_internet_gateway'))
+        self.assertLess(self.order('detach_internet_gateway'), self.order('delete_internet_gateway'))
+        self.assertLess(self.order('disassociate_route_table'), self.order('delete_route_table'))
+        self.assertEqual(self.ec2.calls[-1][0], 'delete_vpc')
+
+    def test_failed_step_skips_its_dependents(self):
+        self.ec2.fail.add('create_route')
+        self.ec2.fail.add('delete_subnet')
+        with self.assertRaisesRegex(Exception, 'Відкат неповний'):
+            self.service.create_vpc('10.0.0.0/16', 2, 'app')
+
+        errors = self.service.last_rollback['errors']
+        self.assertIn('delete:vpc', errors)
+        self.assertEqual(len(self.ec2.vpcs), 1)
+        self.assertFalse(self.ec2.called('delete_vpc'))
+        # Незалежні від сабнетів ресурси все одно видаляються.
+        self.assertEqual(self.ec2.addresses, {})
+
+    def test_missing_resources_count_as_deleted(self):
+        ec2 = mock.MagicMock()
+        ec2.delete_subnet.side_effect = ClientError(
+            {'Error': {'Code': 'InvalidSubnetID.NotFound', 'Message': 'gone'}}, 'DeleteSubnet'
+        )
+        journal = ResourceJournal()
+        journal.record('vpc', 'vpc', 'vpc-1')
+        journal.record('public_subnet_0', 'subnet', 'subnet-1')
+
+        result = RollbackExecutor(ec2).run(journal)
+
+        self.assertEqual(result['errors'], {})
+        ec2.delete_vpc.assert_called_once_with(VpcId='vpc-1')
+
+
+class FakeInventoryAWS:
+    """EC2 і EKS з фіксованими відповідями describe_* для синхронізації інвентаря."""
+
+    def __init__(self):
+        self.reservations = []
+        self.vpcs = []
+        self.subnets = []
+        self.security_groups = []
+        self.clusters = []
+
+    def get_paginator(self, operation):
+        pages = {
+            'describe_instances': lambda: {'Reservations': self.reservations},
+            'describe_vpcs': lambda: {'Vpcs': self.vpcs},
+            'describe_subnets': lambda: {'Subnets': self.subnets},
+            'describe_security_groups': lambda: {'SecurityGroups': self.security_groups},
+            'list_clusters': lambda: {'clusters': [cluster['name'] for cluster in self.clusters]},
+        }
+        return FakePaginator(pages[operation])
+
+    def describe_cluster(self, name):
+        return {'cluster': next(cluster for cluster in self.clusters if cluster['name'] == name)}
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.aws = FakeInventoryAWS()
+        self.aws.vpcs = [
+            {'VpcId': 'vpc-1', 'CidrBlock': '10.0.0.0/16', 'State': 'available',
+             'Tags': [{'Key': 'Name', 'Value': 'prod'}, {'Key': 'env', 'Value': 'prod'}]},
+            {'VpcId': 'vpc-2', 'CidrBlock': '172.16.0.0/16', 'State': 'available'},
+        ]
+        self.aws.subnets = [
+            {'SubnetId': 'subnet-1', 'VpcId': 'vpc-1', 'CidrBlock': '10.0.1.0/24', 'State': 'available',
+             'Tags': [{'Key': 'Name', 'Value': 'web-public'}]},
+        ]
+        self.aws.reservations = [{'Instances': [
+            {'InstanceId': 'i-1', 'State': {'Name': 'running'}, 'VpcId': 'vpc-1', 'SubnetId': 'subnet-1',
+             'PrivateIpAddress': '10.0.1.5', 'Tags': [{'Key': 'Name', 'Value': 'web-1'}]},
+        ]}]
+        patcher = mock.patch('aws.services.inventory.get_client', return_value=self.aws)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self):
+        return InventorySyncer(self.user, 'key', 'secret').run()
+
+    def find(self, query):
+        return sorted(item['resource_id'] for item in search_inventory(self.user, query)['results'])
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query('tag:Name="web server" state:running vpc-1 foo:bar'), [
+            ('tag', 'Name=web server'), ('state', 'running'), ('text', 'vpc-1'), ('text', 'foo:bar'),
+        ])
+        self.assertEqual(parse_query('"unbalanced WEB'), [('text', '"unbalanced'), ('text', 'web')])
+        self.assertEqual(parse_query('cidr:'), [('text', 'cidr:')])
+
+    def test_sync_writes_only_changes(self):
+        self.assertEqual(self.sync()['vpcs'], {'created': 2, 'updated': 0, 'deleted': 0, 'unchanged': 0})
+        self.assertEqual(self.sync()['vpcs'], {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 2})
+
+        self.aws.vpcs[0] = dict(self.aws.vpcs[0], State='pending')
+        del self.aws.vpcs[1]
+        self.assertEqual(self.sync()['vpcs'], {'created': 0, 'updated': 1, 'deleted': 1, 'unchanged': 0})
+        self.assertEqual(list(InventoryVpc.objects.values_list('resource_id', 'state')), [('vpc-1', 'pending')])
+        self.assertFalse(InventorySearchEntry.objects.filter(resource_id='vpc-2').exists())
+
+    def test_search_filters(self):
+        self.sync()
+        self.assertEqual(self.find('tag:env=prod'), ['vpc-1'])
+        self.assertEqual(self.find('cidr:10.0.1.5'), ['i-1', 'subnet-1', 'vpc-1'])
+        self.assertEqual(self.find('within:10.0.0.0/16'), ['i-1', 'subnet-1', 'vpc-1'])
+        self.assertEqual(self.find('type:subnet web'), ['subnet-1'])
+        self.assertEqual(self.find('WEB-1'), ['i-1'])
+        with self.assertRaises(ValueError):
+            search_inventory(self.user, 'cidr:not-an-ip')
+
+
+class LocalEtagTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def write(self, name, body):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as target:
+            target.write(body)
+        return path
+
+    @staticmethod
+    def multipart_etag(body, part_size):
+        digests = b''.join(hashlib.md5(body[offset:offset + part_size]).digest()
+                           for offset in range(0, len(body), part_size))
+        return f"{hashlib.md5(digests).hexdigest()}-{-(-len(body) // part_size)}"
+
+    def test_single_part_etag_is_md5(self):
+        path = self.write('small.txt', b'hello')
+        self.assertEqual(local_etag(path), hashlib.md5(b'hello').hexdigest())
+        self.assertTrue(is_same_file(path, 5, f'"{hashlib.md5(b"hello").hexdigest()}"'))
+        self.assertFalse(is_same_file(path, 6, hashlib.md5(b'hello').hexdigest()))
+
+    def test_multipart_etag_matches_s3(self):
+        body = os.urandom(1024) * 10
+        path = self.write('parts.bin', body)
+        self.assertEqual(local_etag(path, 3, 4096), self.multipart_etag(body, 4096))
+
+    def test_multipart_part_size_is_inferred(self):
+        mb = 1024 * 1024
+        # 10 МБ типовими частинами по 8 МБ і 5 МБ частинами, виведеними з кількості (по 2 МБ).
+        for size, part_size in ((10 * mb, 8 * mb), (5 * mb, 2 * mb)):
+            body = os.urandom(size)
+            path = self.write('large.bin', body)
+            self.assertTrue(is_same_file(path, size, self.multipart_etag(body, part_size)))
+            self.assertFalse(is_same_file(path, size, self.multipart_etag(body[::-1], part_size)))
+
+
+class RecordingService:
+    """Синхронний сервіс, що запам'ятовує потоки, в яких його викликали."""
+
+    def __init__(self, region):
+        self.region = region
+        self.threads = []
+
+    def describe(self, name, suffix=''):
+        """Повернути опис ресурсу."""
+        self.threads.append(threading.current_thread().name)
+        return f"{self.region}:{name}{suffix}"
+
+
+class AsyncRecordingService(AsyncService):
+    sync_class = RecordingService
+
+
+class AsyncServiceTests(SimpleTestCase):
+    async def test_methods_run_in_the_pool(self):
+        service = AsyncRecordingService('eu-west-1')
+        self.assertEqual(await service.describe('vpc', suffix='!'), 'eu-west-1:vpc!')
+        self.assertEqual(service.describe.__doc__, 'Повернути опис ресурсу.')
+        self.assertTrue(service._service.threads[0].startswith('aws-async'))
+
+    def test_unknown_and_private_attributes_raise(self):
+        service = AsyncRecordingService('eu-west-1')
+        with self.assertRaises(AttributeError):
+            service.missing
+        with self.assertRaises(AttributeError):
+            service._private
+
+
+class RegionFanOutTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('aws.services.ec2_service.get_client')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.threads = []
+
+    def list_instances(self, service):
+        self.threads.append(threading.current_thread().name)
+        if service.region == 'ap-south-1':
+            raise Exception('AuthFailure')
+        return [{'InstanceId': f'i-{service.region}'}]
+
+    def test_regions_are_fetched_on_the_shared_pool(self):
+        with mock.patch.object(EC2Service, 'list_instances', autospec=True, side_effect=self.list_instances), \
+                mock.patch('aws.services.ec2_service.ThreadPoolExecutor') as per_call_pool:
+            result = EC2Service('key', 'secret').list_instances_all_regions(['eu-west-1', 'us-east-1'])
+        per_call_pool.assert_not_called()
+        self.assertEqual([instance['InstanceId'] for instance in result['instances']],
+                         ['i-eu-west-1', 'i-us-east-1'])
+        self.assertTrue(all(name.startswith('aws-regions') for name in self.threads))
+
+    def test_failed_region_is_reported_and_others_are_merged(self):
+        with mock.patch.object(EC2Service, 'list_instances', autospec=True, side_effect=self.list_instances):
+            result = EC2Service('key', 'secret').list_instances_all_regions(['eu-west-1', 'ap-south-1', 'us-east-1'])
+        self.assertEqual([instance['InstanceId'] for instance in result['instances']],
+                         ['i-eu-west-1', 'i-us-east-1'])
+        self.assertEqual({region: (report['count'], report['error']) for region, report in result['regions'].items()},
+                         {'eu-west-1': (1, None), 'ap-south-1': (0, 'AuthFailure'), 'us-east-1': (1, None)})
+
+
+class FakeDashboardService:
+    """Асинхронний сервіс кабінету з заданими відповідями (значення, виняток або затримка)."""
+
+    responses = {}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        async def method(*args, **kwargs):
+            response = self.responses[name]
+            if isinstance(response, Exception):
+                raise response
+            if isinstance(response, float):
+                await asyncio.sleep(response)
+            return response
+        return method
+
+
+class SilentS3Service:
+    """S3 сервіс, чий endpoint приймає з'єднання, але ніколи не відповідає."""
+
+    def __init__(self, endpoint_url, timeout):
+        self.s3 = boto3.client('s3', endpoint_url=endpoint_url, region_name='us-east-1',
+                               aws_access_key_id='key', aws_secret_access_key='secret',
+                               config=timeout_config(timeout))
+
+    def list_buckets(self):
+        return self.s3.list_buckets()
+
+    def ping(self):
+        return 'pong'
+
+
+class AsyncSilentS3Service(AsyncService):
+    sync_class = SilentS3Service
+
+
+class DashboardTimeoutTests(SimpleTestCase):
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(8)
+        self.addCleanup(self.server.close)
+        # Один потік у пулі: наступний виклик можливий, лише коли попередній звільнить його.
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown, wait=False)
+        patcher = mock.patch('aws.services.async_services.executor', executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_timed_out_widget_releases_its_pool_thread(self):
+        host, port = self.server.getsockname()
+        service = AsyncSilentS3Service(f'http://{host}:{port}', timeout=0.4)
+
+        with mock.patch.dict('aws.views.DASHBOARD_WIDGET_TIMEOUTS', {'buckets': 0.1}):
+            name, data, error = await load_widget('buckets', service.list_buckets())
+        self.assertIn('Перевищено час очікування', error)
+
+        # Без read_timeout клієнта потік чекав би відповіді 60 секунд за замовчуванням botocore.
+        self.assertEqual(await asyncio.wait_for(service.ping(), 2), 'pong')
+
+
+class NetworkTopologyViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+        FakeDashboardService.responses = {'get_network_topology': [
+            {'VpcId': 'vpc-1', 'Subnets': [{'SubnetId': 'subnet-1', 'Public': True}]},
+        ]}
+
+    async def get(self, name='aws:network_topology', **headers):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with mock.patch('aws.views.AsyncEC2Service', FakeDashboardService):
+            return await client.get(reverse(name), {'region': 'eu-west-1'}, headers=headers)
+
+    async def test_matching_etag_returns_not_modified(self):
+        response = await self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['vpcs'][0]['VpcId'], 'vpc-1')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        revalidated = await self.get(if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    async def test_changed_topology_gets_new_etag(self):
+        etag = (await self.get())['ETag']
+        FakeDashboardService.responses = {'get_network_topology': []}
+
+        response = await self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    async def test_old_url_serves_topology(self):
+        response = await self.get('aws:get_vpcs_and_subnets')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['region'], 'eu-west-1')
+
+
+class DashboardWidgetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret')
+
+    async def test_load_widget_reports_timeouts_and_errors(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def broken():
+            raise Exception('boom')
+
+        async def ready():
+            return ['bucket']
+
+        with mock.patch.dict('aws.views.DASHBOARD_WIDGET_TIMEOUTS', {'buckets': 0.01}):
+            self.assertEqual(await load_widget('buckets', ready()), ('buckets', ['bucket'], None))
+            name, data, error = await load_widget('buckets', slow())
+            self.assertIsNone(data)
+            self.assertIn('Перевищено час очікування', error)
+            self.assertEqual(await load_widget('buckets', broken()), ('buckets', None, 'boom'))
+
+    async def test_failing_widgets_do_not_hide_the_others(self):
+        FakeDashboardService.responses = {
+            'list_buckets': 'Помилка отримання бакетів',
+            'list_instances_all_regions': Exception('boom'),
+            'get_vpcs': 1.0,
+            'get_clusters': ['prod'],
+        }
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with mock.patch('aws.views.AsyncS3Service', FakeDashboardService), \
+                mock.patch('aws.views.AsyncEC2Service', FakeDashboardService), \
+                mock.patch('aws.views.AsyncEKSService', FakeDashboardService), \
+                mock.patch.dict('aws.views.DASHBOARD_WIDGET_TIMEOUTS', {'vpcs': 0.05}):
+            response = await client.get(reverse('aws:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['clusters'], ['prod'])
+        self.assertEqual(set(response.context['widget_errors']), {'buckets', 'instances', 'vpcs'})
+
+
+class MultipartStreamUploadTests(SimpleTestCase):
+    def setUp(self):
+        self.s3 = mock.MagicMock()
+        self.s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        self.bodies = {}
+
+        def upload_part(**params):
+            self.bodies[params['PartNumber']] = params['Body']
+            return {'ETag': f"etag-{params['PartNumber']}"}
+        self.s3.upload_part.side_effect = upload_part
+
+    def test_chunks_are_regrouped_into_ordered_parts(self):
+        body = os.urandom(MIN_PART_SIZE * 2 + 10)
+        chunks = [body[offset:offset + 65536] for offset in range(0, len(body), 65536)]
+        progress = []
+
+        result = MultipartStreamUpload(self.s3, 'bucket', 'key', part_size=MIN_PART_SIZE, total=len(body),
+                                       on_progress=lambda uploaded, total: progress.append(uploaded)).upload(chunks)
+
+        self.assertEqual(result, {'bucket': 'bucket', 'key': 'key', 'size': len(body), 'parts': 3})
+        self.assertEqual(b''.join(self.bodies[number] for number in (1, 2, 3)), body)
+        parts = self.s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+        self.assertEqual([part['PartNumber'] for part in parts], [1, 2, 3])
+        self.assertEqual(progress[-1], len(body))
+
+    def test_empty_stream_uploads_one_empty_part(self):
+        result = MultipartStreamUpload(self.s3, 'bucket', 'key').upload([])
+        self.assertEqual(result['parts'], 1)
+        self.assertEqual(self.bodies, {1: b''})
+
+    def test_failure_aborts_the_upload(self):
+        self.s3.upload_part.side_effect = Exception('network')
+        with self.assertRaises(Exception):
+            MultipartStreamUpload(self.s3, 'bucket', 'key').upload([b'data'])
+        self.s3.abort_multipart_upload.assert_called_once_with(Bucket='bucket', Key='key', UploadId='upload-1')
+        self.s3.complete_multipart_upload.assert_not_called()
+
+
+class ResumableUploadTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'backup.tar')
+        with open(self.path, 'wb') as target:
+            target.write(os.urandom(MIN_PART_SIZE * 2 + 10))
+
+        self.s3 = mock.MagicMock()
+        self.s3.exceptions = boto3.client('s3', region_name='us-east-1', aws_access_key_id='key',
+                                          aws_secret_access_key='secret').exceptions
+        self.s3.create_multipart_upload.return_value = {'UploadId': 'upload-2'}
+        self.s3.get_paginator.return_value = FakePaginator(self.list_parts)
+        self.server_parts = {}
+        self.uploaded = []
+
+        def upload_part(**params):
+            self.uploaded.append(params['PartNumber'])
+            return {'ETag': f"etag-{params['PartNumber']}"}
+        self.s3.upload_part.side_effect = upload_part
+
+    def list_parts(self, Bucket, Key, UploadId):
+        if UploadId != 'upload-1':
+            raise self.s3.exceptions.NoSuchUpload({'Error': {'Code': 'NoSuchUpload'}}, 'ListParts')
+        return {'Parts': [{'PartNumber': number, 'ETag': f'etag-{number}', 'Size': size}
+                          for number, size in self.server_parts.items()]}
+
+    def transfer(self):
+        return ResumableUpload(self.s3, 'bucket', self.path, part_size=MIN_PART_SIZE)
+
+    def write_manifest(self, upload_id='upload-1', **changes):
+        transfer = self.transfer()
+        manifest = dict(transfer._signature(), upload_id=upload_id, parts={'1': 'etag-1'}, **changes)
+        with open(transfer.manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        return transfer.manifest_path
+
+    def completed(self):
+        params = self.s3.complete_multipart_upload.call_args.kwargs
+        return params['UploadId'], [part['PartNumber'] for part in params['MultipartUpload']['Parts']]
+
+    def test_resume_uploads_only_missing_parts(self):
+        manifest_path = self.write_manifest()
+        self.server_parts = {1: MIN_PART_SIZE, 2: MIN_PART_SIZE}
+
+        result = self.transfer().upload()
+
+        self.assertEqual(result['resumed_parts'], 2)
+        self.assertEqual(self.uploaded, [3])
+        self.assertEqual(self.completed(), ('upload-1', [1, 2, 3]))
+        self.s3.create_multipart_upload.assert_not_called()
+        self.assertFalse(os.path.exists(manifest_path))
+
+    def test_part_with_wrong_size_is_uploaded_again(self):
+        self.write_manifest()
+        self.server_parts = {1: MIN_PART_SIZE, 2: 100}
+
+        self.transfer().upload()
+
+        self.assertEqual(sorted(self.uploaded), [2, 3])
+        self.assertEqual(self.completed(), ('upload-1', [1, 2, 3]))
+
+    def test_missing_upload_starts_new_one(self):
+        self.write_manifest(upload_id='upload-expired')
+
+        result = self.transfer().upload()
+
+        self.assertEqual(result['resumed_parts'], 0)
+        self.assertEqual(sorted(self.uploaded), [1, 2, 3])
+        self.assertEqual(self.completed(), ('upload-2', [1, 2, 3]))
+
+    def test_changed_file_ignores_manifest(self):
+        for field, value in (('mtime', 0), ('size', 1)):
+            with self.subTest(field=field):
+                self.uploaded.clear()
+                self.s3.get_paginator.reset_mock()
+                self.write_manifest(**{field: value})
+
+                self.transfer().upload()
+
+                self.s3.get_paginator.assert_not_called()
+                self.assertEqual(sorted(self.uploaded), [1, 2, 3])
+                self.assertEqual(self.completed(), ('upload-2', [1, 2, 3]))
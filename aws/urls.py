@@ -6,13 +6,26 @@ app_name = 'aws'
 urlpatterns = [
     path('dashboard/', views.aws_dashboard, name='dashboard'),
     path('ec2/create/', views.aws_create_instance, name='ec2_create'),
-    path('get-vpcs-and-subnets/', views.get_vpcs_and_subnets, name='get_vpcs_and_subnets'),
+    path('network/topology/', views.network_topology, name='network_topology'),
+    # Стара адреса: тепер віддає ту саму топологію, що й network/topology/.
+    path('get-vpcs-and-subnets/', views.network_topology, name='get_vpcs_and_subnets'),
     path('s3/', views.s3_list, name='s3_list'),
     path('s3/create/', views.s3_create, name='s3_create'),
+    path('s3/upload/', views.s3_upload, name='s3_upload'),
+    path('s3/upload/progress/', views.s3_upload_progress, name='s3_upload_progress'),
+    path('s3/bucket/<str:bucket_name>/', views.s3_browse, name='s3_browse'),
+    path('s3/bucket/<str:bucket_name>/objects/', views.s3_objects, name='s3_objects'),
+    path('s3/bucket/<str:bucket_name>/stats/', views.s3_prefix_stats, name='s3_prefix_stats'),
+    path('s3/bucket/<str:bucket_name>/delete/', views.s3_delete_prefix, name='s3_delete_prefix'),
+    path('s3/bucket/<str:bucket_name>/copy/', views.s3_copy_prefix, name='s3_copy_prefix'),
     path('ec2/', views.ec2_list, name='ec2_list'),
+    path('ec2/instances/', views.ec2_instances, name='ec2_instances'),
+    path('ec2/instances/events/', views.instance_events, name='instance_events'),
     path('vpc/', views.vpc_list, name='vpc_list'),
     path('vpc/create', views.aws_create_vpc, name='vpc_create'),
     path('eks/', views.eks_list, name='eks_list'),
     path('eks/create', views.aws_create_eks_cluster, name='aws_create_eks'),
+    path('inventory/sync/', views.inventory_sync, name='inventory_sync'),
+    path('inventory/search/', views.inventory_search, name='inventory_search'),
     path('eks/create-nodegroup/', views.aws_create_eks_nodegroup, name='aws_create_eks_nodegroup'),
 ]
@@ -1,47 +1,112 @@
-from django.shortcuts import render
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils.http import parse_etags, url_has_allowed_host_and_scheme
 from django.contrib.auth.decorators import login_required
-from dashboard.models import UserProfile
+from dashboard.profiles import aget_profile, get_profile
 from .services.s3_service import S3Service
 from .services.ec2_service import EC2Service
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from .services.vpc import VPCService
 from .services.eks import EKSService
-
+from .models import InventoryCluster, InventoryInstance, InventorySubnet, InventorySync, InventoryVpc
+from .streaming import stream_json_response
+from common.jobs import enqueue
+from common.views import EVENTS_HEARTBEAT_INTERVAL, sse_message, sse_unavailable, supports_streaming
+from .services.async_services import AsyncEC2Service, AsyncEKSService, AsyncS3Service
+from .services.cache import get_prefix_stats
+from .services.instance_watcher import watch_instances
+from .services.clients import credential_fingerprint
+from .services.security_groups import RuleSet
+from .services.inventory_search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, search as search_inventory
+import asyncio
+import hashlib
+import json
+import re
+import uuid
+from asgiref.sync import sync_to_async
+
+
+# render() може звертатися до БД (наприклад, user у контекст-процесорі),
+# тому в асинхронних view він виконується через sync_to_async.
+arender = sync_to_async(render)
+
+
+# Тайм-аути віджетів AWS кабінету (секунди).
+DASHBOARD_WIDGET_TIMEOUTS = {
+    'buckets': 5,
+    'instances': 15,
+    'vpcs': 5,
+    'clusters': 5,
+}
+
+
+async def load_widget(name, coroutine):
+    """Завантажити дані віджета з тайм-аутом; повертає (назва, дані, помилка)."""
+    timeout = DASHBOARD_WIDGET_TIMEOUTS[name]
+    try:
+        return name, await asyncio.wait_for(coroutine, timeout), None
+    except asyncio.TimeoutError:
+        return name, None, f'Перевищено час очікування ({timeout} с).'
+    except Exception as e:
+        return name, None, str(e)
 
 
 @login_required
-def aws_dashboard(request):
+async def aws_dashboard(request):
     # Отримання профілю користувача
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    user = await request.auser()
+    profile = await aget_profile(user)
 
     if not profile.aws_access_key or not profile.aws_secret_key:
-        return render(request, 'aws/dashboard.html', {
+        return await arender(request, 'aws/dashboard.html', {
             'error': 'Будь ласка, додайте ваші AWS ключі в налаштуваннях профілю.'
         })
 
-    # Ініціалізація сервісів S3 та EC2
-    try:
-        s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key)
-        ec2_service = EC2Service(profile.aws_access_key, profile.aws_secret_key)
-
-        # Отримання списку бакетів та інстансів
-        buckets = s3_service.list_buckets()
-        instances = ec2_service.list_instances()
-
-        return render(request, 'aws/dashboard.html', {
-            'buckets': buckets,
-            'instances': instances
-        })
-
-    except Exception as e:
-        return render(request, 'aws/dashboard.html', {
-            'error': f'Помилка підключення до AWS: {str(e)}'
-        })
+    region = request.GET.get('region', 'us-east-1')
+
+    def service(service_class, widget):
+        # wait_for лише перестає чекати на корутину, а потік пулу звільняється,
+        # коли завершиться сам виклик boto3 - тому клієнти віджета мають той самий дедлайн.
+        return service_class(profile.aws_access_key, profile.aws_secret_key, region=region,
+                             timeout=DASHBOARD_WIDGET_TIMEOUTS[widget])
+
+    # Усі віджети завантажуються одночасно; повільне або недоступне джерело
+    # не блокує решту сторінки.
+    results = await asyncio.gather(
+        load_widget('buckets', service(AsyncS3Service, 'buckets').list_buckets()),
+        load_widget('instances', service(AsyncEC2Service, 'instances').list_instances_all_regions()),
+        load_widget('vpcs', service(AsyncEC2Service, 'vpcs').get_vpcs()),
+        load_widget('clusters', service(AsyncEKSService, 'clusters').get_clusters()),
+    )
+    widgets = {name: data for name, data, error in results}
+    widget_errors = {name: error for name, data, error in results if error}
+
+    # S3Service.list_buckets повертає текст помилки замість списку
+    if isinstance(widgets['buckets'], str):
+        widget_errors['buckets'] = widgets.pop('buckets')
+
+    inventory = widgets.get('instances') or {}
+    return await arender(request, 'aws/dashboard.html', {
+        'region': region,
+        'buckets': widgets.get('buckets'),
+        'instances': inventory.get('instances'),
+        'instance_regions': inventory.get('regions'),
+        'inventory_duration': inventory.get('duration'),
+        'vpcs': widgets.get('vpcs'),
+        'clusters': widgets.get('clusters'),
+        'widget_errors': widget_errors,
+    })
+
+
+# Максимальна довжина ключа ідемпотентності з форми (ClientToken до 64 символів, частину займає ID сабнету).
+CLIENT_TOKEN_LENGTH = 32
 
 
 @login_required
 def aws_create_instance(request):
-    profile = UserProfile.objects.get(user=request.user)
+    profile = get_profile(request.user)
 
     if not profile.aws_access_key or not profile.aws_secret_key:
         return render(request, 'aws/create_instance.html', {
@@ -58,24 +123,54 @@ def aws_create_instance(request):
         ami_id = request.POST.get('ami_id')
         volume_size = int(request.POST.get('volume_size', 8))
         instance_name = request.POST.get('instance_name', 'MyInstance')
-        ports = list(map(int, request.POST.get('ports', '').split(',')))
+        ports = [port.strip() for port in request.POST.get('ports', '').split(',') if port.strip()]
         ssh_key_name = request.POST.get('ssh_key_name')
         ssh_key_material = request.POST.get('ssh_key_material')
+        # Ключ з форми: повторна відправка тієї самої форми не запускає дублікатів.
+        client_token = request.POST.get('client_token', '')[:CLIENT_TOKEN_LENGTH] or uuid.uuid4().hex
 
         try:
+            count = int(request.POST.get('count') or 1)
             ec2_service.set_region(region)
 
-            if ssh_key_material:
-                ssh_key_name = f"{instance_name}-key"
-                ec2_service.ec2.import_key_pair(KeyName=ssh_key_name, PublicKeyMaterial=ssh_key_material)
-            elif not ssh_key_name:
-                ssh_key_name = f"{instance_name}-key"
-                key_pair = ec2_service.create_key_pair(ssh_key_name)
+            # Ключ і група безпеки перевикористовуються, якщо вже існують.
+            ssh_key_name = ssh_key_name or f"{instance_name}-key"
+            key_material = ec2_service.ensure_key_pair(ssh_key_name, ssh_key_material or None)
+            if key_material:
                 with open(f"{ssh_key_name}.pem", 'w') as key_file:
-                    key_file.write(key_pair['KeyMaterial'])
-
-            sg_id = ec2_service.create_security_group(f"{instance_name}-sg", "Security Group", vpc_id)
-            ec2_service.authorize_security_group(sg_id, ports)
+                    key_file.write(key_material)
+
+            sg_id = ec2_service.ensure_security_group(f"{instance_name}-sg", vpc_id, RuleSet().allow(ports))
+
+            subnet_ids = [subnet_id]
+            if request.POST.get('spread'):
+                # Розподіл по всіх сабнетах VPC того ж типу (публічні/приватні), що й обраний.
+                vpc = next((item for item in ec2_service.get_network_topology() if item['VpcId'] == vpc_id), None)
+                subnets = vpc['Subnets'] if vpc else []
+                selected = next((subnet for subnet in subnets if subnet['SubnetId'] == subnet_id), None)
+                if selected is not None:
+                    subnet_ids = [subnet['SubnetId'] for subnet in subnets if subnet['Public'] == selected['Public']]
+
+            if count > 1 or len(subnet_ids) > 1:
+                job = enqueue(
+                    'aws.launch_fleet',
+                    user=request.user,
+                    region=region,
+                    instance_type=instance_type,
+                    ami_id=ami_id,
+                    count=count,
+                    subnet_ids=subnet_ids,
+                    sg_id=sg_id,
+                    ssh_key_name=ssh_key_name,
+                    name_prefix=instance_name,
+                    volume_size=volume_size,
+                    allow_partial=bool(request.POST.get('allow_partial')),
+                    client_token=client_token
+                )
+                return render(request, 'aws/create_instance.html', {
+                    'success': f"Запуск {count} інстансів поставлено в чергу (завдання #{job.id}).",
+                    'job': job
+                })
 
             instance_id = ec2_service.create_instance(
                 instance_type=instance_type,
@@ -84,11 +179,15 @@ def aws_create_instance(request):
                 instance_name=instance_name,
                 ssh_key_name=ssh_key_name,
                 sg_id=sg_id,
-                subnet_id=subnet_id
+                subnet_id=subnet_id,
+                client_token=client_token
             )
 
             return render(request, 'aws/create_instance.html', {
-                'success': f'EC2 інстанс створено з ID: {instance_id}'
+                'success': f'EC2 інстанс створено з ID: {instance_id}',
+                'instance_id': instance_id,
+                'region': region,
+                'live_updates': supports_streaming(request)
             })
         except Exception as e:
             return render(request, 'aws/create_instance.html', {
@@ -99,7 +198,6 @@ def aws_create_instance(request):
         try:
             regions = ec2_service.get_regions()
             vpcs = ec2_service.get_vpcs()
-            subnets = ec2_service.get_subnets(vpcs[0]['VpcId']) if vpcs else []
             instance_types = ec2_service.get_instance_types()
             amis = ec2_service.get_amis()
         except Exception as e:
@@ -108,41 +206,56 @@ def aws_create_instance(request):
             })
 
         return render(request, 'aws/create_instance.html', {
+            'client_token': uuid.uuid4().hex,
             'regions': regions,
             'vpcs': vpcs,
-            'subnets': subnets,
             'instance_types': instance_types,
             'amis': amis
         })
 
 @login_required
-def get_vpcs_and_subnets(request):
-    """Отримати VPC та сабнети для вибраного регіону."""
-    import logging
-    logger = logging.getLogger(__name__)
+async def network_topology(request):
+    """
+    Мережева топологія регіону одним запитом: усі VPC з сабнетами, зонами
+    доступності та ознакою публічності.
+
+    Відповідь має ETag, тож повторний запит з If-None-Match отримує 304.
+    """
+    user = await request.auser()
+    profile = await aget_profile(user)
+
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        return JsonResponse({'error': 'AWS ключі не знайдено.'}, status=400)
+
+    region = request.GET.get('region') or 'us-east-1'
+    try:
+        ec2_service = AsyncEC2Service(profile.aws_access_key, profile.aws_secret_key, region=region)
+        topology = await ec2_service.get_network_topology()
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    body = json.dumps({'region': region, 'vpcs': topology}, cls=DjangoJSONEncoder)
+    etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    # no-cache: браузер зберігає відповідь, але щоразу перевіряє її через If-None-Match.
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponseNotModified(headers=headers)
+    return HttpResponse(body, content_type='application/json', headers=headers)
 
-    region = request.GET.get('region')
-    logger.info(f"Отримання VPC та Сабнетів для регіону: {region}")
 
-    profile = UserProfile.objects.get(user=request.user)
+@login_required
+def ec2_instances(request):
+    """Потоково віддати EC2 інстанси регіону у форматі JSON."""
+    profile = get_profile(request.user)
 
     if not profile.aws_access_key or not profile.aws_secret_key:
-        logger.error("AWS ключі не знайдено.")
         return JsonResponse({'error': 'AWS ключі не знайдено.'}, status=400)
 
     try:
-        ec2_service = EC2Service(profile.aws_access_key, profile.aws_secret_key, region=region)
-        vpcs = ec2_service.get_vpcs()
-        logger.info(f"Отримано VPC: {vpcs}")
-        
-        subnets = []
-        if vpcs:
-            subnets = ec2_service.get_subnets(vpcs[0]['VpcId'])
-            logger.info(f"Отримано Сабнети: {subnets}")
-        
-        return JsonResponse({'vpcs': vpcs, 'subnets': subnets}, safe=False)
+        ec2_service = EC2Service(profile.aws_access_key, profile.aws_secret_key,
+                                 region=request.GET.get('region', 'us-east-1'))
+        return stream_json_response({'instances': ec2_service.iter_instances()})
     except Exception as e:
-        logger.error(f"Помилка: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -152,7 +265,7 @@ def get_vpcs_and_subnets(request):
 @login_required
 def aws_create_vpc(request):
     # Отримуємо профіль користувача
-    profile = UserProfile.objects.get(user=request.user)
+    profile = get_profile(request.user)
 
     # Перевірка наявності AWS ключів
     if not profile.aws_access_key or not profile.aws_secret_key:
@@ -166,15 +279,23 @@ def aws_create_vpc(request):
         # Зчитування даних з форми
         vpc_name = request.POST.get('vpc_name', 'MyVPC')  # За замовчуванням MyVPC
         cidr_block = request.POST.get('cidr_block', '10.0.0.0/16')
-        subnet_count = int(request.POST.get('subnet_count', 2))
 
         try:
-            # Створення VPC
-            vpc_id, subnets = vpc_service.create_vpc(cidr_block, subnet_count, vpc_name)
+            subnet_count = int(request.POST.get('subnet_count', 2))
+            # Створення VPC виконується фоновим завданням
+            job = enqueue(
+                'aws.create_vpc',
+                user=request.user,
+                region=request.POST.get('region'),
+                cidr_block=cidr_block,
+                subnet_count=subnet_count,
+                vpc_name=vpc_name
+            )
 
             return render(request, 'aws/create_vpc.html', {
-                'success': f"VPC '{vpc_name}' створено з ID: {vpc_id}",
-                'subnets': subnets
+                'success': f"Створення VPC '{vpc_name}' поставлено в чергу (завдання #{job.id}).",
+                'job': job,
+                'regions': vpc_service.get_regions()
             })
         except Exception as e:
             return render(request, 'aws/create_vpc.html', {
@@ -200,7 +321,7 @@ def aws_create_vpc(request):
 @login_required
 def aws_create_eks_cluster(request):
     """Функція для створення EKS кластеру."""
-    profile = UserProfile.objects.get(user=request.user)
+    profile = get_profile(request.user)
     eks_service = EKSService(profile.aws_access_key, profile.aws_secret_key)
 
     if request.method == 'POST':
@@ -210,17 +331,18 @@ def aws_create_eks_cluster(request):
         cluster_type = request.POST.get('cluster_type')  # 'public' або 'private'
 
         try:
-            eks_service.set_region(region)
-            subnets = eks_service.get_subnets_by_type(vpc_id, cluster_type)
-
-            if not subnets:
-                return render(request, 'aws/create_eks_cluster.html', {
-                    'error': 'Не вдалося знайти сабнети для обраного VPC та типу кластера.'
-                })
-
-            eks_service.create_eks_cluster(cluster_name, vpc_id, subnets, cluster_type)
+            # Створення кластера (10-15 хвилин) виконується фоновим завданням
+            job = enqueue(
+                'aws.create_eks_cluster',
+                user=request.user,
+                region=region,
+                vpc_id=vpc_id,
+                cluster_name=cluster_name,
+                cluster_type=cluster_type
+            )
             return render(request, 'aws/create_eks_cluster.html', {
-                'success': f'Кластер {cluster_name} успішно створено!',
+                'success': f'Створення кластера {cluster_name} поставлено в чергу (завдання #{job.id}).',
+                'job': job,
                 'regions': eks_service.get_regions(),
                 'vpcs': eks_service.get_vpcs(),
             })
@@ -247,7 +369,7 @@ def aws_create_eks_cluster(request):
 @login_required
 def aws_create_eks_nodegroup(request):
     """Функція для створення нод-пулу в існуючому кластері."""
-    profile = UserProfile.objects.get(user=request.user)
+    profile = get_profile(request.user)
     eks_service = EKSService(profile.aws_access_key, profile.aws_secret_key)
 
     if request.method == 'POST':
@@ -297,26 +419,293 @@ def aws_create_eks_nodegroup(request):
 
 @login_required
 def s3_list(request):
-    # Логіка для отримання списку бакетів
-    return render(request, 'aws/s3_list.html')
+    profile = get_profile(request.user)
+
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        return render(request, 'aws/s3_list.html', {
+            'error': 'Будь ласка, додайте ваші AWS ключі в налаштуваннях профілю.'
+        })
+
+    s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key)
+    buckets = s3_service.list_buckets()
+    if isinstance(buckets, str):
+        return render(request, 'aws/s3_list.html', {'error': buckets})
+    return render(request, 'aws/s3_list.html', {'buckets': buckets})
+
+
+@login_required
+def s3_browse(request, bucket_name):
+    """Сторінка перегляду бакета; вміст підвантажується посторінково через s3_objects."""
+    return render(request, 'aws/s3_browse.html', {
+        'bucket_name': bucket_name,
+        'prefix': request.GET.get('prefix', ''),
+    })
+
+
+@login_required
+def s3_objects(request, bucket_name):
+    """
+    Одна сторінка вмісту "папки" бакета у форматі JSON.
+
+    Для підпапок додаються закешовані підсумки розміру й кількості
+    об'єктів (якщо їх уже порахувало завдання aws.s3_prefix_stats).
+    """
+    profile = get_profile(request.user)
+
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        return JsonResponse({'error': 'AWS ключі не знайдено.'}, status=400)
+
+    prefix = request.GET.get('prefix', '')
+    s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key)
+    try:
+        page = s3_service.list_objects_page(bucket_name, prefix, request.GET.get('token'))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    fingerprint = credential_fingerprint(profile.aws_access_key, profile.aws_secret_key)
+    stats = get_prefix_stats(fingerprint, bucket_name, [prefix] + page['prefixes'])
+    return JsonResponse({
+        'prefix': prefix,
+        'stats': stats.get(prefix),
+        'prefixes': [{'Prefix': item, 'stats': stats.get(item)} for item in page['prefixes']],
+        'objects': page['objects'],
+        'next_token': page['next_token'],
+    })
+
+
+@login_required
+def s3_prefix_stats(request, bucket_name):
+    """Запустити фоновий підрахунок розміру префікса."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Метод не підтримується.'}, status=405)
+
+    job = enqueue('aws.s3_prefix_stats', user=request.user,
+                  bucket_name=bucket_name, prefix=request.POST.get('prefix', ''))
+    return JsonResponse({'job_id': job.id})
+
+
+@login_required
+def s3_delete_prefix(request, bucket_name):
+    """Запустити фонове видалення всіх об'єктів "папки" бакета."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Метод не підтримується.'}, status=405)
+
+    prefix = request.POST.get('prefix', '').strip('/')
+    # Порожній префікс означав би весь бакет - таке видалення через браузер не запускається.
+    if not prefix:
+        return JsonResponse({'error': 'Вкажіть папку для видалення.'}, status=400)
+
+    job = enqueue('aws.s3_delete_prefix', user=request.user, bucket_name=bucket_name, prefix=prefix)
+    return JsonResponse({'job_id': job.id})
+
+
+@login_required
+def s3_copy_prefix(request, bucket_name):
+    """Запустити фонове копіювання "папки" бакета в інший бакет або папку."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Метод не підтримується.'}, status=405)
+
+    source_prefix = request.POST.get('prefix', '')
+    dest_bucket = request.POST.get('dest_bucket', '').strip() or bucket_name
+    dest_prefix = request.POST.get('dest_prefix', '')
+    if dest_bucket == bucket_name and dest_prefix.strip('/') == source_prefix.strip('/'):
+        return JsonResponse({'error': 'Папка призначення збігається з джерелом.'}, status=400)
+
+    job = enqueue('aws.s3_copy_prefix', user=request.user,
+                  source_bucket=bucket_name, source_prefix=source_prefix,
+                  dest_bucket=dest_bucket, dest_prefix=dest_prefix)
+    return JsonResponse({'job_id': job.id})
+
+
+# Розмір шматка, який читається з тіла запиту за раз.
+UPLOAD_READ_CHUNK_SIZE = 256 * 1024
+
+# Скільки зберігається прогрес завантаження в кеші (секунди).
+UPLOAD_PROGRESS_TTL = 3600
+
+UPLOAD_ID_PATTERN = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+
+def _upload_progress_key(user, upload_id):
+    return f"s3_upload_progress:{user.id}:{upload_id}"
+
+
+@login_required
+def s3_upload(request):
+    """
+    Завантаження файлу з браузера прямо в S3.
+
+    Файл надсилається як сире тіло PUT запиту (не multipart/form-data),
+    тому Django не розбирає його і не зберігає на диск: тіло читається
+    шматками й одразу передається в S3 multipart upload. Якщо вказано
+    ?upload=<id>, кількість байтів, уже записаних у S3, публікується для
+    s3_upload_progress.
+    """
+    profile = get_profile(request.user)
+
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        if request.method == 'PUT':
+            return JsonResponse({'error': 'AWS ключі не знайдено.'}, status=400)
+        return render(request, 'aws/s3_upload.html', {
+            'error': 'Будь ласка, додайте ваші AWS ключі в налаштуваннях профілю.'
+        })
+
+    s3_service = S3Service(profile.aws_access_key, profile.aws_secret_key)
+
+    if request.method == 'PUT':
+        bucket_name = request.GET.get('bucket')
+        object_name = request.GET.get('key')
+        if not bucket_name or not object_name:
+            return JsonResponse({'error': "Потрібно вказати бакет і ключ об'єкта."}, status=400)
+
+        total = int(request.META.get('CONTENT_LENGTH') or 0)
+        upload_id = request.GET.get('upload', '')
+        on_progress = None
+        if UPLOAD_ID_PATTERN.fullmatch(upload_id):
+            progress_key = _upload_progress_key(request.user, upload_id)
+            cache.set(progress_key, {'uploaded': 0, 'total': total}, UPLOAD_PROGRESS_TTL)
+
+            def on_progress(uploaded, expected):
+                cache.set(progress_key, {'uploaded': uploaded, 'total': expected or total}, UPLOAD_PROGRESS_TTL)
+
+        chunks = iter(lambda: request.read(UPLOAD_READ_CHUNK_SIZE), b'')
+        try:
+            result = s3_service.upload_stream(bucket_name, object_name, chunks, total=total, on_progress=on_progress)
+            return JsonResponse(result)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+    buckets = s3_service.list_buckets()
+    if isinstance(buckets, str):
+        return render(request, 'aws/s3_upload.html', {'error': buckets})
+    return render(request, 'aws/s3_upload.html', {'buckets': buckets})
+
+@login_required
+def s3_upload_progress(request):
+    """Скільки байтів завантаження ?upload=<id> уже записано в S3."""
+    upload_id = request.GET.get('upload', '')
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+        return JsonResponse({'error': 'Некоректний ідентифікатор завантаження.'}, status=400)
+    progress = cache.get(_upload_progress_key(request.user, upload_id))
+    if progress is None:
+        return JsonResponse({'error': 'Завантаження не знайдено.'}, status=404)
+    return JsonResponse(progress)
+
 
 @login_required
 def s3_create(request):
     # Логіка для створення нового бакета
     return render(request, 'aws/s3_create.html')
 
+def inventory_context(request, model):
+    """Спільний контекст сторінок, що читають локальний індекс ресурсів."""
+    region = request.GET.get('region', '')
+    items = model.objects.filter(user=request.user)
+    if region:
+        items = items.filter(region=region)
+    syncs = InventorySync.objects.filter(user=request.user).order_by('region')
+    return {
+        'items': items,
+        'region': region,
+        'regions': [sync.region for sync in syncs],
+        'syncs': syncs,
+    }
+
+
 @login_required
 def ec2_list(request):
-    # Логіка для отримання списку інстансів
-    return render(request, 'aws/ec2_list.html')
+    context = inventory_context(request, InventoryInstance)
+    # Живий стан інстансів потребує потоку подій, тож вмикається лише під ASGI.
+    context['live_updates'] = supports_streaming(request)
+    return render(request, 'aws/ec2_list.html', context)
+
 
 @login_required
 def vpc_list(request):
-    # Логіка для отримання списку інстансів
-    return render(request, 'aws/ec2_list.html')
+    context = inventory_context(request, InventoryVpc)
+    context['items'] = list(context['items'])
+    subnets = {}
+    vpc_ids = [vpc.resource_id for vpc in context['items']]
+    for subnet in InventorySubnet.objects.filter(user=request.user, vpc_id__in=vpc_ids).order_by('availability_zone'):
+        subnets.setdefault(subnet.vpc_id, []).append(subnet)
+    for vpc in context['items']:
+        vpc.subnets = subnets.get(vpc.resource_id, [])
+    return render(request, 'aws/vpc_list.html', context)
+
+
 @login_required
 def eks_list(request):
-    # Логіка для отримання списку інстансів
-    return render(request, 'aws/ec2_list.html')
+    return render(request, 'aws/eks_list.html', inventory_context(request, InventoryCluster))
 
 
+@login_required
+def inventory_sync(request):
+    """Запустити фонову синхронізацію індексу для регіону."""
+    if request.method == 'POST':
+        enqueue('aws.sync_inventory', user=request.user, regions=[request.POST.get('region') or 'us-east-1'])
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('aws:ec2_list')
+    return redirect(next_url)
+
+
+@login_required
+def inventory_search(request):
+    """
+    Пошук ресурсів у локальному індексі.
+
+    Приклади запиту ?q=: "tag:Env=prod state:running", "cidr:10.0.1.15",
+    "within:10.0.0.0/16 type:subnet", "web".
+    """
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+        return JsonResponse(search_inventory(request.user, request.GET.get('q', ''), limit=limit))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+# Максимальна кількість інстансів в одній підписці на зміни стану.
+MAX_WATCHED_INSTANCES = 1000
+
+
+@login_required
+async def instance_events(request):
+    """
+    Потік змін стану інстансів (text/event-stream) для ?region=&ids=i-1,i-2.
+
+    Усі глядачі регіону обслуговуються одним спільним опитувачем, тож
+    відкриті сторінки не множать запити до AWS. Під WSGI потік не
+    віддається (204), бо нескінченний потік займав би воркер назавжди.
+    """
+    if not supports_streaming(request):
+        return sse_unavailable()
+    user = await request.auser()
+    profile = await aget_profile(user)
+
+    if not profile.aws_access_key or not profile.aws_secret_key:
+        return JsonResponse({'error': 'AWS ключі не знайдено.'}, status=400)
+
+    region = request.GET.get('region') or 'us-east-1'
+    instance_ids = [
+        instance_id for instance_id in request.GET.get('ids', '').split(',') if instance_id.startswith('i-')
+    ][:MAX_WATCHED_INSTANCES]
+    if not instance_ids:
+        return JsonResponse({'error': 'Не вказано інстанси.'}, status=400)
+
+    async def stream():
+        subscription = watch_instances(profile.aws_access_key, profile.aws_secret_key, region, instance_ids)
+        try:
+            while True:
+                try:
+                    instance_id, state = await asyncio.wait_for(subscription.get(), EVENTS_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield sse_message(dict(state, InstanceId=instance_id), event='state')
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
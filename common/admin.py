@@ -1,3 +1,5 @@
 from django.contrib import admin
-
+from .models import Job, JobEvent
 # Register your models here.
+admin.site.register(Job)
+admin.site.register(JobEvent)
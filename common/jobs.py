@@ -0,0 +1,182 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Обробники завдань: тип завдання -> функція, що приймає Job і повертає результат.
+_handlers = {}
+
+# Способи запуску завдань (settings.JOBS_RUNNER):
+#   worker - завдання лишаються в черзі, їх виконує `manage.py run_jobs`;
+#   thread - завдання виконується у фоновому потоці поточного процесу;
+#   inline - завдання виконується одразу (для тестів і локальної розробки).
+RUNNER_WORKER = 'worker'
+RUNNER_THREAD = 'thread'
+RUNNER_INLINE = 'inline'
+
+
+def register(kind):
+    """Декоратор для реєстрації обробника завдання."""
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+# Типові значення оренди завдання (перевизначаються в settings).
+DEFAULT_HEARTBEAT_INTERVAL = 30
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def get_runner():
+    return getattr(settings, 'JOBS_RUNNER', RUNNER_WORKER)
+
+
+def _dispatch(job):
+    """Запустити завдання відповідно до JOBS_RUNNER (worker забере його з черги сам)."""
+    runner = get_runner()
+    if runner == RUNNER_INLINE:
+        if claim(job):
+            run_job(job)
+    elif runner == RUNNER_THREAD:
+        transaction.on_commit(lambda: threading.Thread(target=_run_in_thread, args=(job.id,), daemon=True).start())
+
+
+def enqueue(kind, user=None, **payload):
+    """Поставити завдання в чергу і повернути Job."""
+    if kind not in _handlers:
+        raise Exception(f"Невідомий тип завдання: {kind}")
+
+    job = Job.objects.create(kind=kind, user=user, payload=payload)
+    _dispatch(job)
+    return job
+
+
+def claim(job):
+    """Атомарно перевести завдання зі стану queued у running і взяти оренду."""
+    now = timezone.now()
+    claimed = Job.objects.filter(id=job.id, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+    )
+    if claimed:
+        job.refresh_from_db(fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+    return bool(claimed)
+
+
+def reclaim_stale(job_ids=None):
+    """
+    Повернути в чергу завдання, воркер яких перестав надсилати heartbeat.
+
+    Завдання, що вичерпало JOBS_MAX_ATTEMPTS спроб, позначається як невдале,
+    тож його потік подій завершується. Повертає кількість повернених завдань.
+    """
+    now = timezone.now()
+    lease_timeout = getattr(settings, 'JOBS_LEASE_TIMEOUT', Job.DEFAULT_LEASE_TIMEOUT)
+    max_attempts = getattr(settings, 'JOBS_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=now - timedelta(seconds=lease_timeout))
+    if job_ids is not None:
+        stale = stale.filter(id__in=job_ids)
+
+    stale.filter(attempts__gte=max_attempts).update(
+        status=Job.STATUS_FAILED, finished_at=now,
+        error=f"Воркер зупинився під час виконання завдання (спроб: {max_attempts})."
+    )
+    requeued = list(stale.filter(attempts__lt=max_attempts).values_list('id', flat=True))
+    if requeued:
+        stale.filter(id__in=requeued).update(status=Job.STATUS_QUEUED, heartbeat_at=None)
+        logger.warning(f"Завдання повернуто в чергу після втрати воркера: {requeued}")
+        if get_runner() != RUNNER_WORKER:
+            for job in Job.objects.filter(id__in=requeued, status=Job.STATUS_QUEUED):
+                _dispatch(job)
+    return len(requeued)
+
+
+class Heartbeat:
+    """Фоновий потік, що періодично продовжує оренду завдання, поки воно виконується."""
+
+    def __init__(self, job_id, interval=None):
+        self.job_id = job_id
+        self.interval = interval or getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                Job.objects.filter(id=self.job_id, status=Job.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception(f"Помилка heartbeat завдання #{self.job_id}")
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def claim_next():
+    """Взяти найстаріше завдання з черги (безпечно для кількох воркерів)."""
+    for job in Job.objects.filter(status=Job.STATUS_QUEUED).order_by('created_at')[:10]:
+        if claim(job):
+            return job
+    return None
+
+
+def run_job(job):
+    """Виконати завдання, яке вже перебуває у стані running."""
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise Exception(f"Невідомий тип завдання: {job.kind}")
+        with Heartbeat(job.id):
+            job.result = handler(job)
+        job.status = Job.STATUS_SUCCEEDED
+        job.progress = 100
+    except Exception as e:
+        logger.exception(f"Помилка виконання завдання #{job.id} ({job.kind})")
+        job.status = Job.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    # Поки обробник працював, оренда могла минути і завдання забрав інший воркер
+    # (або позначив невдалим reclaim_stale): тоді результат цієї спроби відкидається.
+    saved = Job.objects.filter(id=job.id, status=Job.STATUS_RUNNING, attempts=job.attempts).update(
+        result=job.result, status=job.status, progress=job.progress, error=job.error, finished_at=job.finished_at
+    )
+    if not saved:
+        logger.warning(f"Результат завдання #{job.id} (спроба {job.attempts}) відкинуто: завдання вже перезапущено.")
+    return job
+
+
+def run_pending(limit=None):
+    """Виконати завдання з черги (разом із завданнями загублених воркерів); повертає кількість виконаних."""
+    reclaim_stale()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        job = Job.objects.get(id=job_id)
+        if claim(job):
+            run_job(job)
+    finally:
+        connection.close()
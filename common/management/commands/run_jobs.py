@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from common.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Виконувати фонові завдання з черги."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Виконати завдання з черги і завершитись.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Пауза між перевірками черги (секунди).")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Воркер фонових завдань запущено.")
+        while True:
+            close_old_connections()
+            count = run_pending()
+            if count:
+                self.stdout.write(f"Виконано завдань: {count}")
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
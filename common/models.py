@@ -1,3 +1,107 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фонове завдання для довготривалих операцій у хмарі."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В черзі'),
+        (STATUS_RUNNING, 'Виконується'),
+        (STATUS_SUCCEEDED, 'Успішно'),
+        (STATUS_FAILED, 'Помилка'),
+    ]
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    # Скільки секунд завдання може виконуватися без heartbeat (якщо не задано JOBS_LEASE_TIMEOUT).
+    DEFAULT_LEASE_TIMEOUT = 120
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=100, verbose_name="Тип завдання")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Прогрес, %")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Останній сигнал воркера")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Спроби")
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def is_lease_expired(self):
+        """Чи перестав воркер надсилати heartbeat для завдання, що виконується."""
+        lease_timeout = getattr(settings, 'JOBS_LEASE_TIMEOUT', self.DEFAULT_LEASE_TIMEOUT)
+        return (
+            self.status == self.STATUS_RUNNING and self.heartbeat_at is not None
+            and self.heartbeat_at < timezone.now() - timedelta(seconds=lease_timeout)
+        )
+
+    def report(self, message, progress=None, **data):
+        """Додати подію до журналу завдання (і оновити прогрес)."""
+        if progress is not None:
+            data['progress'] = progress
+        event = self.events.create(message=message, data=data)
+        if progress is not None and progress != self.progress:
+            self.progress = progress
+            self.save(update_fields=['progress'])
+        return event
+
+    def as_dict(self, events=True):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if events:
+            data['events'] = [event.as_dict() for event in self.events.all()]
+        return data
+
+
+class JobEvent(models.Model):
+    """Подія (крок) фонового завдання."""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='events')
+    message = models.CharField(max_length=255)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.job_id}: {self.message}"
 
-# Create your models here.
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'message': self.message,
+            'data': self.data,
+            'created_at': self.created_at,
+        }
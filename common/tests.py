@@ -1,3 +1,158 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .jobs import Heartbeat, claim, claim_next, enqueue, register, reclaim_stale, run_job, run_pending
+from .models import Job
+
+
+@register('test.echo')
+def echo(job):
+    job.report('Половина', progress=50)
+    if job.payload.get('fail'):
+        raise Exception('Навмисна помилка')
+    return {'echo': job.payload.get('value'), 'attempt': job.attempts}
+
+
+@register('test.reclaimed')
+def reclaimed(job):
+    # Поки обробник працює, завдання повертають у чергу і його бере інший воркер.
+    Job.objects.filter(id=job.id).update(status=Job.STATUS_QUEUED, heartbeat_at=None)
+    claim(Job.objects.get(id=job.id))
+    return {'attempt': job.attempts}
+
+
+class JobEventsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.job = Job.objects.create(kind='test', user=self.user)
+        self.url = reverse('common:job_events', args=[self.job.id])
+
+    def test_wsgi_request_gets_no_content(self):
+        # Під WSGI потік не віддається, щоб не тримати воркер; сторінка переходить на опитування.
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_other_users_job_is_not_found(self):
+        self.client.force_login(User.objects.create_user('stranger', password='secret'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    async def test_asgi_streams_events_until_job_finishes(self):
+        await self.job.events.acreate(message='Крок 1', data={'progress': 50})
+        self.job.status = Job.STATUS_SUCCEEDED
+        await self.job.asave(update_fields=['status'])
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertIn('event: progress', body)
+        self.assertIn('"progress": 50', body)
+        self.assertTrue(body.rstrip().split('\n\n')[-1].startswith('event: done'))
+
+
+class JobQueueTests(TestCase):
+    def test_claim_succeeds_only_once(self):
+        job = Job.objects.create(kind='test.echo')
+        # Два воркери прочитали те саме завдання до того, як хтось його взяв.
+        first, second = Job.objects.get(id=job.id), Job.objects.get(id=job.id)
+
+        self.assertTrue(claim(first))
+        self.assertFalse(claim(second))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_RUNNING, 1))
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_claim_next_skips_claimed_jobs(self):
+        older = Job.objects.create(kind='test.echo')
+        newer = Job.objects.create(kind='test.echo')
+        claim(Job.objects.get(id=older.id))
+
+        self.assertEqual(claim_next().id, newer.id)
+        self.assertIsNone(claim_next())
+
+    @override_settings(JOBS_RUNNER='inline')
+    def test_inline_runner_runs_job_immediately(self):
+        job = enqueue('test.echo', value=42)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual((job.progress, job.result), (100, {'echo': 42, 'attempt': 1}))
+        self.assertEqual(list(job.events.values_list('message', flat=True)), ['Половина'])
+
+    @override_settings(JOBS_RUNNER='inline')
+    def test_inline_runner_records_failure(self):
+        with self.assertLogs('common.jobs', level='ERROR'):
+            job = enqueue('test.echo', fail=True)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.STATUS_FAILED, 'Навмисна помилка'))
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(Exception):
+            enqueue('test.unknown')
+
+    @override_settings(JOBS_RUNNER='worker', JOBS_LEASE_TIMEOUT=60, JOBS_MAX_ATTEMPTS=3)
+    def test_stale_job_is_requeued_and_rerun(self):
+        job = enqueue('test.echo', value='again')
+        claim(job)
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(seconds=61))
+
+        with self.assertLogs('common.jobs', level='WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.STATUS_SUCCEEDED, {'echo': 'again', 'attempt': 2}))
+
+    @override_settings(JOBS_RUNNER='worker', JOBS_LEASE_TIMEOUT=60)
+    def test_live_job_is_not_reclaimed(self):
+        job = enqueue('test.echo')
+        claim(job)
+
+        self.assertEqual(reclaim_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+
+    @override_settings(JOBS_RUNNER='worker', JOBS_LEASE_TIMEOUT=60, JOBS_MAX_ATTEMPTS=1)
+    def test_stale_job_fails_after_max_attempts(self):
+        job = enqueue('test.echo')
+        claim(job)
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertEqual(reclaim_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertTrue(job.is_finished)
+
+    def test_reclaimed_job_is_not_overwritten_by_previous_worker(self):
+        job = Job.objects.create(kind='test.reclaimed')
+        claim(job)
+
+        with self.assertLogs('common.jobs', level='WARNING'):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_RUNNING, 2))
+        self.assertIsNone(job.result)
+        self.assertIsNone(job.finished_at)
+
+
+class HeartbeatTests(TransactionTestCase):
+    def test_heartbeat_extends_lease_while_running(self):
+        job = Job.objects.create(kind='test.echo')
+        claim(job)
+        stale = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(id=job.id).update(heartbeat_at=stale)
+
+        with Heartbeat(job.id, interval=0.05):
+            time.sleep(0.3)
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, stale)
+        self.assertFalse(job.is_lease_expired)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'common'
+
+urlpatterns = [
+    path('<int:job_id>/', views.job_status, name='job_status'),
+    path('<int:job_id>/events/', views.job_events, name='job_events'),
+]
@@ -1,3 +1,107 @@
-from django.shortcuts import render
+import asyncio
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from .jobs import reclaim_stale
+from .models import Job, JobEvent
+
+# Як часто перевіряти нові події завдання (секунди).
+EVENTS_POLL_INTERVAL = 1.0
+
+# Як часто надсилати коментар-heartbeat, щоб проксі не закривали з'єднання.
+EVENTS_HEARTBEAT_INTERVAL = 15.0
+
+
+@login_required
+def job_status(request, job_id):
+    """Отримати стан, прогрес і події фонового завдання."""
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    if job.is_lease_expired:
+        reclaim_stale([job.id])
+        job.refresh_from_db()
+    return JsonResponse(job.as_dict())
+
+
+def supports_streaming(request):
+    """
+    Чи можна віддати довгий потік подій.
+
+    Під WSGI Django повністю вичитує асинхронний потік перед відправкою,
+    тож нескінченний SSE займав би потік воркера назавжди. Потоки подій
+    віддаються лише під ASGI.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def sse_unavailable():
+    """Відповідь 204: EventSource закривається без перепідключення, і сторінка переходить на опитування."""
+    return HttpResponse(status=204)
+
+
+def sse_message(data, event=None, event_id=None):
+    """Сформувати повідомлення у форматі Server-Sent Events."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_job_events(job_id, last_event_id=0):
+    """Асинхронно віддавати нові події завдання, доки воно не завершиться."""
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+    while True:
+        async for event in JobEvent.objects.filter(job_id=job_id, id__gt=last_event_id).order_by('id'):
+            last_event_id = event.id
+            last_sent = loop.time()
+            yield sse_message(event.as_dict(), event='progress', event_id=event.id)
+
+        job = await Job.objects.aget(id=job_id)
+        if job.is_lease_expired:
+            # Воркер зник: завдання повертається в чергу або завершується помилкою.
+            await sync_to_async(reclaim_stale)([job_id])
+            job = await Job.objects.aget(id=job_id)
+        if job.is_finished:
+            yield sse_message(job.as_dict(events=False), event='done')
+            return
+
+        if loop.time() - last_sent >= EVENTS_HEARTBEAT_INTERVAL:
+            last_sent = loop.time()
+            yield ": heartbeat\n\n"
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+
+@login_required
+async def job_events(request, job_id):
+    """
+    Потік подій завдання (text/event-stream).
+
+    Під ASGI кожен глядач - це лише корутина, тож один воркер обслуговує
+    багато відкритих потоків; під WSGI повертається 204, і сторінка
+    опитує job_status. Після перепідключення браузер надсилає
+    Last-Event-ID, і потік продовжується з наступної події.
+    """
+    user = await request.auser()
+    if not await Job.objects.filter(id=job_id, user=user).aexists():
+        raise Http404("Завдання не знайдено.")
+    if not supports_streaming(request):
+        return sse_unavailable()
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    response = StreamingHttpResponse(stream_job_events(job_id, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,94 @@
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UserProfile
+
+# Скільки секунд профіль зберігається в кеші між запитами.
+PROFILE_CACHE_TTL = 5 * 60
+
+# Атрибут об'єкта користувача, в якому профіль кешується в межах запиту.
+REQUEST_CACHE_ATTR = '_cached_profile'
+
+# Поля, які потрібні на кожному запиті (AWS кабінет і воркер завдань). Решта
+# полів профілю не кешуються і довантажуються з бази при першому зверненні.
+CACHED_FIELDS = ('id', 'user_id', 'cloud_provider', 'aws_access_key', 'aws_secret_key')
+
+
+def _cache_key(user_id):
+    return f"dashboard:profile:{user_id}"
+
+
+def is_shared_cache():
+    """
+    Чи спільний кеш між процесами.
+
+    Кеш у пам'яті процесу не підходить для облікових даних: сигнал скидає
+    запис лише в поточному процесі, тож інші воркери та run_jobs ще
+    PROFILE_CACHE_TTL секунд працювали б зі старими ключами.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _to_cache(profile):
+    return {name: getattr(profile, name) for name in CACHED_FIELDS}
+
+
+def _from_cache(values):
+    field_names = [field.attname for field in UserProfile._meta.concrete_fields if field.attname in values]
+    return UserProfile.from_db(UserProfile.objects.db, field_names, [values[name] for name in field_names])
+
+
+def get_profile(user):
+    """
+    Отримати профіль користувача (разом з обліковими даними хмар).
+
+    Профіль спершу шукається на самому об'єкті user (кеш у межах запиту),
+    потім у спільному кеші (лише CACHED_FIELDS і лише якщо кеш спільний
+    між процесами) і лише тоді в базі даних; відсутній профіль створюється.
+    """
+    profile = getattr(user, REQUEST_CACHE_ATTR, None)
+    if profile is not None:
+        return profile
+
+    shared = is_shared_cache()
+    values = cache.get(_cache_key(user.pk)) if shared else None
+    if values is not None:
+        profile = _from_cache(values)
+    else:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        if shared:
+            cache.set(_cache_key(user.pk), _to_cache(profile), PROFILE_CACHE_TTL)
+    setattr(user, REQUEST_CACHE_ATTR, profile)
+    return profile
+
+
+async def aget_profile(user):
+    """Асинхронний варіант get_profile."""
+    profile = getattr(user, REQUEST_CACHE_ATTR, None)
+    if profile is not None:
+        return profile
+
+    shared = is_shared_cache()
+    values = await cache.aget(_cache_key(user.pk)) if shared else None
+    if values is not None:
+        profile = _from_cache(values)
+    else:
+        profile, _ = await UserProfile.objects.aget_or_create(user=user)
+        if shared:
+            await cache.aset(_cache_key(user.pk), _to_cache(profile), PROFILE_CACHE_TTL)
+    setattr(user, REQUEST_CACHE_ATTR, profile)
+    return profile
+
+
+def invalidate_profile(user_id):
+    """Скинути закешований профіль (наприклад, після зміни ключів у налаштуваннях)."""
+    cache.delete(_cache_key(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def _invalidate_on_change(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
@@ -1,3 +1,71 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .models import UserProfile
+from .profiles import REQUEST_CACHE_ATTR, _cache_key, get_profile
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret',
+                                   azure_client_secret='azure-secret')
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_process_local_cache_is_not_used_across_requests(self):
+        get_profile(self.fresh_user())
+        self.assertIsNone(cache.get(_cache_key(self.user.pk)))
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            get_profile(user)
+
+    def test_profile_is_cached_per_request(self):
+        user = self.fresh_user()
+        profile = get_profile(user)
+        with self.assertNumQueries(0):
+            self.assertIs(get_profile(user), profile)
+        self.assertIs(getattr(user, REQUEST_CACHE_ATTR), profile)
+
+
+class SharedProfileCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user('owner', password='secret')
+        self.profile = UserProfile.objects.create(user=self.user, aws_access_key='AKIA', aws_secret_key='secret',
+                                                  azure_client_secret='azure-secret')
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_only_needed_fields_are_cached(self):
+        get_profile(self.fresh_user())
+        cached = cache.get(_cache_key(self.user.pk))
+        self.assertEqual(cached, {'id': self.profile.id, 'user_id': self.user.pk, 'cloud_provider': 'aws',
+                                  'aws_access_key': 'AKIA', 'aws_secret_key': 'secret'})
+
+    def test_cached_profile_skips_database_and_loads_other_fields_lazily(self):
+        get_profile(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            profile = get_profile(user)
+            self.assertEqual(profile.aws_secret_key, 'secret')
+        with self.assertNumQueries(1):
+            self.assertEqual(profile.azure_client_secret, 'azure-secret')
+
+    def test_saving_profile_invalidates_cache(self):
+        get_profile(self.fresh_user())
+        self.profile.aws_secret_key = 'rotated'
+        self.profile.save()
+        self.assertEqual(get_profile(self.fresh_user()).aws_secret_key, 'rotated')
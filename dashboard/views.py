@@ -2,10 +2,11 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from .models import UserProfile, GitRepository
 from .forms import CloudProviderForm, GitRepositoryForm
+from .profiles import get_profile
 
 @login_required
 def dashboard_view(request):
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    profile = get_profile(request.user)
     context = {'profile': profile}
     return render(request, 'dashboard/index.html', context)
 
@@ -16,6 +17,7 @@ def settings_view(request):
         form = CloudProviderForm(request.POST, instance=profile)
         if form.is_valid():
             form.save()
+            # Кеш профілю скидається сигналом post_save, тож нові ключі діють одразу.
             return redirect('dashboard:dashboard')
     else:
         form = CloudProviderForm(instance=profile)